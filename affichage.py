@@ -0,0 +1,57 @@
+# affichage.py
+"""Mise en forme des tableaux affichés : les colonnes restent numériques, les formats sont déclarés.
+
+Le navigateur formate les nombres (séparateurs de milliers, €, %) : aucune copie
+du tableau ni conversion en chaînes cellule par cellule côté Python.
+"""
+
+from typing import Dict, Iterable
+
+import pandas as pd
+import streamlit as st
+
+FORMAT_EUROS = "%,.0f €"
+FORMAT_POURCENTAGE = "percent"
+FORMAT_ENTIER = "%d"
+
+COLONNES_ENTIERES = ("Année", "Mois")
+COLONNES_POURCENTAGES = ("Taux de marge",)
+
+
+def config_colonnes(df: pd.DataFrame,
+                    pourcentages: Iterable[str] = COLONNES_POURCENTAGES,
+                    entiers: Iterable[str] = COLONNES_ENTIERES,
+                    libelles: Dict[str, str] = None,
+                    aides: Dict[str, str] = None) -> dict:
+    """column_config d'un tableau : colonnes numériques en euros sauf pourcentages et entiers.
+
+    Les colonnes non numériques (scénario, libellés) gardent l'affichage par défaut.
+    """
+    pourcentages, entiers = set(pourcentages), set(entiers)
+    libelles, aides = libelles or {}, aides or {}
+    config = {}
+    for colonne in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[colonne]):
+            continue
+        if colonne in pourcentages:
+            format_colonne = FORMAT_POURCENTAGE
+        elif colonne in entiers:
+            format_colonne = FORMAT_ENTIER
+        else:
+            format_colonne = FORMAT_EUROS
+        config[colonne] = st.column_config.NumberColumn(
+            libelles.get(colonne, colonne), format=format_colonne, help=aides.get(colonne)
+        )
+    return config
+
+
+def afficher_tableau(df: pd.DataFrame,
+                     pourcentages: Iterable[str] = COLONNES_POURCENTAGES,
+                     entiers: Iterable[str] = COLONNES_ENTIERES,
+                     libelles: Dict[str, str] = None,
+                     aides: Dict[str, str] = None,
+                     **options):
+    """st.dataframe avec les formats monétaires déclarés (pleine largeur, sans index par défaut)"""
+    options.setdefault("use_container_width", True)
+    options.setdefault("hide_index", True)
+    return st.dataframe(df, column_config=config_colonnes(df, pourcentages, entiers, libelles, aides), **options)
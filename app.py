@@ -2,9 +2,16 @@
 """Application principale du calculateur financier Caribo"""
 
 import streamlit as st
-from config import APP_CONFIG, NIVEAUX_COMPLEXITE, TYPES_CLIENTS
-from utils import init_session_state, format_currency, load_template_projet
+import memoire
+import perf
+from config import APP_CONFIG, NIVEAUX_COMPLEXITE, TYPES_CLIENTS, PERF_CONFIG
+from utils import (
+    init_session_state, actualiser_catalogue, format_currency, format_percentage, load_template_projet
+)
 from models import ServiceSelectionne, Projet
+from templates_precalcules import templates, PROJECTION_DEFAUT
+from affichage import afficher_tableau
+from index_catalogue import index_catalogue
 
 # Configuration de la page
 st.set_page_config(
@@ -14,15 +21,247 @@ st.set_page_config(
     initial_sidebar_state=APP_CONFIG['initial_sidebar_state']
 )
 
+# Mesure des temps d'exécution (panneau caché : CALCULATEUR_PERF=1 ou ?perf=1 dans l'URL)
+perf_actif = PERF_CONFIG["actif"] or st.query_params.get("perf") == "1"
+perf.debut_rerun(st.session_state, perf_actif)
+
 # Initialisation
-init_session_state()
+with perf.mesurer("init_session_state"):
+    init_session_state()
+    actualiser_catalogue()
+
+# Suivi mémoire de la session (budget, éviction des données recalculables)
+with perf.mesurer("memoire.suivi"):
+    memoire.suivre_session_courante(st.session_state)
+
+# Barre latérale : projets sauvegardés
+with st.sidebar:
+    from views.bibliotheque import render_bibliotheque_sidebar
+    render_bibliotheque_sidebar()
+
+# Éditeurs de services : fragments réexécutés seuls quand leurs widgets changent
+def afficher_resume_projet():
+    """Affiche les indicateurs du projet en cours"""
+    projet = st.session_state.projet_courant
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Total HT", format_currency(projet.total_ht))
+
+    with col2:
+        st.metric("TVA (8,5%)", format_currency(projet.tva))
+
+    with col3:
+        st.metric("Total TTC", format_currency(projet.total_ttc))
+
+    with col4:
+        if projet.maintenance_annuelle_ht > 0:
+            st.metric("Maintenance/an", format_currency(projet.maintenance_annuelle_ht))
+        else:
+            st.metric("Maintenance/an", "N/A")
+
+
+def maj_quantite(service_sel: ServiceSelectionne):
+    service_sel.quantite = st.session_state[f"quantite_{service_sel.uid}"]
+    st.session_state.resume_a_rafraichir = True
+
+
+def maj_complexite(service_sel: ServiceSelectionne):
+    service_sel.complexite = st.session_state[f"complexite_{service_sel.uid}"]
+    service_sel.prix_unitaire = service_sel.service.calculer_prix(complexite=service_sel.complexite)
+    st.session_state.resume_a_rafraichir = True
+
+
+def maj_facteurs(service_sel: ServiceSelectionne):
+    nouveaux_facteurs = {
+        facteur.nom: st.session_state[f"facteur_{service_sel.uid}_{facteur.nom}"]
+        for facteur in service_sel.service.facteurs_variation
+    }
+    service_sel.facteurs_custom = nouveaux_facteurs
+    service_sel.prix_unitaire = service_sel.service.calculer_prix(facteurs_custom=nouveaux_facteurs)
+    st.session_state.resume_a_rafraichir = True
+
+
+@st.fragment
+@perf.chronometre_fragment("fragment.editeur_service")
+def editeur_service(service_sel: ServiceSelectionne, zone_resume):
+    """Éditeur d'un service du projet ; seul le résumé est redessiné en dehors du fragment"""
+    uid = service_sel.uid
+    with st.expander(f"**{service_sel.service.nom}** - {format_currency(service_sel.prix_total)}", expanded=False):
+        col1, col2, col3 = st.columns([2, 2, 1])
+
+        with col1:
+            # Quantité
+            st.number_input(
+                "Quantité",
+                min_value=1,
+                value=service_sel.quantite,
+                key=f"quantite_{uid}",
+                on_change=maj_quantite,
+                args=(service_sel,)
+            )
+
+        with col2:
+            if st.session_state.mode_avance and service_sel.service.facteurs_variation:
+                # Mode avancé : sliders pour chaque facteur
+                st.write("**Facteurs de variation :**")
+                facteurs_actuels = service_sel.facteurs_custom
+                for facteur in service_sel.service.facteurs_variation:
+                    st.slider(
+                        facteur.nom,
+                        min_value=float(facteur.impact_min),
+                        max_value=float(facteur.impact_max),
+                        value=float(facteurs_actuels.get(facteur.nom, facteur.valeur_defaut)),
+                        key=f"facteur_{uid}_{facteur.nom}",
+                        help=facteur.description,
+                        on_change=maj_facteurs,
+                        args=(service_sel,)
+                    )
+
+            elif st.session_state.mode_avance and not service_sel.service.facteurs_variation:
+                # Mode avancé mais pas de facteurs : afficher un message
+                st.info("Ce service n'a pas de facteurs de variation configurés")
+
+            if not st.session_state.mode_avance or not service_sel.service.facteurs_variation:
+                # Mode simple : sélection de la complexité
+                # Gérer la compatibilité avec les anciennes valeurs de complexité
+                complexite_actuelle = service_sel.complexite
+                if complexite_actuelle not in NIVEAUX_COMPLEXITE:
+                    # Si l'ancienne complexité n'existe plus, prendre la valeur médiane
+                    complexite_actuelle = list(NIVEAUX_COMPLEXITE.keys())[len(NIVEAUX_COMPLEXITE)//2]
+
+                st.select_slider(
+                    "Complexité",
+                    options=list(NIVEAUX_COMPLEXITE.keys()),
+                    value=complexite_actuelle,
+                    key=f"complexite_{uid}",
+                    on_change=maj_complexite,
+                    args=(service_sel,)
+                )
+
+        with col3:
+            st.write(f"**Prix unitaire :**")
+            st.write(format_currency(service_sel.prix_unitaire))
+
+            if st.button("🗑️ Supprimer", key=f"suppr_{uid}"):
+                projet = st.session_state.projet_courant
+                projet.retirer_service(next(i for i, s in enumerate(projet.services) if s is service_sel))
+                st.rerun()
+
+        # Afficher les détails du service
+        st.write(f"**Livrable :** {service_sel.service.livrable}")
+        st.write(f"**Valeur client :** {service_sel.service.valeur_client}")
+
+        if service_sel.service.maintenance_applicable:
+            st.info(f"💡 Maintenance annuelle estimée : {format_currency(service_sel.maintenance_annuelle)}")
+
+    if st.session_state.pop('resume_a_rafraichir', False):
+        with zone_resume.container():
+            afficher_resume_projet()
+
+
+@st.fragment
+@perf.chronometre_fragment("fragment.ajout_service")
+def formulaire_ajout_service():
+    """Choix d'un service du catalogue ; la recherche et la catégorie ne réexécutent que ce formulaire"""
+    index = index_catalogue()
+
+    # Recherche au fil de la saisie et sélection par catégorie
+    col_recherche, col_categorie = st.columns([2, 1])
+    with col_recherche:
+        recherche = st.text_input(
+            "Rechercher un service",
+            key="recherche_service",
+            type="search",
+            live="200ms",
+            placeholder="Nom, description ou livrable…"
+        )
+    with col_categorie:
+        categorie_selectionnee = st.selectbox("Catégorie", ["Toutes"] + index.categories)
+
+    # Filtrer les services
+    services_disponibles = index.rechercher(
+        texte=recherche,
+        categorie=None if categorie_selectionnee == "Toutes" else categorie_selectionnee
+    )
+
+    # Sélection du service (libellés précalculés par l'index)
+    if not services_disponibles:
+        st.info("Aucun service ne correspond à la recherche.")
+    else:
+        service_id = st.selectbox(
+            "Service",
+            options=[s.id for s in services_disponibles],
+            format_func=index.libelles.__getitem__
+        )
+        service_selectionne = index.service(service_id)
+
+        if service_selectionne:
+            col1, col2, col3 = st.columns(3)
+
+            with col1:
+                quantite_nouveau = st.number_input("Quantité", min_value=1, value=1, key="quantite_nouveau")
+
+            with col2:
+                complexite_nouveau = st.select_slider(
+                    "Complexité",
+                    options=list(NIVEAUX_COMPLEXITE.keys()),
+                    value=list(NIVEAUX_COMPLEXITE.keys())[2],  # Prendre le 3ème élément (index 2) = niveau médian
+                    key="complexite_nouveau"
+                )
+
+            with col3:
+                if st.button("➕ Ajouter au projet", type="primary", use_container_width=True):
+                    # Initialiser les facteurs_custom avec les valeurs par défaut si le service en a
+                    facteurs_custom = {}
+                    if service_selectionne.facteurs_variation:
+                        for facteur in service_selectionne.facteurs_variation:
+                            facteurs_custom[facteur.nom] = facteur.valeur_defaut
+
+                    st.session_state.projet_courant.ajouter_service(
+                        service_selectionne,
+                        complexite=complexite_nouveau,
+                        quantite=quantite_nouveau,
+                        facteurs_custom=facteurs_custom if facteurs_custom else None
+                    )
+                    st.success(f"Service '{service_selectionne.nom}' ajouté !")
+                    # Nouvel éditeur à afficher : réexécution complète
+                    st.rerun()
+
+
+def aide_template(cle: str) -> str:
+    """Totaux précalculés d'un template, affichés au survol de son bouton"""
+    totaux = templates()[cle].totaux
+    return (f"{format_currency(totaux['total_ht'])} HT – "
+            f"maintenance {format_currency(totaux['maintenance_annuelle_ht'])}/an")
+
+
+def charger_template(cle: str, libelle: str):
+    st.session_state.projet_courant = load_template_projet(cle)
+    st.session_state.template_courant = cle
+    st.success(f"Template {libelle} chargé !")
+    st.rerun()
+
+
+def afficher_projection_template():
+    """Projection par défaut du template chargé, lue dans l'artefact précalculé"""
+    template = templates().get(st.session_state.get('template_courant'))
+    if template is None:
+        return
+    with st.expander(f"📈 Projection par défaut du template sur {PROJECTION_DEFAUT['nb_annees']} ans", expanded=False):
+        st.caption(f"Template tel que livré, seul projet de l'année 1, charges fixes par défaut, "
+                   f"croissance {format_percentage(PROJECTION_DEFAUT['taux_croissance'], 0)}/an, "
+                   f"inflation des charges {format_percentage(PROJECTION_DEFAUT['taux_inflation'])}")
+        afficher_tableau(template.projection, libelles={"Taux de marge": "Marge nette"})
+
 
 # Titre principal
 st.title(f"{APP_CONFIG['page_icon']} {APP_CONFIG['title']}")
 st.markdown("Estimez vos prix de projets et construisez vos prévisions financières")
 
 # Onglets principaux
-tabs = st.tabs(["💰 Calculateur de projet", "📈 Prévisions annuelles", "📊 Résultats & Analyses", "📄 Export"])
+tabs = st.tabs(["💰 Calculateur de projet", "📈 Prévisions annuelles", "📊 Résultats & Analyses",
+               "🏢 Consolidation", "📄 Export"])
 
 # ONGLET 1 : Calculateur de projet
 with tabs[0]:
@@ -33,35 +272,26 @@ with tabs[0]:
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        if st.button("🏢 EPCI - Projet ZAN", use_container_width=True):
-            st.session_state.projet_courant = load_template_projet("epci")
-            st.success("Template EPCI chargé !")
-            st.rerun()
+        if st.button("🏢 EPCI - Projet ZAN", use_container_width=True, help=aide_template("epci")):
+            charger_template("epci", "EPCI")
 
-        if st.button("🏘️ Commune - Vacance", use_container_width=True):
-            st.session_state.projet_courant = load_template_projet("commune")
-            st.success("Template Commune chargé !")
-            st.rerun()
+        if st.button("🏘️ Commune - Vacance", use_container_width=True, help=aide_template("commune")):
+            charger_template("commune", "Commune")
 
     with col2:
-        if st.button("🏗️ Promoteur - 300 logements", use_container_width=True):
-            st.session_state.projet_courant = load_template_projet("promoteur")
-            st.success("Template Promoteur chargé !")
-            st.rerun()
+        if st.button("🏗️ Promoteur - 300 logements", use_container_width=True, help=aide_template("promoteur")):
+            charger_template("promoteur", "Promoteur")
 
-        if st.button("🏛️ CTM - SOSTE", use_container_width=True):
-            st.session_state.projet_courant = load_template_projet("ctm")
-            st.success("Template CTM chargé !")
-            st.rerun()
+        if st.button("🏛️ CTM - SOSTE", use_container_width=True, help=aide_template("ctm")):
+            charger_template("ctm", "CTM")
 
     with col3:
-        if st.button("🌿 Association - Mangrove", use_container_width=True):
-            st.session_state.projet_courant = load_template_projet("association")
-            st.success("Template Association chargé !")
-            st.rerun()
+        if st.button("🌿 Association - Mangrove", use_container_width=True, help=aide_template("association")):
+            charger_template("association", "Association")
 
         if st.button("🆕 Nouveau projet vierge", use_container_width=True):
             st.session_state.projet_courant = Projet(nom="Nouveau projet")
+            st.session_state.pop('template_courant', None)
             st.success("Nouveau projet créé !")
             st.rerun()
 
@@ -102,165 +332,32 @@ with tabs[0]:
 
     st.divider()
 
-    # Services du projet
+    # Services du projet, ajout et résumé : emplacements réservés avant le rendu des fragments
     st.subheader("🛠️ Services du projet")
+    conteneur_services = st.container()
 
-    # Affichage des services existants
-    if st.session_state.projet_courant.services:
-        for idx, service_sel in enumerate(st.session_state.projet_courant.services):
-            with st.expander(f"**{service_sel.service.nom}** - {format_currency(service_sel.prix_total)}", expanded=False):
-                col1, col2, col3 = st.columns([2, 2, 1])
-
-                with col1:
-                    # Quantité
-                    nouvelle_quantite = st.number_input(
-                        "Quantité",
-                        min_value=1,
-                        value=service_sel.quantite,
-                        key=f"quantite_{idx}"
-                    )
-                    if nouvelle_quantite != service_sel.quantite:
-                        service_sel.quantite = nouvelle_quantite
-                        st.rerun()
-
-                with col2:
-                    if st.session_state.mode_avance and service_sel.service.facteurs_variation:
-                        # Mode avancé : sliders pour chaque facteur
-                        st.write("**Facteurs de variation :**")
-                        facteurs_modifies = False
-                        nouveaux_facteurs = {}
-
-                        for facteur in service_sel.service.facteurs_variation:
-                            valeur_actuelle = service_sel.facteurs_custom.get(facteur.nom, facteur.valeur_defaut)
-                            nouvelle_valeur = st.slider(
-                                facteur.nom,
-                                min_value=float(facteur.impact_min),
-                                max_value=float(facteur.impact_max),
-                                value=float(valeur_actuelle),
-                                key=f"facteur_{idx}_{facteur.nom}",
-                                help=facteur.description
-                            )
-                            nouveaux_facteurs[facteur.nom] = nouvelle_valeur
-                            if nouvelle_valeur != valeur_actuelle:
-                                facteurs_modifies = True
-
-                        if facteurs_modifies:
-                            service_sel.facteurs_custom = nouveaux_facteurs
-                            service_sel.prix_unitaire = service_sel.service.calculer_prix(facteurs_custom=nouveaux_facteurs)
-                            st.rerun()
-
-                    elif st.session_state.mode_avance and not service_sel.service.facteurs_variation:
-                        # Mode avancé mais pas de facteurs : afficher un message
-                        st.info("Ce service n'a pas de facteurs de variation configurés")
-
-                    if not st.session_state.mode_avance or not service_sel.service.facteurs_variation:
-                        # Mode simple : sélection de la complexité
-                        # Gérer la compatibilité avec les anciennes valeurs de complexité
-                        complexite_actuelle = service_sel.complexite
-                        if complexite_actuelle not in NIVEAUX_COMPLEXITE:
-                            # Si l'ancienne complexité n'existe plus, prendre la valeur médiane
-                            complexite_actuelle = list(NIVEAUX_COMPLEXITE.keys())[len(NIVEAUX_COMPLEXITE)//2]
-
-                        nouvelle_complexite = st.select_slider(
-                            "Complexité",
-                            options=list(NIVEAUX_COMPLEXITE.keys()),
-                            value=complexite_actuelle,
-                            key=f"complexite_{idx}"
-                        )
-                        if nouvelle_complexite != service_sel.complexite:
-                            service_sel.complexite = nouvelle_complexite
-                            service_sel.prix_unitaire = service_sel.service.calculer_prix(complexite=nouvelle_complexite)
-                            st.rerun()
-
-                with col3:
-                    st.write(f"**Prix unitaire :**")
-                    st.write(format_currency(service_sel.prix_unitaire))
-
-                    if st.button("🗑️ Supprimer", key=f"suppr_{idx}"):
-                        st.session_state.projet_courant.retirer_service(idx)
-                        st.rerun()
-
-                # Afficher les détails du service
-                st.write(f"**Livrable :** {service_sel.service.livrable}")
-                st.write(f"**Valeur client :** {service_sel.service.valeur_client}")
-
-                if service_sel.service.maintenance_applicable:
-                    st.info(f"💡 Maintenance annuelle estimée : {format_currency(service_sel.maintenance_annuelle)}")
-    else:
-        st.info("Aucun service ajouté. Utilisez le bouton ci-dessous pour ajouter des services.")
-
-    # Ajouter un nouveau service
     st.divider()
     st.subheader("➕ Ajouter un service")
+    conteneur_ajout = st.container()
 
-    # Sélection par catégorie
-    categories = list(set(s.categorie for s in st.session_state.catalogue_services.values()))
-    categorie_selectionnee = st.selectbox("Catégorie", ["Toutes"] + sorted(categories))
-
-    # Filtrer les services
-    services_disponibles = list(st.session_state.catalogue_services.values())
-    if categorie_selectionnee != "Toutes":
-        services_disponibles = [s for s in services_disponibles if s.categorie == categorie_selectionnee]
-
-    # Sélection du service
-    if services_disponibles:
-        service_selectionne = st.selectbox(
-            "Service",
-            options=services_disponibles,
-            format_func=lambda s: f"{s.nom} ({format_currency(s.prix_min)} - {format_currency(s.prix_max)})"
-        )
-
-        if service_selectionne:
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                quantite_nouveau = st.number_input("Quantité", min_value=1, value=1, key="quantite_nouveau")
-
-            with col2:
-                complexite_nouveau = st.select_slider(
-                    "Complexité",
-                    options=list(NIVEAUX_COMPLEXITE.keys()),
-                    value=list(NIVEAUX_COMPLEXITE.keys())[2],  # Prendre le 3ème élément (index 2) = niveau médian
-                    key="complexite_nouveau"
-                )
-
-            with col3:
-                if st.button("➕ Ajouter au projet", type="primary", use_container_width=True):
-                    # Initialiser les facteurs_custom avec les valeurs par défaut si le service en a
-                    facteurs_custom = {}
-                    if service_selectionne.facteurs_variation:
-                        for facteur in service_selectionne.facteurs_variation:
-                            facteurs_custom[facteur.nom] = facteur.valeur_defaut
-
-                    st.session_state.projet_courant.ajouter_service(
-                        service_selectionne,
-                        complexite=complexite_nouveau,
-                        quantite=quantite_nouveau,
-                        facteurs_custom=facteurs_custom if facteurs_custom else None
-                    )
-                    st.success(f"Service '{service_selectionne.nom}' ajouté !")
-                    st.rerun()
-
-    # Résumé du projet
     st.divider()
     st.subheader("📊 Résumé du projet")
+    zone_resume = st.empty()
 
-    col1, col2, col3, col4 = st.columns(4)
+    with conteneur_services:
+        if st.session_state.projet_courant.services:
+            for service_sel in st.session_state.projet_courant.services:
+                editeur_service(service_sel, zone_resume)
+        else:
+            st.info("Aucun service ajouté. Utilisez le bouton ci-dessous pour ajouter des services.")
 
-    with col1:
-        st.metric("Total HT", format_currency(st.session_state.projet_courant.total_ht))
+    with conteneur_ajout:
+        formulaire_ajout_service()
 
-    with col2:
-        st.metric("TVA (8,5%)", format_currency(st.session_state.projet_courant.tva))
+    with zone_resume.container():
+        afficher_resume_projet()
 
-    with col3:
-        st.metric("Total TTC", format_currency(st.session_state.projet_courant.total_ttc))
-
-    with col4:
-        if st.session_state.projet_courant.maintenance_annuelle_ht > 0:
-            st.metric("Maintenance/an", format_currency(st.session_state.projet_courant.maintenance_annuelle_ht))
-        else:
-            st.metric("Maintenance/an", "N/A")
+    afficher_projection_template()
 
 # ONGLET 2 : Prévisions annuelles
 with tabs[1]:
@@ -272,7 +369,24 @@ with tabs[2]:
     from views.resultats import render_resultats_tab
     render_resultats_tab()
 
-# ONGLET 4 : Export
+# ONGLET 4 : Consolidation multi-entités
 with tabs[3]:
+    from views.consolidation import render_consolidation_tab
+    render_consolidation_tab()
+
+# ONGLET 5 : Export
+with tabs[4]:
     from views.export import render_export_tab
     render_export_tab()
+
+# Fin de la mesure et panneaux de diagnostic (cachés : ?perf=1, ?admin=1)
+perf.fin_rerun(st.session_state)
+if perf_actif:
+    with st.sidebar:
+        from views.performance import render_perf_panel
+        render_perf_panel()
+if st.query_params.get("admin") == "1":
+    with st.sidebar:
+        from views.performance import render_memoire_panel, render_catalogue_panel
+        render_memoire_panel()
+        render_catalogue_panel()
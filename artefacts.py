@@ -0,0 +1,122 @@
+# artefacts.py
+"""Cache des documents générés (devis PDF, exports Excel), adressé par leur contenu.
+
+La clé d'un document est l'empreinte de ce qui le détermine : contenu du projet
+ou des prévisions (sans identifiant ni date de création), options d'export et
+version du code qui le produit. Les documents récents restent en mémoire,
+partagés par les sessions, et sur disque dans le cache des calculs.
+"""
+
+import functools
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import replace
+from typing import Any, Callable, Dict, Optional
+
+from cache_disque import CacheDisque, empreinte_valeur, version_code
+from config import ARTEFACTS_CONFIG, CACHE_DISQUE_CONFIG
+from models import Projet
+from taches import Tache, gestionnaire
+
+
+# Lue une fois par processus : les sources ne changent qu'au redéploiement
+_version_code = functools.lru_cache(maxsize=None)(version_code)
+
+
+def _contenu(valeur: Any) -> Any:
+    """Ce qui détermine le document : un projet dupliqué ou rechargé garde la même clé"""
+    if isinstance(valeur, Projet):
+        return replace(valeur, id="", date_creation=None)
+    return valeur
+
+
+def cle_artefact(nom: str, fonction: Callable, args: tuple, options: Dict[str, Any] = None) -> str:
+    """Empreinte du document produit par `fonction(*args)` avec ces options"""
+    # Les montants du document sont calculés par les modèles, arrondis par monnaie.py
+    contenu = (_version_code(fonction, ("models.py", "monnaie.py")), tuple(_contenu(a) for a in args), options or {})
+    return f"{nom}-{empreinte_valeur(contenu)[:32]}"
+
+
+class CacheArtefacts:
+    """Derniers documents générés : LRU en mémoire, puis disque (taille bornée)"""
+
+    def __init__(self, nb_memoire: int, disque: Optional[CacheDisque]):
+        self.nb_memoire = nb_memoire
+        self.disque = disque
+        self._verrou = threading.Lock()
+        self._memoire: OrderedDict[str, bytes] = OrderedDict()
+
+    def lire(self, cle: str) -> Optional[bytes]:
+        with self._verrou:
+            contenu = self._memoire.get(cle)
+            if contenu is not None:
+                self._memoire.move_to_end(cle)
+                return contenu
+        if self.disque is None:
+            return None
+        trouve, contenu = self.disque.lire(cle)
+        if not trouve or not isinstance(contenu, bytes):
+            return None
+        self._memoriser(cle, contenu)
+        return contenu
+
+    def _memoriser(self, cle: str, contenu: bytes):
+        with self._verrou:
+            self._memoire[cle] = contenu
+            self._memoire.move_to_end(cle)
+            while len(self._memoire) > self.nb_memoire:
+                self._memoire.popitem(last=False)
+
+    def ecrire(self, cle: str, contenu: bytes):
+        self._memoriser(cle, contenu)
+        if self.disque is not None:
+            try:
+                self.disque.ecrire(cle, contenu)
+            except OSError:
+                pass  # Disque plein ou en lecture seule : le document reste en mémoire
+
+    def __len__(self) -> int:
+        return len(self._memoire)
+
+
+_artefacts: Optional[CacheArtefacts] = None
+_verrou_artefacts = threading.Lock()
+
+
+def cache_artefacts() -> CacheArtefacts:
+    """Cache partagé par toutes les sessions du processus"""
+    global _artefacts
+    with _verrou_artefacts:
+        if _artefacts is None:
+            disque = None
+            if CACHE_DISQUE_CONFIG["repertoire"]:
+                disque = CacheDisque(
+                    os.path.join(CACHE_DISQUE_CONFIG["repertoire"], ARTEFACTS_CONFIG["sous_repertoire"]),
+                    ARTEFACTS_CONFIG["taille_max_disque_octets"],
+                    CACHE_DISQUE_CONFIG["ttl_s"]
+                )
+            _artefacts = CacheArtefacts(ARTEFACTS_CONFIG["nb_memoire"], disque)
+        return _artefacts
+
+
+def _conserver(cle: str, future: Future):
+    # Rappel du pool, dans le processus principal : seuls les documents réussis sont conservés
+    if not future.cancelled() and future.exception() is None:
+        cache_artefacts().ecrire(cle, future.result())
+
+
+def generer_artefact(nom: str, fonction: Callable, *args, options: Dict[str, Any] = None) -> Tache:
+    """Tâche produisant le document : terminée d'emblée s'il est en cache, sinon soumise au pool de processus.
+
+    `options` liste ce qui influence le document sans être un argument (date du jour…).
+    """
+    cle = cle_artefact(nom, fonction, args, options)
+    contenu = cache_artefacts().lire(cle)
+    if contenu is not None:
+        return gestionnaire().deja_calculee(nom, contenu)
+
+    tache = gestionnaire().soumettre(nom, fonction, *args, processus=True)
+    tache.future.add_done_callback(functools.partial(_conserver, cle))
+    return tache
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+"""Scripts de mesure de performance, à lancer depuis la racine du dépôt"""
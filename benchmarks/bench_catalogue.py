@@ -0,0 +1,103 @@
+# benchmarks/bench_catalogue.py
+"""Chargement d'un grand catalogue externe, détection de changement et index de recherche.
+
+Usage : python -m benchmarks.bench_catalogue [nb_services]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from data import SourceCatalogue, analyser_catalogue, FORMAT_CATALOGUE
+from index_catalogue import IndexCatalogue
+from benchmarks.donnees import GRAINE, chronometrer
+
+OBJECTIF_MS = 200
+
+
+def generer_catalogue(nb_services: int) -> bytes:
+    """Catalogue synthétique : catégories, facteurs et templates comme le catalogue livré"""
+    aleatoire = random.Random(GRAINE)
+    services = []
+    for i in range(nb_services):
+        prix_min = aleatoire.randrange(500, 20000, 500)
+        services.append({
+            "id": f"service_{i:05d}",
+            "categorie": f"Catégorie {i % 25}",
+            "nom": f"Service de mesure {i}",
+            "description": "Description du service " * 3,
+            "livrable": "Livrable documenté et recetté",
+            "valeur_client": "Gain de temps et fiabilité des données",
+            "prix_min": prix_min,
+            "prix_max": prix_min * aleatoire.choice((2, 3, 4)),
+            "maintenance_applicable": aleatoire.random() < 0.3,
+            "facteurs_variation": [
+                {"nom": f"Facteur {j}", "description": "Volume traité", "impact_min": 1,
+                 "impact_max": 10, "valeur_defaut": 3}
+                for j in range(aleatoire.randint(0, 3))
+            ]
+        })
+    templates = {
+        f"template_{k}": {
+            "nom": f"Template {k}",
+            "services": [{"service_id": s["id"], "complexite": "Moyenne", "quantite": 1}
+                         for s in aleatoire.sample(services, 8)]
+        }
+        for k in range(20)
+    }
+    return json.dumps({"format": FORMAT_CATALOGUE, "version": "mesure", "services": services,
+                       "templates": templates}, ensure_ascii=False).encode("utf-8")
+
+
+def main():
+    nb_services = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    contenu = generer_catalogue(nb_services)
+
+    with tempfile.TemporaryDirectory() as repertoire:
+        chemin = os.path.join(repertoire, "catalogue.json")
+        with open(chemin, "wb") as f:
+            f.write(contenu)
+        source = SourceCatalogue(chemin)
+
+        t_analyse = chronometrer(lambda: analyser_catalogue(contenu), repetitions=5)
+        debut = time.perf_counter()
+        catalogue = source.courant()
+        t_premier = (time.perf_counter() - debut) * 1000
+        t_inchange = chronometrer(source.courant, repetitions=1000)
+
+        def toucher():
+            os.utime(chemin, ns=(time.time_ns(), time.time_ns()))
+            source.courant()
+        t_touche = chronometrer(toucher, repetitions=5)
+
+    print(f"Catalogue de {nb_services} services ({len(contenu) / 1024:.0f} ko, {len(catalogue.templates)} templates)")
+    print(f"{'Analyse du fichier':<36}{t_analyse:>10.1f} ms")
+    print(f"{'Premier chargement (lecture + analyse)':<36}{t_premier:>10.1f} ms")
+    print(f"{'Appel sans changement (stat)':<36}{t_inchange * 1000:>10.1f} µs")
+    print(f"{'Fichier touché, contenu identique':<36}{t_touche:>10.1f} ms")
+    index = IndexCatalogue(catalogue.services, catalogue.version)
+    t_index = chronometrer(lambda: IndexCatalogue(catalogue.services, catalogue.version), repetitions=5)
+    categorie = index.categories[0]
+    requetes = {
+        "Catégorie": lambda: index.rechercher(categorie=categorie),
+        "Budget 5 000 – 8 000 €": lambda: index.rechercher(prix_min=5000, prix_max=8000),
+        "Texte « serv »": lambda: index.rechercher(texte="serv", limite=50),
+        "Texte « mesure 42 »": lambda: index.rechercher(texte="mesure 42"),
+        "Texte + catégorie + maintenance": lambda: index.rechercher(texte="livrable", categorie=categorie,
+                                                                    maintenance=True),
+        "Filtre linéaire (avant l'index)": lambda: [s for s in catalogue.services.values()
+                                                    if s.categorie == categorie],
+    }
+    print(f"{'Construction de l’index':<36}{t_index:>10.1f} ms")
+    for libelle, requete in requetes.items():
+        print(f"  {libelle:<34}{chronometrer(requete, repetitions=50) * 1000:>10.1f} µs  ({len(requete())} services)")
+
+    statut = "OK" if t_premier < OBJECTIF_MS else "LENT"
+    print(f"Objectif premier chargement < {OBJECTIF_MS} ms : {statut}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_consolidation.py
+"""Consolidation d'un groupe : 200 entités × 5 ans par défaut, avec flux intra-groupe.
+
+Usage : python -m benchmarks.bench_consolidation [nb_entites] [nb_annees]
+"""
+
+import random
+import sys
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from config import CHARGES_FIXES_DEFAUT
+from consolidation import Entite, FluxIntraGroupe, consolider
+from utils import creer_graphique_consolidation
+from benchmarks.donnees import GRAINE, creer_projets, creer_previsions, chronometrer
+
+OBJECTIF_MS = 1000
+FLUX_PAR_ENTITE = 3
+
+
+def creer_groupe(nb_entites: int, nb_annees: int):
+    """Entités de 3 à 12 projets réparties en 4 pôles, refacturations aléatoires entre elles"""
+    aleatoire = random.Random(GRAINE)
+    entites = []
+    for i in range(nb_entites):
+        previsions = creer_previsions(creer_projets(aleatoire.randint(3, 12), graine=aleatoire.getrandbits(32)))
+        previsions.generer_projections(nb_annees, aleatoire.uniform(0.0, 0.2), CHARGES_FIXES_DEFAUT)
+        entites.append(Entite(f"Entité {i:03d}", previsions, aleatoire.randint(1, 4), f"Pôle {i % 4}"))
+    flux = []
+    for _ in range(nb_entites * FLUX_PAR_ENTITE):
+        emetteur, destinataire = aleatoire.sample(entites, 2)
+        flux.append(FluxIntraGroupe(emetteur.nom, destinataire.nom, aleatoire.randint(1, nb_annees),
+                                    round(aleatoire.uniform(1000, 20000), 2)))
+    return entites, flux
+
+
+def main():
+    nb_entites = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    nb_annees = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    entites, flux = creer_groupe(nb_entites, nb_annees)
+    consolidation = consolider(entites, flux)
+
+    def graphique():
+        plt.close(creer_graphique_consolidation(consolidation))
+
+    etapes = {
+        "Consolidation (calcul)": lambda: consolider(entites, flux),
+        "Tableau consolidé": consolidation.consolide,
+        "Tableau par pôle": consolidation.par_pole,
+        "Tableau par entité": consolidation.par_entite,
+        "Graphique": graphique,
+    }
+    print(f"{nb_entites} entités × {nb_annees} ans, {len(flux)} flux intra-groupe")
+    total = 0.0
+    for libelle, etape in etapes.items():
+        duree = chronometrer(etape)
+        total += duree
+        print(f"{libelle:<28}{duree:>10.1f} ms")
+    print(f"{'Total':<28}{total:>10.1f} ms")
+    statut = "OK" if total < OBJECTIF_MS else "LENT"
+    print(f"Objectif < {OBJECTIF_MS} ms : {statut}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_index_projets.py
+"""Mesure la recherche dans l'index de la bibliothèque sur 100 000 projets.
+
+Usage : python -m benchmarks.bench_index_projets [nb_projets]
+"""
+
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from config import TYPES_CLIENTS
+from data import creer_catalogue_services
+from index_projets import IndexProjets
+from stockage import ResumeProjet
+
+OBJECTIF_MS = 50
+
+
+def generer_projets(nb_projets: int, catalogue: dict, graine: int = 42):
+    """Génère des résumés de projets et leurs lignes de services"""
+    aleatoire = random.Random(graine)
+    services = list(catalogue.values())
+    debut = datetime(2023, 1, 1)
+    for i in range(nb_projets):
+        lignes = [(s.id, s.categorie, float(aleatoire.randint(int(s.prix_min), int(s.prix_max))))
+                  for s in aleatoire.sample(services, aleatoire.randint(1, 6))]
+        yield ResumeProjet(
+            id=str(uuid.UUID(int=aleatoire.getrandbits(128))),
+            nom=f"Projet {aleatoire.choice(['ZAN', 'Vacance', 'SIG', 'Mangrove', 'Foncier'])} {i}",
+            client=f"Client {aleatoire.randint(1, 5000)}",
+            type_client=aleatoire.choice(TYPES_CLIENTS),
+            date_creation=debut + timedelta(minutes=aleatoire.randint(0, 3 * 365 * 24 * 60)),
+            total_ht=sum(m for _, _, m in lignes),
+            nb_services=len(lignes)
+        ), lignes
+
+
+def mesurer(nom: str, fonction, repetitions: int = 20):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    durees.sort()
+    mediane, pire = durees[len(durees) // 2], durees[-1]
+    statut = "OK" if pire < OBJECTIF_MS else "LENT"
+    print(f"{nom:<55} médiane {mediane:7.2f} ms  max {pire:7.2f} ms  "
+          f"({resultat.total} résultats)  {statut}")
+
+
+def main():
+    nb_projets = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    catalogue = creer_catalogue_services()
+    elements = list(generer_projets(nb_projets, catalogue))
+
+    index = IndexProjets()
+    debut = time.perf_counter()
+    index.ajouter_en_masse(elements)
+    print(f"Construction de l'index ({nb_projets} projets) : {time.perf_counter() - debut:.2f} s")
+
+    mesurer("Sans filtre, page 1", lambda: index.rechercher())
+    mesurer("Sans filtre, page 100", lambda: index.rechercher(page=100))
+    mesurer("EPCI + dashboard > 10 k€ + 2025",
+            lambda: index.rechercher(type_client="EPCI", service_id="dashboard",
+                                     montant_service_min=10000, annee=2025))
+    mesurer("Catégorie Audit + total entre 20 et 40 k€",
+            lambda: index.rechercher(categorie="Audit", total_min=20000, total_max=40000))
+    mesurer("Total HT > 50 k€", lambda: index.rechercher(total_min=50000))
+    mesurer("Préfixe 'client 12'", lambda: index.rechercher(prefixe="client 12"))
+    mesurer("Client exact", lambda: index.rechercher(client="Client 42"))
+
+    # Mises à jour incrémentales
+    resume, lignes = elements[0]
+    debut = time.perf_counter()
+    for _ in range(100):
+        index.retirer(resume.id)
+        index.ajouter(resume, lignes)
+    print(f"Retrait + ajout incrémental : {(time.perf_counter() - debut) * 10:.2f} ms par opération")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_instantane.py
+"""Compare l'instantané binaire de session à un export JSON naïf.
+
+Usage : python -m benchmarks.bench_instantane [nb_projets]
+"""
+
+import dataclasses
+import json
+import sys
+
+from config import CHARGES_FIXES_DEFAUT
+from data import creer_catalogue_services, creer_templates_projets
+from instantane import exporter_instantane, importer_instantane
+from models import PrevisionAnnuelle, Previsions
+from benchmarks.donnees import chronometrer
+
+OBJECTIF_MS = 100
+
+
+def construire_etat(nb_projets: int, catalogue: dict) -> dict:
+    """Session type : nb_projets projets en année 1 et des prévisions sur 5 ans"""
+    templates = list(creer_templates_projets(catalogue).values())
+    projets = [templates[i % len(templates)].dupliquer() for i in range(nb_projets)]
+    multiplicateurs = [1 + i % 3 for i in range(nb_projets)]
+
+    previsions = Previsions(nom_scenario="Benchmark")
+    previsions.ajouter_annee(PrevisionAnnuelle(
+        annee=1,
+        projets=[p for p, m in zip(projets, multiplicateurs) for _ in range(m)],
+        charges_fixes=CHARGES_FIXES_DEFAUT.copy()
+    ))
+    previsions.generer_projections(5, 0.12, CHARGES_FIXES_DEFAUT, 0.025)
+
+    return {
+        "projet_courant": templates[0].dupliquer(),
+        "projets_annee_1": projets,
+        "multiplicateurs": multiplicateurs,
+        "charges_fixes": CHARGES_FIXES_DEFAUT.copy(),
+        "previsions_annuelles": previsions,
+        "mode_avance": False
+    }
+
+
+def json_naif(etat: dict) -> bytes:
+    """Export JSON direct des dataclasses (catalogue embarqué dans chaque ligne)"""
+    return json.dumps({
+        cle: dataclasses.asdict(valeur) if dataclasses.is_dataclass(valeur)
+        else [dataclasses.asdict(v) for v in valeur] if isinstance(valeur, list) and valeur
+        and dataclasses.is_dataclass(valeur[0]) else valeur
+        for cle, valeur in etat.items()
+    }, default=str).encode("utf-8")
+
+
+def main():
+    nb_projets = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    catalogue = creer_catalogue_services()
+    etat = construire_etat(nb_projets, catalogue)
+
+    binaire = exporter_instantane(etat)
+    naif = json_naif(etat)
+
+    t_ecriture = chronometrer(lambda: exporter_instantane(etat), repetitions=5)
+    t_lecture = chronometrer(lambda: importer_instantane(binaire, catalogue), repetitions=5)
+    t_json_ecriture = chronometrer(lambda: json_naif(etat), repetitions=5)
+    t_json_lecture = chronometrer(lambda: json.loads(naif), repetitions=5)
+
+    print(f"Session de {nb_projets} projets")
+    print(f"{'Format':<22}{'Taille':>12}{'Écriture':>12}{'Lecture':>12}{'Aller-retour':>15}")
+    print(f"{'Instantané binaire':<22}{len(binaire) / 1024:>9.0f} ko{t_ecriture:>9.1f} ms"
+          f"{t_lecture:>9.1f} ms{t_ecriture + t_lecture:>12.1f} ms")
+    print(f"{'JSON naïf':<22}{len(naif) / 1024:>9.0f} ko{t_json_ecriture:>9.1f} ms"
+          f"{t_json_lecture:>9.1f} ms{t_json_ecriture + t_json_lecture:>12.1f} ms  (lecture sans réhydratation)")
+    statut = "OK" if t_ecriture + t_lecture < OBJECTIF_MS else "LENT"
+    print(f"Objectif aller-retour < {OBJECTIF_MS} ms : {statut}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_memoire_modeles.py
+"""Compare la mémoire des lignes de service avant / après les modèles à __slots__.
+
+Usage : python -m benchmarks.bench_memoire_modeles
+"""
+
+import gc
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict
+
+from data import creer_catalogue_services
+from models import ServiceSelectionne, Projet
+
+TAILLES = (10_000, 100_000)
+
+
+@dataclass
+class ServiceSelectionneAvant:
+    """Ancienne ligne de service : __dict__ par instance et dictionnaire de facteurs"""
+    service: object
+    complexite: str = "Moyenne"
+    facteurs_custom: Dict[str, float] = field(default_factory=dict)
+    quantite: int = 1
+    prix_unitaire: float = 0.0
+
+    def __post_init__(self):
+        if not self.facteurs_custom and self.service.facteurs_variation:
+            for facteur in self.service.facteurs_variation:
+                self.facteurs_custom[facteur.nom] = facteur.valeur_defaut
+        if self.prix_unitaire == 0:
+            self.prix_unitaire = self.service.calculer_prix(facteurs_custom=self.facteurs_custom)
+
+
+@dataclass
+class ProjetAvant:
+    """Ancien projet : __dict__ par instance"""
+    nom: str = "Nouveau projet"
+    services: list = field(default_factory=list)
+
+
+def mesurer(fabrique, nb_lignes: int) -> int:
+    """Octets alloués pour nb_lignes lignes réparties en projets de 10 lignes"""
+    gc.collect()
+    tracemalloc.start()
+    projets = fabrique(nb_lignes)
+    taille, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del projets
+    return taille
+
+
+def main():
+    catalogue = creer_catalogue_services()
+    services = list(catalogue.values())
+
+    def avant(nb_lignes):
+        projets = []
+        for i in range(0, nb_lignes, 10):
+            projet = ProjetAvant(nom=f"Projet {i}")
+            projet.services = [ServiceSelectionneAvant(services[(i + j) % len(services)]) for j in range(10)]
+            projets.append(projet)
+        return projets
+
+    def apres(nb_lignes):
+        projets = []
+        for i in range(0, nb_lignes, 10):
+            projet = Projet(nom=f"Projet {i}")
+            projet.services = [ServiceSelectionne(services[(i + j) % len(services)]) for j in range(10)]
+            projets.append(projet)
+        return projets
+
+    print(f"{'Lignes':>10}{'Avant':>14}{'Après':>14}{'Gain':>8}{'Octets/ligne':>18}")
+    for nb_lignes in TAILLES:
+        octets_avant = mesurer(avant, nb_lignes)
+        octets_apres = mesurer(apres, nb_lignes)
+        print(f"{nb_lignes:>10}{octets_avant / 2**20:>11.1f} Mo{octets_apres / 2**20:>11.1f} Mo"
+              f"{1 - octets_apres / octets_avant:>8.0%}"
+              f"{octets_avant / nb_lignes:>9.0f} → {octets_apres / nb_lignes:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_memoire_sessions.py
+"""Simule des centaines de sessions inactives et mesure la mémoire libérée par l'éviction.
+
+Usage : python -m benchmarks.bench_memoire_sessions [nb_sessions]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from config import CHARGES_FIXES_DEFAUT
+from data import creer_catalogue_services
+from instantane import exporter_instantane, etat_depuis_session
+from memoire import RegistreSessions, CLES_DERIVEES, inventaire
+from models import Previsions, PrevisionAnnuelle
+from benchmarks.donnees import creer_projet, creer_projets
+
+DELAI_INACTIVITE_S = 15 * 60
+
+
+class EtatSimule(dict):
+    """État de session simulé (un dict ne peut pas être référencé faiblement)"""
+
+
+def creer_session(numero: int) -> EtatSimule:
+    """Reproduit le contenu d'une session après quelques minutes d'utilisation"""
+    catalogue = creer_catalogue_services()
+    etat = EtatSimule(
+        catalogue_services=catalogue,
+        projet_courant=creer_projet(20, catalogue, graine=numero),
+        projets_annee_1=creer_projets(10, catalogue, graine=numero),
+        charges_fixes=dict(CHARGES_FIXES_DEFAUT),
+        mode_avance=False,
+        initialized=True
+    )
+    previsions = Previsions(nom_scenario="Simulation")
+    previsions.ajouter_annee(PrevisionAnnuelle(annee=1, projets=etat["projets_annee_1"],
+                                               charges_fixes=dict(CHARGES_FIXES_DEFAUT)))
+    previsions.generer_projections(5, 0.10, CHARGES_FIXES_DEFAUT)
+    etat["previsions_annuelles"] = previsions
+    etat["instantane_session"] = exporter_instantane(etat_depuis_session(etat), compresser=False)
+    return etat
+
+
+def memoire_allouee() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def main():
+    nb_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    tracemalloc.start()
+    base = memoire_allouee()
+
+    sessions = [creer_session(i) for i in range(nb_sessions)]
+    apres_creation = memoire_allouee()
+
+    # Les trois quarts des sessions ont été vues il y a plus de 15 minutes
+    registre = RegistreSessions(budget_octets=1 << 30, delai_inactivite_s=DELAI_INACTIVITE_S,
+                                intervalle_mesure_s=float('inf'))
+    maintenant = 100_000.0
+    for i, etat in enumerate(sessions):
+        derniere_activite = maintenant - (DELAI_INACTIVITE_S + 60 if i % 4 else 30)
+        registre.suivre(f"session-{i}", etat, maintenant=derniere_activite)
+
+    debut = time.perf_counter()
+    nb_inactives = registre.evincer_inactives(maintenant)
+    duree_eviction = (time.perf_counter() - debut) * 1000
+    apres_eviction = memoire_allouee()
+    tracemalloc.stop()
+
+    # Inventaire hors tracemalloc, qui ralentit fortement le parcours des objets
+    debut = time.perf_counter()
+    tailles = [inventaire(etat) for etat in sessions]
+    duree_inventaire = (time.perf_counter() - debut) * 1000
+    total = sum(sum(t.values()) for t in tailles)
+
+    restantes = sum(1 for etat in sessions for cle in CLES_DERIVEES if cle in etat)
+    par_session = (apres_creation - base) / nb_sessions
+    print(f"{nb_sessions} sessions simulées : {(apres_creation - base) / 2**20:.1f} Mo "
+          f"({par_session / 1024:.0f} Ko par session)")
+    print(f"Inventaire : {duree_inventaire / nb_sessions:.2f} ms par session, "
+          f"{total / 2**20:.1f} Mo attribués après éviction")
+    print(f"Éviction : {nb_inactives} sessions inactives allégées en {duree_eviction:.1f} ms, "
+          f"{(apres_creation - apres_eviction) / 2**20:.1f} Mo libérés "
+          f"({(apres_creation - apres_eviction) / (apres_creation - base):.0%}), "
+          f"{restantes} clés dérivées restantes (sessions actives)")
+
+    # Budget : une session au-delà du budget perd ses clés dérivées dès sa mesure
+    petit_budget = RegistreSessions(budget_octets=sum(tailles[0].values()) // 2,
+                                    delai_inactivite_s=DELAI_INACTIVITE_S, intervalle_mesure_s=0)
+    etat = creer_session(nb_sessions)
+    suivi = petit_budget.suivre("session-budget", etat, maintenant=maintenant)
+    print(f"Budget de {petit_budget.budget_octets / 1024:.0f} Ko : {petit_budget.nb_evictions} clés évincées, "
+          f"{suivi.total / 1024:.0f} Ko conservés ({', '.join(sorted(etat))})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_monnaie.py
+"""Centimes entiers contre flottants : durée et exactitude des totaux de devis et des projections par lot.
+
+Usage : python -m benchmarks.bench_monnaie [nb_devis]
+"""
+
+import sys
+
+import numpy as np
+
+from config import TAUX_TVA, TAUX_IS
+from monnaie import en_centimes, en_euros, calculer_tva, appliquer_facteur, impot_societes
+from benchmarks.donnees import GRAINE, chronometrer
+
+LIGNES_PAR_DEVIS = 8
+NB_ANNEES = 10
+OBJECTIF_RATIO = 2.0  # Chemin entier au plus deux fois plus lent que le chemin flottant
+
+
+def generer_lignes(nb_devis: int):
+    """Lignes de devis groupées par devis : prix issus des facteurs (non ronds), quantités 1 à 5"""
+    generateur = np.random.default_rng(GRAINE)
+    prix = generateur.uniform(500, 25000, nb_devis * LIGNES_PAR_DEVIS)
+    prix[::3] = np.round(prix[::3] / 3, 2) * 3 + 1 / 3  # Tiers de centime, comme les facteurs moyennés
+    quantites = generateur.integers(1, 6, nb_devis * LIGNES_PAR_DEVIS)
+    debuts = np.arange(0, nb_devis * LIGNES_PAR_DEVIS, LIGNES_PAR_DEVIS)
+    return prix, quantites, debuts
+
+
+def totaux_flottants(prix, quantites, debuts):
+    ht = np.add.reduceat(prix * quantites, debuts)
+    tva = ht * TAUX_TVA
+    return ht, tva, ht + tva
+
+
+def totaux_centimes(prix, quantites, debuts):
+    ht = np.add.reduceat(en_centimes(prix) * quantites, debuts)
+    tva = calculer_tva(ht, TAUX_TVA)
+    return ht, tva, ht + tva
+
+
+def projections_flottantes(ca, charges, croissance):
+    facteurs = (1 + croissance[:, None]) ** np.arange(NB_ANNEES)[None, :]
+    brut = ca[:, None] * facteurs - charges
+    return brut - np.maximum(0.0, brut * TAUX_IS)
+
+
+def projections_centimes(ca, charges, croissance):
+    facteurs = (1 + croissance[:, None]) ** np.arange(NB_ANNEES)[None, :]
+    brut = appliquer_facteur(ca[:, None], facteurs) - charges
+    return brut - impot_societes(brut, TAUX_IS)
+
+
+def main():
+    nb_devis = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    prix, quantites, debuts = generer_lignes(nb_devis)
+
+    t_float = chronometrer(lambda: totaux_flottants(prix, quantites, debuts), repetitions=5)
+    t_cent = chronometrer(lambda: totaux_centimes(prix, quantites, debuts), repetitions=5)
+
+    # Devis dont le TTC affiché (arrondi au centime) n'est pas la somme du HT et de la TVA affichés
+    ht_f, tva_f, ttc_f = totaux_flottants(prix, quantites, debuts)
+    ecarts_float = int(np.count_nonzero(en_centimes(ttc_f) != en_centimes(ht_f) + en_centimes(tva_f)))
+    ht_c, tva_c, ttc_c = totaux_centimes(prix, quantites, debuts)
+    ecarts_cent = int(np.count_nonzero(ttc_c != ht_c + tva_c))
+    ecart_max = float(np.max(np.abs(en_euros(ttc_c) - ttc_f)))
+
+    generateur = np.random.default_rng(GRAINE)
+    ca_euros = np.add.reduceat(prix * quantites, debuts)
+    croissance = generateur.uniform(0.0, 0.2, nb_devis)
+    charges_euros = 9000.0 * (1.02 ** np.arange(NB_ANNEES))
+    ca_centimes, charges_centimes = en_centimes(ca_euros), en_centimes(charges_euros)
+    t_proj_float = chronometrer(lambda: projections_flottantes(ca_euros, charges_euros, croissance), repetitions=5)
+    t_proj_cent = chronometrer(lambda: projections_centimes(ca_centimes, charges_centimes, croissance), repetitions=5)
+
+    print(f"{nb_devis} devis de {LIGNES_PAR_DEVIS} lignes, {nb_devis} scénarios sur {NB_ANNEES} ans")
+    print(f"{'':<30}{'Flottants':>12}{'Centimes':>12}{'Ratio':>8}")
+    lent = False
+    for libelle, t_f, t_c in (("Totaux HT / TVA / TTC", t_float, t_cent),
+                              ("Projections (CA, IS, net)", t_proj_float, t_proj_cent)):
+        ratio = t_c / t_f
+        lent |= ratio > OBJECTIF_RATIO
+        print(f"{libelle:<30}{t_f:>9.1f} ms{t_c:>9.1f} ms{ratio:>7.2f}x")
+    print(f"Devis où TTC ≠ HT + TVA au centime : {ecarts_float} en flottants, {ecarts_cent} en centimes")
+    print(f"Écart maximal entre les deux TTC : {ecart_max:.4f} €")
+    statut = "LENT" if lent else "OK"
+    print(f"Objectif centimes < {OBJECTIF_RATIO:g}x flottants : {statut}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# benchmarks/bench_pdf_devis.py
+"""Mise en page des devis longs : durée, nombre de pages et taille pour 10, 100 et 1 000 lignes.
+
+Usage : python -m benchmarks.bench_pdf_devis [nb_lignes ...]
+"""
+
+import re
+import sys
+
+from benchmarks.donnees import creer_projet, chronometrer
+from utils import generer_pdf_devis
+
+TAILLES_DEFAUT = (10, 100, 1000)
+OBJECTIF_MS_PAR_LIGNE = 0.5
+
+
+def nb_pages(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b", pdf))
+
+
+def main():
+    tailles = [int(n) for n in sys.argv[1:]] or TAILLES_DEFAUT
+    generer_pdf_devis(creer_projet(1))  # Styles et polices chargés une fois, hors mesure
+
+    print(f"{'Lignes':>8}{'Durée':>12}{'ms/ligne':>10}{'Pages':>8}{'Taille':>10}")
+    lent = False
+    for nb_lignes in tailles:
+        projet = creer_projet(nb_lignes)
+        pdf = generer_pdf_devis(projet)
+        duree = chronometrer(lambda: generer_pdf_devis(projet))
+        par_ligne = duree / nb_lignes
+        lent |= par_ligne > OBJECTIF_MS_PAR_LIGNE and nb_lignes >= 100
+        print(f"{nb_lignes:>8}{duree:>9.1f} ms{par_ligne:>10.2f}{nb_pages(pdf):>8}{len(pdf) / 1024:>7.0f} ko")
+    statut = "LENT" if lent else "OK"
+    print(f"Objectif < {OBJECTIF_MS_PAR_LIGNE} ms par ligne à partir de 100 lignes : {statut}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_pipeline.py
+"""Import d'un export CRM de 50 000 opportunités et calcul du CA attendu par année.
+
+Usage : python -m benchmarks.bench_pipeline [nb_opportunites]
+"""
+
+import csv
+import io
+import random
+import sys
+
+import numpy as np
+
+from config import TYPES_CLIENTS, PROBABILITES_ETAPES
+from data import creer_catalogue_services
+from pipeline import importer_crm
+from benchmarks.donnees import GRAINE, chronometrer
+
+OBJECTIF_MS = 5000
+ANNEE_DEBUT = 2026
+
+
+def generer_export(nb_opportunites: int, graine: int = GRAINE) -> bytes:
+    """Export CRM au format français : « ; », montants « 12 500,00 € », probabilités « 40 % », dates jj/mm/aaaa.
+
+    Une partie des lignes n'a ni montant ni probabilité (déduits du catalogue et de l'étape),
+    quelques-unes citent un service hors catalogue.
+    """
+    aleatoire = random.Random(graine)
+    noms = [s.nom for s in creer_catalogue_services().values()]
+    etapes = list(PROBABILITES_ETAPES)
+    sortie = io.StringIO()
+    ecrivain = csv.writer(sortie, delimiter=";")
+    ecrivain.writerow(["Identifiant", "Client", "Type de client", "Services", "Montant HT",
+                       "Étape", "Probabilité", "Date de clôture"])
+    for i in range(nb_opportunites):
+        services = aleatoire.sample(noms, aleatoire.randint(1, 3))
+        if aleatoire.random() < 0.02:
+            services.append("Formation QGIS")
+        montant = "" if aleatoire.random() < 0.1 else \
+            f"{aleatoire.uniform(3000, 80000):,.2f} €".replace(",", " ").replace(".", ",")
+        etape = aleatoire.choice(etapes)
+        # Probabilité saisie proche de celle de l'étape, ou laissée vide
+        ecart = aleatoire.randint(-10, 10)
+        probabilite = "" if aleatoire.random() < 0.3 else \
+            f"{min(max(round(PROBABILITES_ETAPES[etape] * 100) + ecart, 0), 100)} %"
+        cloture = f"{aleatoire.randint(1, 28):02d}/{aleatoire.randint(1, 12):02d}/{ANNEE_DEBUT + aleatoire.randint(0, 2)}"
+        ecrivain.writerow([f"OPP-{i:06d}", f"Client {aleatoire.randint(1, 5000)}", aleatoire.choice(TYPES_CLIENTS),
+                           " | ".join(services), montant, etape, probabilite, cloture])
+    return sortie.getvalue().encode("utf-8")
+
+
+def verifier_probabilites(catalogue) -> bool:
+    """Échelle des probabilités : fractions mêlées de cellules vides, puis début d'export sans probabilité"""
+    service = next(iter(catalogue.values())).nom
+    etape = next(iter(PROBABILITES_ETAPES))
+    entete = "Services;Montant HT;Étape;Probabilité;Année\n"
+
+    def probabilites(lignes, taille_lot):
+        contenu = (entete + "".join(f"{service};1000;{etape};{p};{ANNEE_DEBUT}\n" for p in lignes)).encode()
+        return importer_crm(contenu, "export.csv", catalogue, taille_lot=taille_lot).probabilites
+
+    fractions = probabilites(["0,4", "", "0,9"], 10)
+    vides_puis_pourcentages = probabilites(["", "", "40", "90"], 2)
+    return (np.allclose(fractions, [0.4, PROBABILITES_ETAPES[etape], 0.9])
+            and np.allclose(vides_puis_pourcentages, [PROBABILITES_ETAPES[etape]] * 2 + [0.4, 0.9]))
+
+
+def main():
+    nb_opportunites = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    catalogue = creer_catalogue_services()
+    contenu = generer_export(nb_opportunites)
+    pipeline = importer_crm(contenu, "export.csv", catalogue)
+
+    etapes = {
+        "Import (lecture, services, lots)": lambda: importer_crm(contenu, "export.csv", catalogue),
+        "CA attendu par année": pipeline.attendu_par_annee,
+        "Tableau par étape": pipeline.par_etape,
+        "Projets de l'année 1": lambda: pipeline.vers_projets(ANNEE_DEBUT),
+    }
+    rapport = pipeline.rapport
+    print(f"{nb_opportunites} opportunités ({len(contenu) / 1e6:.1f} Mo), {len(pipeline.ligne_service)} lignes "
+          f"opportunité × service, {rapport.nb_rejetees} rejetées")
+    total = 0.0
+    for libelle, etape in etapes.items():
+        duree = chronometrer(etape)
+        total += duree
+        print(f"{libelle:<34}{duree:>10.1f} ms")
+    print(f"{'Total':<34}{total:>10.1f} ms")
+    probabilites_ok = verifier_probabilites(catalogue)
+    print(f"{'Échelle des probabilités':<34}{'exacte' if probabilites_ok else 'FAUSSE':>13}")
+    statut = "OK" if total < OBJECTIF_MS and probabilites_ok else "LENT"
+    print(f"Objectif < {OBJECTIF_MS} ms, probabilités exactes : {statut}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_quantiles.py
+"""Simulation stochastique par lots : durée, mémoire de pointe et exactitude des esquisses de quantiles.
+
+Usage : python -m benchmarks.bench_quantiles [nb_chemins_max]
+"""
+
+import sys
+import tracemalloc
+
+import numpy as np
+
+from config import CHARGES_FIXES_DEFAUT, SIMULATION_STOCHASTIQUE
+from quantiles import EsquisseQuantiles
+from simulation import parametres_depuis_previsions, simuler
+from benchmarks.donnees import GRAINE, creer_projets, creer_previsions, chronometrer
+
+NB_ANNEES = 5
+OBJECTIF_MS = 10_000          # Simulation du plus grand nombre de chemins, un seul processus
+OBJECTIF_MEMOIRE = 1.5        # Pic mémoire au plus grand nombre / pic au premier lot complet
+OBJECTIF_ERREUR_RANG = 0.002  # Écart maximal entre rang visé et rang obtenu
+QUANTILES = (0.001, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 0.999)
+
+
+def pic_memoire(fonction) -> int:
+    tracemalloc.start()
+    try:
+        fonction()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def erreur_rang(valeurs_triees: np.ndarray, estimations: np.ndarray) -> float:
+    rangs = np.searchsorted(valeurs_triees, estimations) / len(valeurs_triees)
+    return float(np.max(np.abs(rangs - np.asarray(QUANTILES))))
+
+
+def exactitude(nb_valeurs: int, taille_lot: int):
+    """Esquisse alimentée lot par lot, et esquisses de lots fusionnées (comme entre processus)"""
+    generateur = np.random.default_rng(GRAINE)
+    valeurs = generateur.lognormal(0.0, 0.6, nb_valeurs) * 1e5 - 3e4  # Asymétrique, avec des pertes
+    sequentielle = EsquisseQuantiles((1,))
+    fusionnee = EsquisseQuantiles((1,))
+    for debut in range(0, nb_valeurs, taille_lot):
+        lot = valeurs[debut:debut + taille_lot, None]
+        sequentielle.ajouter(lot)
+        fusionnee.fusionner(EsquisseQuantiles((1,)).ajouter(lot))
+    triees = np.sort(valeurs)
+    return (erreur_rang(triees, sequentielle.quantiles(QUANTILES)[0]),
+            erreur_rang(triees, fusionnee.quantiles(QUANTILES)[0]),
+            sequentielle.nb_centroides_max)
+
+
+def main():
+    nb_max = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    previsions = creer_previsions(creer_projets(8))
+    previsions.generer_projections(NB_ANNEES, 0.1, CHARGES_FIXES_DEFAUT)
+    parametres = parametres_depuis_previsions(previsions, 2)
+    tailles = [n for n in (10_000, 100_000, 1_000_000, 10_000_000) if n <= nb_max]
+
+    print(f"{NB_ANNEES} ans × 9 métriques, lots de {SIMULATION_STOCHASTIQUE['taille_lot']} chemins")
+    print(f"{'Chemins':>12}{'Durée':>12}{'Pic mémoire':>14}{'Esquisse':>12}")
+    pics, duree = [], 0.0
+    for n in tailles:
+        duree = chronometrer(lambda: simuler(parametres, n), repetitions=1)
+        pics.append(pic_memoire(lambda: simuler(parametres, n)))
+        octets = simuler(parametres, min(n, 10_000)).esquisse.octets
+        print(f"{n:>12}{duree:>9.0f} ms{pics[-1] / 1e6:>11.1f} Mo{octets / 1e3:>9.0f} ko")
+
+    erreur_seq, erreur_fus, nb_centroides = exactitude(nb_max, SIMULATION_STOCHASTIQUE["taille_lot"])
+    print(f"Erreur de rang sur {len(QUANTILES)} quantiles (P0,1 à P99,9), {nb_max} valeurs, "
+          f"≤ {nb_centroides} centroïdes :")
+    print(f"{'  lots ajoutés à une esquisse':<34}{erreur_seq:>10.5f}")
+    print(f"{'  esquisses de lots fusionnées':<34}{erreur_fus:>10.5f}")
+
+    # Au-delà d'un lot complet, la mémoire ne doit plus dépendre du nombre de chemins
+    reference = next((i for i, n in enumerate(tailles) if n >= SIMULATION_STOCHASTIQUE["taille_lot"]), 0)
+    ratio = pics[-1] / pics[reference]
+    statut = ("OK" if duree < OBJECTIF_MS and ratio < OBJECTIF_MEMOIRE
+              and max(erreur_seq, erreur_fus) < OBJECTIF_ERREUR_RANG else "LENT")
+    print(f"Objectif < {OBJECTIF_MS} ms à {tailles[-1]} chemins, pic mémoire ×{ratio:.2f} "
+          f"(< ×{OBJECTIF_MEMOIRE:g}), erreur de rang < {OBJECTIF_ERREUR_RANG:g} : {statut}")
+
+
+if __name__ == "__main__":
+    main()
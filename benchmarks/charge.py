@@ -0,0 +1,287 @@
+# benchmarks/charge.py
+"""Test de charge sans navigateur : N sessions simultanées pilotées par l'API de test Streamlit.
+
+Chaque session rejoue un parcours réaliste (template, réglage des services,
+prévisions, devis PDF pour app.py ; paramètres et scénario pour calculateur.py).
+Le rapport donne les percentiles de latence des exécutions, le CPU et la
+mémoire résidente pour chaque nombre de sessions. Chaque session tourne dans
+son propre processus : --coeurs les restreint au quota CPU du conteneur.
+
+Les sessions sont donc isolées par processus, contrairement au serveur où elles
+partagent caches et bibliothèques : la mémoire est rapportée par processus
+(pic du plus gros, pic moyen) et non additionnée, ce qui compterait autant de
+fois les pages partagées qu'il y a de sessions.
+
+Usage :
+    python -m benchmarks.charge --sessions 1,4,8 --sortie avant.json
+    python -m benchmarks.charge --script calculateur --iterations 3 --coeurs 0,1
+    python -m benchmarks.charge --comparer avant.json apres.json
+
+Pour comparer deux versions du code, lancer le test dans chaque version
+(par exemple via `git worktree add ../calculateur-avant <commit>`) puis --comparer.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from streamlit.testing.v1 import AppTest
+
+from memoire import memoire_processus
+from taches import gestionnaire
+
+RACINE = Path(__file__).resolve().parent.parent
+DELAI_EXECUTION_S = 120
+
+Etape = Tuple[str, Callable[[AppTest], None]]
+
+
+def _bouton(at: AppTest, libelle: str):
+    return next(b for b in at.button if libelle in b.label)
+
+
+def _regler_quantite(at: AppTest):
+    champ = next(n for n in at.number_input
+                 if n.key and n.key.startswith("quantite_") and n.key != "quantite_nouveau")
+    champ.set_value(champ.value + 1)
+
+
+def _regler_complexite(at: AppTest):
+    curseur = next(s for s in at.select_slider if s.key and s.key.startswith("complexite_")
+                   and s.key != "complexite_nouveau")
+    curseur.set_value("Avancé")
+
+
+def _generer_devis(at: AppTest):
+    """Demande le devis puis attend la fin de sa génération dans le pool de processus"""
+    _bouton(at, "Générer le devis PDF").click()
+    at.run()
+    tache = gestionnaire().tache(at.session_state["tache_devis_pdf"])
+    limite = time.perf_counter() + DELAI_EXECUTION_S
+    while not tache.terminee:
+        if time.perf_counter() > limite:
+            raise RuntimeError("génération du devis trop longue")
+        time.sleep(0.05)
+    if tache.erreur:
+        raise RuntimeError(tache.erreur)
+
+
+def _regler_fondateurs(at: AppTest):
+    next(n for n in at.number_input if n.label.startswith("Nombre de fondateurs")).set_value(3)
+    _bouton(at, "Appliquer").click()
+
+
+PARCOURS: Dict[str, Tuple[str, List[Etape]]] = {
+    "app": ("app.py", [
+        ("template", lambda at: _bouton(at, "EPCI").click()),
+        ("quantite", _regler_quantite),
+        ("complexite", _regler_complexite),
+        ("ajout_previsions", lambda at: _bouton(at, "Ajouter le projet en cours").click()),
+        ("generer_previsions", lambda at: _bouton(at, "Générer les prévisions").click()),
+        ("devis_pdf", _generer_devis),
+    ]),
+    "calculateur": ("calculateur.py", [
+        ("activite", lambda at: next(n for n in at.number_input if n.label.startswith("Audit SIG")).set_value(4)),
+        ("parametres", _regler_fondateurs),
+        ("scenario", lambda at: at.selectbox[0].set_value("Croissance forte")),
+        ("personnalise", lambda at: at.selectbox[0].set_value("Personnalisé")),
+    ]),
+}
+
+
+def percentile(valeurs: List[float], rang: float) -> float:
+    """Percentile par interpolation linéaire (rang entre 0 et 100)"""
+    if not valeurs:
+        return 0.0
+    valeurs = sorted(valeurs)
+    position = (len(valeurs) - 1) * rang / 100
+    bas = int(position)
+    haut = min(bas + 1, len(valeurs) - 1)
+    return valeurs[bas] + (valeurs[haut] - valeurs[bas]) * (position - bas)
+
+
+def _rss_max() -> int:
+    """Pic de mémoire résidente du processus en octets"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def session(script: str, iterations: int, coeurs: List[int], depart, file_resultats):
+    """Une session dans son propre processus : ouverture puis `iterations` fois le parcours"""
+    if coeurs:
+        os.sched_setaffinity(0, coeurs)
+    fichier, etapes = PARCOURS[script]
+    at = AppTest.from_file(str(RACINE / fichier), default_timeout=DELAI_EXECUTION_S)
+    mesures: List[Tuple[str, float]] = []
+    erreurs: List[str] = []
+    rss_initial = memoire_processus()
+    depart.wait()
+    cpu_debut = time.process_time()
+
+    def executer(nom: str, debut: float = None):
+        # Latence de l'étape : action comprise (le devis attend la fin de sa génération)
+        debut = debut or time.perf_counter()
+        at.run()
+        mesures.append((nom, (time.perf_counter() - debut) * 1000))
+        erreurs.extend(f"{nom} : {e.value}" for e in at.exception)
+
+    try:
+        executer("ouverture")
+        for _ in range(iterations):
+            for nom, action in etapes:
+                debut = time.perf_counter()
+                try:
+                    action(at)
+                except StopIteration:
+                    erreurs.append(f"{nom} : élément introuvable")
+                    continue
+                except RuntimeError as e:
+                    erreurs.append(f"{nom} : {e}")
+                    continue
+                executer(nom, debut)
+    except Exception as e:  # Une session en échec ne doit pas bloquer le test
+        erreurs.append(f"{type(e).__name__} : {e}")
+    file_resultats.put((mesures, erreurs, time.process_time() - cpu_debut,
+                        _rss_max(), max(0, _rss_max() - rss_initial)))
+    # Pool de processus arrêté avant la sortie : ses ouvriers ne survivent pas à leurs sémaphores
+    gestionnaire().arreter()
+
+
+def mesurer_charge(script: str, nb_sessions: int, iterations: int, coeurs: List[int] = None) -> dict:
+    """Lance `nb_sessions` sessions simultanées et agrège leurs mesures.
+
+    L'API de test de Streamlit n'étant pas utilisable depuis plusieurs threads,
+    chaque session tourne dans un processus ; `coeurs` restreint l'ensemble des
+    processus aux mêmes cœurs, comme le quota CPU d'un conteneur.
+    """
+    contexte = multiprocessing.get_context("spawn")
+    depart = contexte.Barrier(nb_sessions + 1)
+    file_resultats = contexte.Queue()
+    processus = [contexte.Process(target=session, args=(script, iterations, coeurs or [], depart, file_resultats))
+                 for _ in range(nb_sessions)]
+    for p in processus:
+        p.start()
+
+    depart.wait()
+    debut = time.perf_counter()
+    retours = [file_resultats.get() for _ in processus]
+    duree = time.perf_counter() - debut
+    for p in processus:
+        p.join()
+
+    mesures = [m for retour in retours for m in retour[0]]
+    erreurs = [e for retour in retours for e in retour[1]]
+    cpu = sum(retour[2] for retour in retours)
+    latences = [ms for _, ms in mesures]
+    par_etape: Dict[str, List[float]] = {}
+    for nom, ms in mesures:
+        par_etape.setdefault(nom, []).append(ms)
+    return {
+        "sessions": nb_sessions,
+        "executions": len(latences),
+        "erreurs": len(erreurs),
+        "exemples_erreurs": erreurs[:5],
+        "latence_ms": {
+            "p50": round(percentile(latences, 50), 1),
+            "p90": round(percentile(latences, 90), 1),
+            "p99": round(percentile(latences, 99), 1),
+            "max": round(max(latences, default=0.0), 1)
+        },
+        "p50_par_etape_ms": {nom: round(statistics.median(v), 1) for nom, v in par_etape.items()},
+        "debit_executions_s": round(len(latences) / duree, 2) if duree else 0.0,
+        "cpu_pct": round(100 * cpu / duree, 1) if duree else 0.0,
+        "rss_processus_max_mo": round(max(retour[3] for retour in retours) / 2**20, 1),
+        "rss_processus_moyen_mo": round(statistics.mean(retour[3] for retour in retours) / 2**20, 1),
+        "rss_session_mo": round(statistics.mean(retour[4] for retour in retours) / 2**20, 1)
+    }
+
+
+def version_code() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=RACINE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnue"
+
+
+def afficher(resultat: dict):
+    latence = resultat["latence_ms"]
+    print(f"{resultat['sessions']:>8}{resultat['executions']:>8}{latence['p50']:>10.0f}{latence['p90']:>10.0f}"
+          f"{latence['p99']:>10.0f}{resultat['debit_executions_s']:>10.1f}{resultat['cpu_pct']:>8.0f}%"
+          f"{resultat['rss_processus_max_mo']:>12.0f}{resultat['rss_session_mo']:>10.1f}{resultat['erreurs']:>8}")
+
+
+def comparer(chemin_avant: Path, chemin_apres: Path):
+    """Affiche l'évolution des latences, du CPU et de la mémoire entre deux rapports"""
+    avant, apres = (json.loads(Path(c).read_text(encoding="utf-8")) for c in (chemin_avant, chemin_apres))
+    print(f"Script {avant['script']} : {avant['version']} → {apres['version']}\n")
+    print(f"{'Sessions':>8}{'p50 (ms)':>22}{'p90 (ms)':>22}{'p99 (ms)':>22}{'CPU':>16}{'RSS/processus (Mo)':>22}")
+    apres_par_n = {r["sessions"]: r for r in apres["resultats"]}
+
+    def evolution(a: float, b: float) -> str:
+        return f"{a:.0f} → {b:.0f} ({(b / a - 1) * 100:+.0f} %)" if a else f"{a:.0f} → {b:.0f}"
+
+    for r_avant in avant["resultats"]:
+        r_apres = apres_par_n.get(r_avant["sessions"])
+        if r_apres is None:
+            continue
+        la, lb = r_avant["latence_ms"], r_apres["latence_ms"]
+        print(f"{r_avant['sessions']:>8}{evolution(la['p50'], lb['p50']):>22}{evolution(la['p90'], lb['p90']):>22}"
+              f"{evolution(la['p99'], lb['p99']):>22}{r_avant['cpu_pct']:>7.0f}% → {r_apres['cpu_pct']:.0f}%"
+              f"{evolution(r_avant.get('rss_processus_max_mo', 0.0), r_apres.get('rss_processus_max_mo', 0.0)):>22}")
+
+
+def main(arguments: List[str] = None) -> int:
+    parseur = argparse.ArgumentParser(description="Test de charge du calculateur Caribo")
+    parseur.add_argument("--script", choices=sorted(PARCOURS), default="app")
+    parseur.add_argument("--sessions", default="1,4,8",
+                         help="nombres de sessions simultanées, séparés par des virgules")
+    parseur.add_argument("--iterations", type=int, default=2, help="répétitions du parcours par session")
+    parseur.add_argument("--coeurs", help="cœurs CPU autorisés (ex. 0,1), comme le quota du conteneur")
+    parseur.add_argument("--sortie", type=Path, help="fichier JSON du rapport")
+    parseur.add_argument("--comparer", nargs=2, type=Path, metavar=("AVANT", "APRES"),
+                         help="compare deux rapports JSON au lieu de lancer le test")
+    args = parseur.parse_args(arguments)
+
+    if args.comparer:
+        comparer(*args.comparer)
+        return 0
+
+    print(f"{'Sessions':>8}{'Exéc.':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'Exéc./s':>10}"
+          f"{'CPU':>9}{'RSS/proc.':>12}{'Mo/sess.':>10}{'Erreurs':>8}")
+    print("Un processus par session : RSS du plus gros processus, Mo/sess. = croissance pendant le parcours")
+    resultats = []
+    for nb_sessions in (int(n) for n in args.sessions.split(",")):
+        coeurs = [int(c) for c in args.coeurs.split(",")] if args.coeurs else None
+        resultat = mesurer_charge(args.script, nb_sessions, args.iterations, coeurs)
+        afficher(resultat)
+        resultats.append(resultat)
+
+    erreurs = [e for r in resultats for e in r["exemples_erreurs"]]
+    for erreur in erreurs[:5]:
+        print(f"  ⚠️ {erreur}")
+
+    if args.sortie:
+        args.sortie.write_text(json.dumps({
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "version": version_code(),
+            "script": args.script,
+            "isolation": "processus",
+            "iterations": args.iterations,
+            "coeurs": args.coeurs,
+            "resultats": resultats
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nRapport écrit : {args.sortie}")
+    return 1 if erreurs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# benchmarks/donnees.py
+"""Jeux de données synthétiques et reproductibles pour les mesures de performance"""
+
+import random
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from config import TYPES_CLIENTS, NIVEAUX_COMPLEXITE, CHARGES_FIXES_DEFAUT
+from data import creer_catalogue_services
+from models import Service, Projet, PrevisionAnnuelle, Previsions
+
+GRAINE = 42
+
+# Catalogue du calculateur autonome (mêmes valeurs que calculateur.py)
+SERVICES_CALCULATEUR = {
+    "audit_sig": {"label": "Audit SIG", "prix_unitaire": 3500},
+    "bdd_spatiale": {"label": "BDD Spatiale", "prix_unitaire": 5000},
+    "dashboard": {"label": "Dashboard", "prix_unitaire": 4000},
+    "jours_conseil": {"label": "Jours de conseil (TJM 1100 €)", "prix_unitaire": 1100},
+    "formations": {"label": "Formations", "prix_unitaire": 2000},
+    "projets_sur_mesure": {"label": "Projets sur mesure", "prix_unitaire": 20000},
+}
+
+
+def chronometrer(fonction, repetitions: int = 3) -> float:
+    """Meilleure durée de `repetitions` appels, en millisecondes"""
+    meilleur = float('inf')
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur * 1000
+
+
+def facteurs_aleatoires(service: Service, aleatoire: random.Random) -> Dict[str, float]:
+    """Tire une valeur pour chaque facteur de variation du service"""
+    return {f.nom: round(aleatoire.uniform(f.impact_min, f.impact_max), 2)
+            for f in service.facteurs_variation}
+
+
+def creer_projet(nb_lignes: int, catalogue: Dict[str, Service] = None, graine: int = GRAINE) -> Projet:
+    """Crée un projet de `nb_lignes` lignes de services tirées du catalogue"""
+    aleatoire = random.Random(graine)
+    catalogue = catalogue or creer_catalogue_services()
+    services = list(catalogue.values())
+    projet = Projet(
+        nom=f"Projet de mesure ({nb_lignes} lignes)",
+        client="Client de mesure",
+        type_client=aleatoire.choice(TYPES_CLIENTS),
+        date_creation=datetime(2024, 1, 1)
+    )
+    for _ in range(nb_lignes):
+        service = aleatoire.choice(services)
+        projet.ajouter_service(
+            service,
+            complexite=aleatoire.choice(list(NIVEAUX_COMPLEXITE.keys())),
+            quantite=aleatoire.randint(1, 5),
+            facteurs_custom=facteurs_aleatoires(service, aleatoire)
+        )
+    return projet
+
+
+def creer_projets(nb_projets: int, catalogue: Dict[str, Service] = None,
+                  graine: int = GRAINE) -> List[Projet]:
+    """Crée des projets de 1 à 8 lignes"""
+    catalogue = catalogue or creer_catalogue_services()
+    aleatoire = random.Random(graine)
+    return [creer_projet(aleatoire.randint(1, 8), catalogue, graine=aleatoire.getrandbits(32))
+            for _ in range(nb_projets)]
+
+
+def creer_previsions(projets: List[Projet]) -> Previsions:
+    """Crée des prévisions dont l'année 1 contient les projets fournis"""
+    previsions = Previsions(nom_scenario="Mesure")
+    previsions.ajouter_annee(PrevisionAnnuelle(
+        annee=1,
+        projets=projets,
+        charges_fixes=dict(CHARGES_FIXES_DEFAUT)
+    ))
+    return previsions
+
+
+def parametres_calculateur(nb_annees: int) -> Tuple[dict, dict, dict, dict]:
+    """Paramètres par défaut du calculateur autonome sur `nb_annees` années"""
+    activites = {service: 0 for service in SERVICES_CALCULATEUR}
+    activites.update(jours_conseil=40, audit_sig=2, projets_sur_mesure=1, formations=2)
+    rh = {
+        "nb_fondateurs": 2,
+        "salaire_net_fondateur": 2000,
+        "nb_salaries": 0,
+        "salaire_chargé_salarié": 36000,
+        "nb_alternants": 0,
+        "cout_alternant": 12000
+    }
+    charges_fixes = {"loyer": 4800, "logiciels": 2000, "deplacements": 2000, "materiel": 3000, "admin": 3000}
+    projection = {"annees": nb_annees, "taux_croissance": 0.10, "scenario_actif": "Personnalisé"}
+    return activites, rh, charges_fixes, projection
@@ -0,0 +1,294 @@
+# benchmarks/suite.py
+"""Suite de mesures des chemins critiques : tarification, projections et exports.
+
+Chaque mesure est lancée sur des données synthétiques fixes, à plusieurs tailles.
+Les résultats (médiane et pic mémoire) sont comparés à une référence JSON ;
+le code de sortie vaut 1 si une mesure régresse au-delà du seuil, 2 s'il n'y a
+pas de référence à laquelle comparer.
+
+Les durées dépendent de la machine : la référence n'est pas versionnée
+(benchmarks/baselines/ est ignoré par git). Chaque machine, poste ou runner
+d'intégration continue, enregistre la sienne avec --enregistrer avant de
+comparer ; --reference permet d'en garder plusieurs (par machine, par branche).
+
+Usage :
+    python -m benchmarks.suite                      # compare à la référence
+    python -m benchmarks.suite --enregistrer        # (re)crée la référence
+    python -m benchmarks.suite --filtre pdf --seuil 0.5 --rapide
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from config import CHARGES_FIXES_DEFAUT
+from data import creer_catalogue_services
+import moteur_calculateur
+from remuneration import calculer_remuneration
+from utils import (
+    generer_pdf_devis, export_to_excel, creer_graphique_ca_evolution, creer_graphique_repartition
+)
+from benchmarks.donnees import (
+    GRAINE, SERVICES_CALCULATEUR, creer_projet, creer_projets, creer_previsions,
+    facteurs_aleatoires, parametres_calculateur
+)
+
+REFERENCE_DEFAUT = Path(__file__).parent / "baselines" / "reference.json"
+SEUIL_DEFAUT = 0.25          # Régression tolérée : +25 %
+DUREE_MIN_S = 0.2            # Durée cumulée minimale par mesure
+REPETITIONS_MIN = 3
+REPETITIONS_MAX = 200
+MARGE_ABSOLUE_MS = 0.05      # En dessous, l'écart relève du bruit de mesure
+
+
+@dataclass
+class Mesure:
+    """Une mesure : `preparer(taille)` retourne la fonction à chronométrer"""
+    nom: str
+    tailles: Tuple[int, ...]
+    preparer: Callable[[int], Callable[[], object]]
+
+
+def _preparer_calculer_prix(taille: int):
+    import random
+    aleatoire = random.Random(GRAINE)
+    services = list(creer_catalogue_services().values())
+    appels = []
+    for _ in range(taille):
+        service = aleatoire.choice(services)
+        appels.append((service, facteurs_aleatoires(service, aleatoire)))
+
+    def executer():
+        return sum(service.calculer_prix("Moyenne", facteurs) for service, facteurs in appels)
+    return executer
+
+
+def _preparer_totaux_projet(taille: int):
+    projet = creer_projet(taille)
+
+    def executer():
+        return projet.total_ht, projet.tva, projet.total_ttc, projet.maintenance_annuelle_ht
+    return executer
+
+
+def _preparer_generer_projections(taille: int):
+    projets = creer_projets(taille)
+
+    def executer():
+        previsions = creer_previsions(projets)
+        previsions.generer_projections(10, 0.10, CHARGES_FIXES_DEFAUT)
+        return previsions
+    return executer
+
+
+def _preparer_dataframe_resultats(taille: int):
+    previsions = creer_previsions(creer_projets(taille))
+    previsions.generer_projections(10, 0.10, CHARGES_FIXES_DEFAUT)
+    return previsions.get_dataframe_resultats
+
+
+def _preparer_dataframe_resultats_partage(taille: int):
+    previsions = creer_previsions(creer_projets(taille))
+    previsions.generer_projections(10, 0.10, CHARGES_FIXES_DEFAUT)
+    # Le premier appel (échauffement) construit le tableau, les suivants le réutilisent
+    return previsions.get_dataframe_resultats_partage
+
+
+def _preparer_remuneration(taille: int):
+    # Lot de `taille` scénarios sur 10 ans, nombre d'associés variable par scénario
+    generateur = np.random.default_rng(42)
+    benefices = generateur.normal(120_000, 60_000, size=(taille, 10))
+    nb_associes = generateur.integers(1, 5, size=(taille, 1))
+    return lambda: calculer_remuneration(benefices, nb_associes)
+
+
+def _preparer_calculer_resultats(taille: int):
+    activites, rh, charges_fixes, projection = parametres_calculateur(taille)
+
+    def executer():
+        return moteur_calculateur.calculer_resultats(activites, rh, charges_fixes, projection,
+                                                     services=SERVICES_CALCULATEUR)
+    return executer
+
+
+def _preparer_pdf_devis(taille: int):
+    projet = creer_projet(taille)
+    return lambda: generer_pdf_devis(projet)
+
+
+def _preparer_export_excel(taille: int):
+    projet = creer_projet(taille)
+    previsions = creer_previsions(creer_projets(20))
+    previsions.generer_projections(10, 0.10, CHARGES_FIXES_DEFAUT)
+    df_resultats = previsions.get_dataframe_resultats()
+    return lambda: export_to_excel(df_resultats, projet)
+
+
+def _preparer_graphiques(taille: int):
+    previsions = creer_previsions(creer_projets(20))
+    previsions.generer_projections(taille, 0.10, CHARGES_FIXES_DEFAUT)
+    df_resultats = previsions.get_dataframe_resultats()
+
+    def executer():
+        for figure in (creer_graphique_ca_evolution(df_resultats),
+                       creer_graphique_repartition(df_resultats, 1)):
+            figure.canvas.draw()
+            plt.close(figure)
+    return executer
+
+
+MESURES = [
+    Mesure("service.calculer_prix", (100, 10_000), _preparer_calculer_prix),
+    Mesure("projet.totaux", (10, 100, 1000), _preparer_totaux_projet),
+    Mesure("previsions.generer_projections", (10, 100, 1000), _preparer_generer_projections),
+    Mesure("previsions.get_dataframe_resultats", (10, 100, 1000), _preparer_dataframe_resultats),
+    Mesure("previsions.dataframe_resultats_partage", (10, 100, 1000), _preparer_dataframe_resultats_partage),
+    Mesure("remuneration.calculer", (1, 1000, 100_000), _preparer_remuneration),
+    Mesure("calculateur.calculer_resultats", (3, 10, 30), _preparer_calculer_resultats),
+    Mesure("export.generer_pdf_devis", (10, 100, 1000), _preparer_pdf_devis),
+    Mesure("export.export_to_excel", (10, 100, 1000), _preparer_export_excel),
+    Mesure("graphiques.ca_et_repartition", (3, 10, 30), _preparer_graphiques),
+]
+
+
+def chronometrer(fonction: Callable[[], object], duree_min: float) -> Dict[str, float]:
+    """Répète la fonction jusqu'à `duree_min` secondes et mesure le pic d'allocation"""
+    fonction()  # Échauffement : imports paresseux, caches de polices, etc.
+
+    durees: List[float] = []
+    debut_total = time.perf_counter()
+    gc.disable()
+    try:
+        while (len(durees) < REPETITIONS_MIN
+               or (time.perf_counter() - debut_total < duree_min and len(durees) < REPETITIONS_MAX)):
+            debut = time.perf_counter()
+            fonction()
+            durees.append((time.perf_counter() - debut) * 1000)
+    finally:
+        gc.enable()
+
+    # Les allocations sont mesurées à part : tracemalloc ralentit l'exécution
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fonction()
+        _, pic = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "mediane_ms": round(statistics.median(durees), 4),
+        "min_ms": round(min(durees), 4),
+        "repetitions": len(durees),
+        "pic_memoire_ko": round(pic / 1024, 1)
+    }
+
+
+def executer_suite(filtre: str = None, rapide: bool = False) -> Dict[str, Dict[str, float]]:
+    """Lance les mesures sélectionnées et retourne les résultats par clé `nom[taille]`"""
+    resultats = {}
+    for mesure in MESURES:
+        if filtre and filtre not in mesure.nom:
+            continue
+        tailles = mesure.tailles[:1] if rapide else mesure.tailles
+        for taille in tailles:
+            cle = f"{mesure.nom}[{taille}]"
+            resultats[cle] = chronometrer(mesure.preparer(taille), DUREE_MIN_S / 4 if rapide else DUREE_MIN_S)
+            r = resultats[cle]
+            print(f"{cle:<48} médiane {r['mediane_ms']:10.3f} ms  "
+                  f"pic {r['pic_memoire_ko']:10.1f} Ko  ({r['repetitions']} répétitions)")
+    return resultats
+
+
+def comparer(resultats: Dict[str, Dict[str, float]], reference: Dict[str, Dict[str, float]],
+             seuil: float) -> List[str]:
+    """Retourne la liste des régressions (durée ou mémoire) au-delà du seuil"""
+    regressions = []
+    for cle, r in resultats.items():
+        ref = reference.get(cle)
+        if ref is None:
+            continue
+        for champ, unite, marge in (("mediane_ms", "ms", MARGE_ABSOLUE_MS), ("pic_memoire_ko", "Ko", 1.0)):
+            avant, apres = ref[champ], r[champ]
+            if apres > avant * (1 + seuil) and apres - avant > marge:
+                regressions.append(f"{cle} : {champ} {avant:.3f} → {apres:.3f} {unite} "
+                                   f"(+{(apres / avant - 1) * 100 if avant else float('inf'):.0f} %)")
+    return regressions
+
+
+def charger_reference(chemin: Path) -> Dict[str, Dict[str, float]]:
+    with open(chemin, encoding="utf-8") as f:
+        return json.load(f)["resultats"]
+
+
+def enregistrer_reference(chemin: Path, resultats: Dict[str, Dict[str, float]]):
+    """Écrit la référence en conservant les mesures non relancées"""
+    existants = charger_reference(chemin) if chemin.exists() else {}
+    existants.update(resultats)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump({
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "resultats": dict(sorted(existants.items()))
+        }, f, ensure_ascii=False, indent=2)
+
+
+def main(arguments: List[str] = None) -> int:
+    parseur = argparse.ArgumentParser(description="Mesures de performance du calculateur Caribo")
+    parseur.add_argument("--reference", type=Path, default=REFERENCE_DEFAUT,
+                         help="fichier JSON de référence")
+    parseur.add_argument("--enregistrer", action="store_true",
+                         help="enregistre les résultats comme nouvelle référence")
+    parseur.add_argument("--seuil", type=float, default=SEUIL_DEFAUT,
+                         help="régression tolérée, en fraction (0.25 = +25 %%)")
+    parseur.add_argument("--filtre", help="ne lance que les mesures dont le nom contient ce texte")
+    parseur.add_argument("--rapide", action="store_true",
+                         help="plus petite taille seulement, répétitions réduites")
+    args = parseur.parse_args(arguments)
+
+    resultats = executer_suite(args.filtre, args.rapide)
+    if not resultats:
+        print("Aucune mesure ne correspond au filtre.")
+        return 2
+
+    if args.enregistrer:
+        enregistrer_reference(args.reference, resultats)
+        print(f"\nRéférence enregistrée : {args.reference}")
+        return 0
+
+    if not args.reference.exists():
+        print(f"\n❌ Pas de référence ({args.reference}) : l'enregistrer sur cette machine avec --enregistrer.")
+        return 2
+
+    with open(args.reference, encoding="utf-8") as f:
+        machine = json.load(f).get("machine")
+    if machine != platform.platform():
+        print(f"\n⚠️ Référence mesurée sur une autre machine ({machine}) : durées peu comparables.")
+    regressions = comparer(resultats, charger_reference(args.reference), args.seuil)
+    if regressions:
+        print(f"\n❌ {len(regressions)} régression(s) au-delà de +{args.seuil:.0%} :")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+    print(f"\n✅ Aucune régression au-delà de +{args.seuil:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
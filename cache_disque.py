@@ -0,0 +1,327 @@
+# cache_disque.py
+"""Cache disque des calculs lourds, conservé entre les redémarrages du conteneur.
+
+La clé d'une entrée est l'empreinte du contenu des arguments et de la version
+du code (source du module de la fonction, config.py, versions de numpy et
+pandas) : un calcul inchangé après un redéploiement devient une lecture de
+fichier, un calcul dont le code a changé est refait.
+
+Les tableaux numpy sont stockés en .npy, les DataFrames en Parquet (pyarrow,
+installé avec Streamlit) et le reste en pickle. Chaque entrée est écrite dans
+un fichier temporaire puis renommée : un lecteur, dans ce processus ou un
+autre, voit l'ancienne entrée ou la nouvelle, jamais un fichier partiel.
+"""
+
+import functools
+import hashlib
+import importlib.util
+import inspect
+import io
+import os
+import pickle
+import threading
+import time
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import CACHE_DISQUE_CONFIG
+from perf import mesurer
+
+FORMAT = 1
+RACINE = os.path.dirname(os.path.abspath(__file__))
+PARQUET_DISPONIBLE = importlib.util.find_spec("pyarrow") is not None
+
+# Signature des formats en tête de fichier : un seul open() par lecture
+_MAGIC_NPY = b"\x93NUMPY"
+_MAGIC_PARQUET = b"PAR1"
+_SUFFIXE_TEMPORAIRE = ".tmp"
+_AGE_MAX_TEMPORAIRE_S = 3600  # Fichier temporaire abandonné (processus tué pendant l'écriture)
+
+
+# --- Empreintes ------------------------------------------------------------------------
+
+def _alimenter(empreinte, valeur: Any):
+    """Ajoute le contenu de `valeur` à l'empreinte, indépendamment de l'identité des objets"""
+    if valeur is None or isinstance(valeur, (bool, int, float, complex, str, bytes)):
+        empreinte.update(f"{type(valeur).__name__}:{valeur!r};".encode())
+    elif isinstance(valeur, dict):
+        empreinte.update(f"dict:{len(valeur)};".encode())
+        for cle in sorted(valeur, key=repr):
+            _alimenter(empreinte, cle)
+            _alimenter(empreinte, valeur[cle])
+    elif isinstance(valeur, (list, tuple)):
+        empreinte.update(f"{type(valeur).__name__}:{len(valeur)};".encode())
+        for element in valeur:
+            _alimenter(empreinte, element)
+    elif isinstance(valeur, (set, frozenset)):
+        empreinte.update(f"set:{len(valeur)};".encode())
+        for element in sorted(valeur, key=repr):
+            _alimenter(empreinte, element)
+    elif isinstance(valeur, np.ndarray):
+        empreinte.update(f"ndarray:{valeur.dtype.str}:{valeur.shape};".encode())
+        if valeur.dtype.hasobject:
+            _alimenter(empreinte, valeur.tolist())
+        else:
+            empreinte.update(np.ascontiguousarray(valeur).tobytes())
+    elif isinstance(valeur, np.generic):
+        _alimenter(empreinte, valeur.item())
+    elif isinstance(valeur, pd.DataFrame):
+        empreinte.update(b"DataFrame;")
+        _alimenter(empreinte, [str(c) for c in valeur.columns])
+        _alimenter(empreinte, valeur.index.to_numpy())
+        for _, colonne in valeur.items():
+            _alimenter(empreinte, colonne.to_numpy())
+    elif isinstance(valeur, pd.Series):
+        empreinte.update(f"Series:{valeur.name!r};".encode())
+        _alimenter(empreinte, valeur.index.to_numpy())
+        _alimenter(empreinte, valeur.to_numpy())
+    elif is_dataclass(valeur) and not isinstance(valeur, type):
+        empreinte.update(f"{type(valeur).__module__}.{type(valeur).__qualname__};".encode())
+        for champ in fields(valeur):
+            if champ.compare:  # Les champs hors comparaison sont des caches ou des identifiants techniques
+                _alimenter(empreinte, getattr(valeur, champ.name))
+    else:
+        # Dates, énumérations… : pickle est déterministe pour ces types simples
+        empreinte.update(pickle.dumps(valeur, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def empreinte_valeur(valeur: Any) -> str:
+    """Empreinte SHA-256 du contenu d'une valeur (TypeError si non sérialisable)"""
+    empreinte = hashlib.sha256()
+    try:
+        _alimenter(empreinte, valeur)
+    except (pickle.PicklingError, AttributeError) as e:
+        raise TypeError(f"Valeur non sérialisable : {e}") from e
+    return empreinte.hexdigest()
+
+
+def version_code(fonction: Callable, sources: Iterable[str] = ()) -> str:
+    """Version du code d'une fonction : sources de son module, config.py et bibliothèques de calcul"""
+    fichiers = {inspect.getsourcefile(inspect.unwrap(fonction)), os.path.join(RACINE, "config.py")}
+    fichiers.update(os.path.join(RACINE, s) for s in sources)
+    empreinte = hashlib.sha256(f"{FORMAT}:{np.__version__}:{pd.__version__};".encode())
+    for chemin in sorted(fichiers):
+        with open(chemin, "rb") as f:
+            empreinte.update(os.path.basename(chemin).encode() + b"\0" + f.read())
+    return empreinte.hexdigest()
+
+
+# --- Stockage --------------------------------------------------------------------------
+
+def _serialiser(valeur: Any) -> bytes:
+    tampon = io.BytesIO()
+    if isinstance(valeur, np.ndarray) and not valeur.dtype.hasobject:
+        np.save(tampon, valeur, allow_pickle=False)
+        return tampon.getvalue()
+    if isinstance(valeur, pd.DataFrame) and PARQUET_DISPONIBLE:
+        try:
+            valeur.to_parquet(tampon)
+            return tampon.getvalue()
+        except (ValueError, TypeError):
+            tampon = io.BytesIO()  # Colonnes mixtes ou noms non textuels : pickle
+    pickle.dump(valeur, tampon, protocol=pickle.HIGHEST_PROTOCOL)
+    return tampon.getvalue()
+
+
+def _deserialiser(f) -> Any:
+    magic = f.read(len(_MAGIC_NPY))
+    f.seek(0)
+    if magic.startswith(_MAGIC_NPY):
+        return np.load(f, allow_pickle=False)
+    if magic.startswith(_MAGIC_PARQUET):
+        return pd.read_parquet(f)
+    return pickle.load(f)
+
+
+class CacheDisque:
+    """Entrées dans un répertoire à plat : éviction LRU par taille totale et expiration (TTL).
+
+    L'heure de dernière lecture est l'atime du fichier (mise à jour explicitement,
+    indépendamment des options de montage), l'heure d'écriture son mtime.
+    """
+
+    def __init__(self, repertoire: str, taille_max_octets: int, ttl_s: float):
+        self.repertoire = repertoire
+        self.taille_max_octets = taille_max_octets
+        self.ttl_s = ttl_s
+        self._verrou = threading.Lock()
+        self.succes = 0
+        self.defauts = 0
+        self.ecritures = 0
+
+    def _chemin(self, cle: str) -> str:
+        return os.path.join(self.repertoire, cle)
+
+    def _compter(self, trouve: bool):
+        with self._verrou:
+            if trouve:
+                self.succes += 1
+            else:
+                self.defauts += 1
+
+    def lire(self, cle: str) -> Tuple[bool, Any]:
+        """(True, valeur) si l'entrée existe et n'a pas expiré, sinon (False, None)"""
+        chemin = self._chemin(cle)
+        maintenant = time.time()
+        try:
+            with open(chemin, "rb") as f:
+                infos = os.fstat(f.fileno())
+                if maintenant - infos.st_mtime > self.ttl_s:
+                    valeur, trouve = None, False
+                else:
+                    valeur, trouve = _deserialiser(f), True
+        except FileNotFoundError:
+            self._compter(False)
+            return False, None
+        except Exception:  # Entrée illisible (tronquée, écrite par une autre version) : recalculée
+            valeur, trouve = None, False
+
+        if not trouve:
+            self._supprimer(chemin)
+            self._compter(False)
+            return False, None
+        try:
+            os.utime(chemin, (maintenant, infos.st_mtime))
+        except OSError:
+            pass  # Supprimée entre-temps par un autre processus : la valeur lue reste valable
+        self._compter(True)
+        return True, valeur
+
+    def ecrire(self, cle: str, valeur: Any):
+        """Écrit l'entrée de façon atomique puis applique la limite de taille"""
+        contenu = _serialiser(valeur)
+        os.makedirs(self.repertoire, exist_ok=True)
+        chemin = self._chemin(cle)
+        temporaire = f"{chemin}.{os.getpid()}.{threading.get_ident()}{_SUFFIXE_TEMPORAIRE}"
+        try:
+            with open(temporaire, "wb") as f:
+                f.write(contenu)
+            os.replace(temporaire, chemin)
+        except BaseException:
+            self._supprimer(temporaire)
+            raise
+        with self._verrou:
+            self.ecritures += 1
+        self.evincer()
+
+    @staticmethod
+    def _supprimer(chemin: str):
+        try:
+            os.remove(chemin)
+        except OSError:
+            pass  # Déjà supprimée par un autre lecteur ou une autre éviction
+
+    def _entrees(self) -> list:
+        try:
+            with os.scandir(self.repertoire) as entrees:
+                return [(e.path, e.name, e.stat()) for e in entrees if e.is_file()]
+        except OSError:
+            return []
+
+    def evincer(self, maintenant: float = None) -> int:
+        """Supprime les entrées expirées puis les moins récemment lues au-delà de la taille maximale"""
+        maintenant = maintenant or time.time()
+        restantes, supprimees = [], 0
+        for chemin, nom, infos in self._entrees():
+            if nom.endswith(_SUFFIXE_TEMPORAIRE):
+                if maintenant - infos.st_mtime > _AGE_MAX_TEMPORAIRE_S:
+                    self._supprimer(chemin)
+                continue
+            if maintenant - infos.st_mtime > self.ttl_s:
+                self._supprimer(chemin)
+                supprimees += 1
+            else:
+                restantes.append((infos.st_atime, infos.st_size, chemin))
+
+        total = sum(taille for _, taille, _ in restantes)
+        for _, taille, chemin in sorted(restantes):
+            if total <= self.taille_max_octets:
+                break
+            self._supprimer(chemin)
+            total -= taille
+            supprimees += 1
+        return supprimees
+
+    def vider(self):
+        for chemin, _, _ in self._entrees():
+            self._supprimer(chemin)
+
+    def statistiques(self) -> Dict[str, int]:
+        entrees = [infos for _, nom, infos in self._entrees() if not nom.endswith(_SUFFIXE_TEMPORAIRE)]
+        with self._verrou:
+            return {
+                "entrees": len(entrees),
+                "octets": sum(infos.st_size for infos in entrees),
+                "succes": self.succes,
+                "defauts": self.defauts,
+                "ecritures": self.ecritures
+            }
+
+
+_cache: Optional[CacheDisque] = None
+_verrou_cache = threading.Lock()
+
+
+def cache_disque() -> Optional[CacheDisque]:
+    """Cache partagé par toutes les sessions du processus (None si désactivé : CALCULATEUR_CACHE vide)"""
+    global _cache
+    if not CACHE_DISQUE_CONFIG["repertoire"]:
+        return None
+    with _verrou_cache:
+        if _cache is None:
+            _cache = CacheDisque(
+                CACHE_DISQUE_CONFIG["repertoire"],
+                CACHE_DISQUE_CONFIG["taille_max_octets"],
+                CACHE_DISQUE_CONFIG["ttl_s"]
+            )
+        return _cache
+
+
+def memoiser_disque(nom: str = None, sources: Iterable[str] = (), duree_min_s: float = None):
+    """Décorateur : résultat relu sur disque pour des arguments de même contenu et un code inchangé.
+
+    `sources` ajoute des fichiers (relatifs à la racine) à la version du code.
+    Seuls les calculs plus longs que `duree_min_s` sont écrits : en dessous,
+    recalculer coûte moins cher que relire.
+    """
+    seuil = CACHE_DISQUE_CONFIG["duree_min_s"] if duree_min_s is None else duree_min_s
+
+    def decorateur(fonction):
+        libelle = nom or f"{fonction.__module__}.{fonction.__qualname__}"
+        signature = inspect.signature(fonction)
+        version: Optional[str] = None
+
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            nonlocal version
+            cache = cache_disque()
+            if cache is None:
+                return fonction(*args, **kwargs)
+            if version is None:
+                version = version_code(fonction, sources)
+            try:
+                arguments = signature.bind(*args, **kwargs)
+                arguments.apply_defaults()
+                cle = f"{libelle}-{empreinte_valeur((version, dict(arguments.arguments)))[:32]}"
+            except TypeError:
+                return fonction(*args, **kwargs)  # Arguments sans empreinte : pas de cache
+
+            with mesurer("cache_disque.lecture"):
+                trouve, valeur = cache.lire(cle)
+            if trouve:
+                return valeur
+
+            debut = time.perf_counter()
+            valeur = fonction(*args, **kwargs)
+            if time.perf_counter() - debut >= seuil:
+                try:
+                    with mesurer("cache_disque.ecriture"):
+                        cache.ecrire(cle, valeur)
+                except (OSError, pickle.PicklingError, TypeError, AttributeError):
+                    pass  # Disque plein ou en lecture seule : le calcul reste valable
+            return valeur
+        return enveloppe
+    return decorateur
@@ -2,6 +2,10 @@ import streamlit as st
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+import copy
+
+import moteur_calculateur
+from affichage import afficher_tableau
 
 # Configuration de la page
 st.set_page_config(page_title="Calculateur Financier - Datamap", layout="wide")
@@ -81,73 +85,40 @@ if 'initialized' not in st.session_state:
 
     st.session_state.initialized = True
 
+# Calcul mémorisé et partagé entre les sessions : mêmes paramètres, même résultat
+@st.cache_data(max_entries=256, show_spinner=False)
+def _calculer_resultats_memo(activites, rh, charges_fixes, projection, services, taux_is, taux_charges_patronales):
+    return moteur_calculateur.calculer_resultats(
+        activites, rh, charges_fixes, projection,
+        services=services,
+        taux_is=taux_is,
+        taux_charges_patronales=taux_charges_patronales
+    )
+
 # Fonction pour calculer les résultats financiers
 def calculer_resultats(activites, rh, charges_fixes, projection):
-    resultats = []
-    annees = projection["annees"]
-    taux_croissance = projection["taux_croissance"]
-
-    # Calcul du CA initial
-    ca_initial = 0
-    for service, quantite in activites.items():
-        prix_unitaire = st.session_state.SERVICES[service]["prix_unitaire"]
-        ca_initial += quantite * prix_unitaire
-
-    # Abonnements de maintenance (15-20% des projets)
-    valeur_projets = activites["projets_sur_mesure"] * st.session_state.SERVICES["projets_sur_mesure"]["prix_unitaire"]
-    maintenance_initiale = valeur_projets * 0.15  # 15% du coût des projets
-    ca_initial += maintenance_initiale
-
-    # Charges de personnel initiales
-    salaires_fondateurs_base = rh["nb_fondateurs"] * rh["salaire_net_fondateur"] * (1 + st.session_state.TAUX_CHARGES_PATRONALES) * 12
-    salaires_autres_base = rh["nb_salaries"] * rh["salaire_chargé_salarié"] + rh["nb_alternants"] * rh["cout_alternant"]
-
-    # Total des charges fixes
-    total_charges_fixes_base = sum(charges_fixes.values())
-
-    for annee in range(1, annees+1):
-        # Application du taux de croissance au CA
-        ca = ca_initial * (1 + taux_croissance) ** (annee-1)
-
-        # Évolution des salaires
-        salaires_fondateurs = salaires_fondateurs_base * (1 + 0.02) ** (annee-1)  # 2% d'inflation sur salaires
-
-        # Pour les autres salaires, on suit une logique d'embauche progressive
-        if annee == 1:
-            salaires_autres = salaires_autres_base
-        else:
-            # Embauche progressive - hypothèse d'une équipe qui grandit avec le CA
-            # Au-delà de 100k€ de CA, on ajoute 1 salarié par tranches de 50k€ supplémentaires
-            salaries_theoriques = max(0, int((ca - 100000) / 50000))
-            salaires_autres = salaries_theoriques * rh["salaire_chargé_salarié"]
-
-        # Évolution des charges fixes: on sépare l'inflation des coûts fixes
-        # - Loyer: indexé sur l'inflation (2%)
-        # - Logiciels, matériel: indexé sur la croissance
-        charges_fixes_inflations = charges_fixes["loyer"] * (1 + 0.02) ** (annee-1)
-        charges_fixes_variables = (total_charges_fixes_base - charges_fixes["loyer"]) * (1 + taux_croissance/2) ** (annee-1)
-        charges_fixes_actuelles = charges_fixes_inflations + charges_fixes_variables
-
-        # Calculs financiers
-        total_charges = salaires_fondateurs + salaires_autres + charges_fixes_actuelles
-        resultat_brut = ca - total_charges
-        impot = max(0, resultat_brut * st.session_state.TAUX_IS)
-        resultat_net = resultat_brut - impot
-
-        resultats.append({
-            "Année": annee,
-            "CA": ca,
-            "Salaires fondateurs": salaires_fondateurs,
-            "Autres salaires": salaires_autres,
-            "Charges fixes": charges_fixes_actuelles,
-            "Total charges": total_charges,
-            "Résultat brut": resultat_brut,
-            "Impôt": impot,
-            "Résultat net": resultat_net,
-            "Taux de marge": resultat_net / ca if ca > 0 else 0
-        })
-
-    return pd.DataFrame(resultats)
+    return _calculer_resultats_memo(
+        activites, rh, charges_fixes, projection,
+        st.session_state.SERVICES,
+        st.session_state.TAUX_IS,
+        st.session_state.TAUX_CHARGES_PATRONALES
+    )
+
+# Paramètres en cours de saisie (brouillon)
+def parametres_saisis():
+    return {
+        "activites": st.session_state.activite,
+        "rh": st.session_state.rh,
+        "charges_fixes": st.session_state.charges_fixes,
+        "projection": st.session_state.projection
+    }
+
+# Fige les paramètres saisis : seuls les paramètres appliqués alimentent les résultats
+def appliquer_parametres():
+    st.session_state.parametres_appliques = copy.deepcopy(parametres_saisis())
+
+if 'parametres_appliques' not in st.session_state:
+    appliquer_parametres()
 
 # Fonction pour appliquer un scénario
 def appliquer_scenario(nom_scenario):
@@ -188,26 +159,9 @@ def appliquer_scenario(nom_scenario):
 
     st.session_state.projection["scenario_actif"] = nom_scenario
 
-# Interface utilisateur
-tabs = st.tabs(["Paramètres", "Résultats & Graphiques", "Scénarios"])
-
-# Onglet Paramètres
-with tabs[0]:
-    st.header("1. Activité prévue")
-
-    # Choix du scénario (en haut pour pouvoir initialiser les données)
-    st.subheader("Choisir un scénario de base")
-    scenarios_list = ["Personnalisé"] + list(st.session_state.SCENARIOS.keys())
-    scenario_choisi = st.selectbox(
-        "Scénario",
-        scenarios_list,
-        index=scenarios_list.index(st.session_state.projection["scenario_actif"])
-    )
-
-    # Appliquer le scénario si changé
-    if scenario_choisi != st.session_state.projection["scenario_actif"]:
-        appliquer_scenario(scenario_choisi)
-
+# Saisie de l'activité : fragment réexécuté seul, avec un aperçu du CA en direct
+@st.fragment
+def saisie_activite():
     col1, col2 = st.columns(2)
 
     with col1:
@@ -246,130 +200,161 @@ with tabs[0]:
 
     st.info(f"**CA prévisionnel année 1: {ca_previsionnel:,.0f} €** (dont maintenance: {maintenance:,.0f} €)")
 
-    st.header("2. Ressources humaines")
-    col1, col2 = st.columns(2)
+    if st.session_state.activite != st.session_state.parametres_appliques["activites"]:
+        st.caption("⏳ Activité modifiée : cliquez sur **Appliquer** en bas de page pour mettre à jour les résultats.")
 
-    with col1:
-        st.session_state.rh["nb_fondateurs"] = st.number_input(
-            "Nombre de fondateurs actifs",
-            min_value=1,
-            max_value=5,
-            value=st.session_state.rh["nb_fondateurs"]
-        )
+# Interface utilisateur
+tabs = st.tabs(["Paramètres", "Résultats & Graphiques", "Scénarios"])
 
-        st.session_state.rh["salaire_net_fondateur"] = st.number_input(
-            "Salaire net/mois/fondateur (€)",
-            min_value=0,
-            max_value=10000,
-            value=st.session_state.rh["salaire_net_fondateur"],
-            step=100,
-            help=f"Coût annuel chargé: {st.session_state.rh['salaire_net_fondateur'] * (1 + st.session_state.TAUX_CHARGES_PATRONALES) * 12:,.0f} €"
-        )
+# Onglet Paramètres
+with tabs[0]:
+    st.header("1. Activité prévue")
 
-    with col2:
-        st.session_state.rh["nb_salaries"] = st.number_input(
-            "Nombre de salariés",
-            min_value=0,
-            max_value=10,
-            value=st.session_state.rh["nb_salaries"]
-        )
+    # Choix du scénario (en haut pour pouvoir initialiser les données)
+    st.subheader("Choisir un scénario de base")
+    scenarios_list = ["Personnalisé"] + list(st.session_state.SCENARIOS.keys())
+    scenario_choisi = st.selectbox(
+        "Scénario",
+        scenarios_list,
+        index=scenarios_list.index(st.session_state.projection["scenario_actif"])
+    )
 
-        st.session_state.rh["salaire_chargé_salarié"] = st.number_input(
-            "Salaire brut chargé annuel/salarié (€)",
-            min_value=20000,
-            max_value=80000,
-            value=st.session_state.rh["salaire_chargé_salarié"],
-            step=1000
-        )
+    # Appliquer le scénario si changé (appliqué immédiatement aux résultats)
+    if scenario_choisi != st.session_state.projection["scenario_actif"]:
+        appliquer_scenario(scenario_choisi)
+        appliquer_parametres()
 
-        st.session_state.rh["nb_alternants"] = st.number_input(
-            "Nombre d'alternants",
-            min_value=0,
-            max_value=5,
-            value=st.session_state.rh["nb_alternants"]
-        )
+    saisie_activite()
 
-        st.session_state.rh["cout_alternant"] = st.number_input(
-            "Coût annuel moyen alternant (€)",
-            min_value=0,
-            max_value=20000,
-            value=st.session_state.rh["cout_alternant"],
-            step=500
-        )
+    # Sections 2 à 4 saisies en lot : aucun recalcul avant « Appliquer »
+    with st.form("form_parametres", border=False):
+        st.header("2. Ressources humaines")
+        col1, col2 = st.columns(2)
 
-    st.header("3. Charges fixes")
-    col1, col2 = st.columns(2)
+        with col1:
+            st.session_state.rh["nb_fondateurs"] = st.number_input(
+                "Nombre de fondateurs actifs",
+                min_value=1,
+                max_value=5,
+                value=st.session_state.rh["nb_fondateurs"]
+            )
 
-    with col1:
-        st.session_state.charges_fixes["loyer"] = st.number_input(
-            "Loyer / Bureau / Charges (€)",
-            min_value=0,
-            max_value=30000,
-            value=st.session_state.charges_fixes["loyer"],
-            step=100,
-            help="Indexé sur l'inflation (2%)"
-        )
+            st.session_state.rh["salaire_net_fondateur"] = st.number_input(
+                "Salaire net/mois/fondateur (€)",
+                min_value=0,
+                max_value=10000,
+                value=st.session_state.rh["salaire_net_fondateur"],
+                step=100,
+                help=f"Coût annuel chargé: {st.session_state.rh['salaire_net_fondateur'] * (1 + st.session_state.TAUX_CHARGES_PATRONALES) * 12:,.0f} €"
+            )
 
-        st.session_state.charges_fixes["logiciels"] = st.number_input(
-            "Logiciels / outils (€)",
-            min_value=0,
-            max_value=15000,
-            value=st.session_state.charges_fixes["logiciels"],
-            step=100,
-            help="Indexé sur le taux de croissance"
-        )
+        with col2:
+            st.session_state.rh["nb_salaries"] = st.number_input(
+                "Nombre de salariés",
+                min_value=0,
+                max_value=10,
+                value=st.session_state.rh["nb_salaries"]
+            )
 
-        st.session_state.charges_fixes["deplacements"] = st.number_input(
-            "Déplacements / événements (€)",
-            min_value=0,
-            max_value=15000,
-            value=st.session_state.charges_fixes["deplacements"],
-            step=100,
-            help="Indexé sur le taux de croissance"
-        )
+            st.session_state.rh["salaire_chargé_salarié"] = st.number_input(
+                "Salaire brut chargé annuel/salarié (€)",
+                min_value=20000,
+                max_value=80000,
+                value=st.session_state.rh["salaire_chargé_salarié"],
+                step=1000
+            )
 
-    with col2:
-        st.session_state.charges_fixes["materiel"] = st.number_input(
-            "Matériel / serveurs (€)",
-            min_value=0,
-            max_value=15000,
-            value=st.session_state.charges_fixes["materiel"],
-            step=100,
-            help="Indexé sur le taux de croissance"
-        )
+            st.session_state.rh["nb_alternants"] = st.number_input(
+                "Nombre d'alternants",
+                min_value=0,
+                max_value=5,
+                value=st.session_state.rh["nb_alternants"]
+            )
 
-        st.session_state.charges_fixes["admin"] = st.number_input(
-            "Compta / Assurance / Admin (€)",
-            min_value=0,
-            max_value=15000,
-            value=st.session_state.charges_fixes["admin"],
-            step=100,
-            help="Indexé sur le taux de croissance"
-        )
+            st.session_state.rh["cout_alternant"] = st.number_input(
+                "Coût annuel moyen alternant (€)",
+                min_value=0,
+                max_value=20000,
+                value=st.session_state.rh["cout_alternant"],
+                step=500
+            )
 
-    st.info(f"**Total charges fixes annuelles: {sum(st.session_state.charges_fixes.values()):,.0f} €**")
+        st.header("3. Charges fixes")
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.session_state.charges_fixes["loyer"] = st.number_input(
+                "Loyer / Bureau / Charges (€)",
+                min_value=0,
+                max_value=30000,
+                value=st.session_state.charges_fixes["loyer"],
+                step=100,
+                help="Indexé sur l'inflation (2%)"
+            )
 
-    st.header("4. Projections")
-    col1, col2 = st.columns(2)
+            st.session_state.charges_fixes["logiciels"] = st.number_input(
+                "Logiciels / outils (€)",
+                min_value=0,
+                max_value=15000,
+                value=st.session_state.charges_fixes["logiciels"],
+                step=100,
+                help="Indexé sur le taux de croissance"
+            )
 
-    with col1:
-        st.session_state.projection["annees"] = st.slider(
-            "Nombre d'années de projection",
-            min_value=1,
-            max_value=5,
-            value=st.session_state.projection["annees"]
-        )
+            st.session_state.charges_fixes["deplacements"] = st.number_input(
+                "Déplacements / événements (€)",
+                min_value=0,
+                max_value=15000,
+                value=st.session_state.charges_fixes["deplacements"],
+                step=100,
+                help="Indexé sur le taux de croissance"
+            )
 
-    with col2:
-        st.session_state.projection["taux_croissance"] = st.slider(
-            "Taux de croissance annuel",
-            min_value=0.0,
-            max_value=0.5,
-            value=st.session_state.projection["taux_croissance"],
-            step=0.05,
-            format="%d %%",
-            help="Impact sur le CA et les charges variables"
-        )
+        with col2:
+            st.session_state.charges_fixes["materiel"] = st.number_input(
+                "Matériel / serveurs (€)",
+                min_value=0,
+                max_value=15000,
+                value=st.session_state.charges_fixes["materiel"],
+                step=100,
+                help="Indexé sur le taux de croissance"
+            )
+
+            st.session_state.charges_fixes["admin"] = st.number_input(
+                "Compta / Assurance / Admin (€)",
+                min_value=0,
+                max_value=15000,
+                value=st.session_state.charges_fixes["admin"],
+                step=100,
+                help="Indexé sur le taux de croissance"
+            )
+
+        st.info(f"**Total charges fixes annuelles: {sum(st.session_state.charges_fixes.values()):,.0f} €**")
+
+        st.header("4. Projections")
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.session_state.projection["annees"] = st.slider(
+                "Nombre d'années de projection",
+                min_value=1,
+                max_value=5,
+                value=st.session_state.projection["annees"]
+            )
+
+        with col2:
+            st.session_state.projection["taux_croissance"] = st.slider(
+                "Taux de croissance annuel",
+                min_value=0.0,
+                max_value=0.5,
+                value=st.session_state.projection["taux_croissance"],
+                step=0.05,
+                format="%d %%",
+                help="Impact sur le CA et les charges variables"
+            )
+
+        if st.form_submit_button("✅ Appliquer", type="primary", use_container_width=True):
+            appliquer_parametres()
 
     # Informations sur les constantes
     st.header("Informations complémentaires")
@@ -383,12 +368,13 @@ with tabs[0]:
 
 # Onglet Résultats
 with tabs[1]:
-    # Calcul des résultats avec les paramètres actuels
+    # Calcul des résultats avec les derniers paramètres appliqués
+    parametres = st.session_state.parametres_appliques
     df_resultats = calculer_resultats(
-        st.session_state.activite,
-        st.session_state.rh,
-        st.session_state.charges_fixes,
-        st.session_state.projection
+        parametres["activites"],
+        parametres["rh"],
+        parametres["charges_fixes"],
+        parametres["projection"]
     )
 
     # Affichage des KPIs pour la première année
@@ -406,16 +392,7 @@ with tabs[1]:
 
     # Tableau des résultats
     st.subheader("Tableau prévisionnel")
-    df_affichage = df_resultats.copy()
-    # Formater les colonnes monétaires
-    for col in df_affichage.columns:
-        if col not in ["Année", "Taux de marge"]:
-            df_affichage[col] = df_affichage[col].map(lambda x: f"{x:,.0f} €")
-    # Formater les pourcentages
-    if "Taux de marge" in df_affichage.columns:
-        df_affichage["Taux de marge"] = df_affichage["Taux de marge"].map(lambda x: f"{x:.1%}")
-
-    st.dataframe(df_affichage)
+    afficher_tableau(df_resultats)
 
     # Graphiques
     st.subheader("Visualisations")
@@ -432,6 +409,7 @@ with tabs[1]:
         ax1.grid(True, linestyle='--', alpha=0.7)
         ax1.legend()
         st.pyplot(fig1)
+        plt.close(fig1)
 
     with col2:
         # Graphique de répartition des charges (Année 1)
@@ -462,8 +440,10 @@ with tabs[1]:
                 ax2.axis('equal')
                 ax2.set_title("Répartition des charges et résultat (Année 1)")
                 st.pyplot(fig2)
+                plt.close(fig2)
             else:
                 st.warning("Pas de données positives à afficher dans le graphique de répartition.")
+                plt.close(fig2)
         else:
             # Alternative: graphique à barres pour montrer les valeurs négatives
             fig2, ax2 = plt.subplots(figsize=(10, 6))
@@ -475,6 +455,7 @@ with tabs[1]:
             ax2.set_title("Répartition des charges et résultat (Année 1)")
             ax2.grid(True, linestyle='--', alpha=0.7)
             st.pyplot(fig2)
+            plt.close(fig2)
 
     # Seuil de rentabilité
     st.subheader("Analyse du seuil de rentabilité (Année 1)")
@@ -529,10 +510,10 @@ with tabs[2]:
     # Configuration actuelle
     if "Configuration actuelle" in scenarios_a_comparer:
         df_actuel = calculer_resultats(
-            st.session_state.activite,
-            st.session_state.rh,
-            st.session_state.charges_fixes,
-            st.session_state.projection
+            parametres["activites"],
+            parametres["rh"],
+            parametres["charges_fixes"],
+            parametres["projection"]
         )
         df_actuel["Scénario"] = "Configuration actuelle"
         resultats_comparaison.append(df_actuel)
@@ -541,14 +522,14 @@ with tabs[2]:
     for nom_scenario in st.session_state.SCENARIOS:
         if nom_scenario in scenarios_a_comparer:
             # Copie des paramètres actuels pour ce scénario
-            projection_scenario = st.session_state.projection.copy()
+            projection_scenario = parametres["projection"].copy()
             projection_scenario["taux_croissance"] = st.session_state.SCENARIOS[nom_scenario]["taux_croissance"]
 
             # Recalcul avec le taux de croissance du scénario
             df_scenario = calculer_resultats(
-                st.session_state.activite,
-                st.session_state.rh,
-                st.session_state.charges_fixes,
+                parametres["activites"],
+                parametres["rh"],
+                parametres["charges_fixes"],
                 projection_scenario
             )
             df_scenario["Scénario"] = nom_scenario
@@ -573,30 +554,13 @@ with tabs[2]:
         ax.legend()
 
         st.pyplot(fig)
+        plt.close(fig)
 
         # Affichage des données comparatives
         st.subheader("Détails des scénarios")
 
-        # --- formatage et tableau détaillé ---------------------------------
-        df_comparaison_aff = df_comparaison.copy()
-
-        # Colonnes numériques à formater en € (hors Année, Scénario et Taux de marge)
-        cols_monnaie = [
-            col for col in df_comparaison_aff.columns
-            if col not in ("Année", "Scénario", "Taux de marge")
-        ]
-        for col in cols_monnaie:
-            df_comparaison_aff[col] = df_comparaison_aff[col].map(
-                lambda x: f"{x:,.0f} €"
-            )
-
-        # Formatage pourcentage
-        if "Taux de marge" in df_comparaison_aff.columns:
-            df_comparaison_aff["Taux de marge"] = df_comparaison_aff[
-                "Taux de marge"
-            ].map(lambda x: f"{x:.1%}")
-
-        st.dataframe(df_comparaison_aff, use_container_width=True)
+        # Colonnes numériques formatées par le navigateur (€ et %), sans conversion en chaînes
+        afficher_tableau(df_comparaison)
 
     else:
         st.info(
@@ -1,8 +1,11 @@
 # config.py
 """Configuration et constantes pour le calculateur Caribô"""
 
+import os
+
 # Constantes fiscales
 TAUX_IS = 0.25  # Taux d'impôt sur les sociétés (25%)
+TAUX_FLAT_TAX = 0.30  # Prélèvement forfaitaire sur les dividendes (12,8% IR + 17,2% prélèvements sociaux)
 TAUX_TVA = 0.085  # TVA DOM (8.5%)
 
 # Taux de maintenance pour les services technologiques
@@ -149,3 +152,112 @@ SIMULATION_PARAMS = {
     "capacite_simultanee_annee_3": 2, # 2 projets simultanés en année 3
     "gain_efficacite_annuel": 0.10   # 10% de gain d'efficacité par an
 }
+
+# Simulation stochastique des prévisions (bandes de percentiles de l'onglet Résultats)
+SIMULATION_STOCHASTIQUE = {
+    "nb_chemins": [10_000, 100_000, 1_000_000],  # Choix proposés dans l'interface
+    "taille_lot": 50_000,              # Chemins tirés à la fois : borne la mémoire par processus
+    "compression": 200,                # Précision des esquisses t-digest (≤ 101 centroïdes par série)
+    "quantiles": (0.05, 0.25, 0.5, 0.75, 0.95),
+    "volatilite_ca": 0.15,             # Aléa annuel de volume sur le CA (écart-type)
+    "ecart_type_croissance": 0.05,     # Dispersion du taux de croissance annuel
+    "graine": 42
+}
+
+# Échéanciers de paiement : liste de (part du TTC, avancement du projet 0→1, délai en mois)
+# L'avancement 0 correspond à la commande, 1 à la livraison
+ECHEANCIERS_PAIEMENT = {
+    "30 jours net": [(1.0, 1.0, 1)],
+    "50% à la commande, 50% à la livraison": [(0.5, 0.0, 0), (0.5, 1.0, 0)],
+    "30% - 40% - 30%": [(0.3, 0.0, 0), (0.4, 0.5, 0), (0.3, 1.0, 0)],
+    "Comptant à réception": [(1.0, 1.0, 0)]
+}
+CONDITIONS_PAIEMENT_DEFAUT = "30 jours net"
+
+# Paramètres de trésorerie mensuelle
+TRESORERIE_PARAMS = {
+    "delai_reversement_tva_mois": 1,   # TVA collectée reversée le mois suivant (régime réel mensuel)
+    "tresorerie_initiale": 10000,
+    "duree_projet_defaut_mois": 3,
+    "horizon_max_mois": 60
+}
+
+# Import du pipeline commercial (export CRM en CSV ou Excel)
+PIPELINE_CRM = {
+    "taille_lot": 10_000,               # Lignes converties à la fois
+    "separateurs_services": "|;",       # Entre deux services d'une même opportunité (les noms contiennent des virgules)
+    "taux_maintenance": TAUX_MAINTENANCE_MIN,
+    # Champ → en-têtes acceptés, comparés sans accents ni casse
+    "colonnes": {
+        "identifiant": ("Identifiant", "ID", "Référence", "Opportunité"),
+        "client": ("Client", "Compte", "Organisation"),
+        "type_client": ("Type de client", "Type client", "Segment"),
+        "services": ("Services", "Service", "Produits"),
+        "montant": ("Montant HT", "Montant", "Montant estimé"),
+        "etape": ("Étape", "Stade", "Phase"),
+        "probabilite": ("Probabilité", "Probabilité (%)", "Proba"),
+        "annee": ("Année", "Année de signature", "Exercice"),
+        "date_cloture": ("Date de clôture", "Date de signature", "Clôture prévue")
+    }
+}
+
+# Probabilité de gain par étape, quand l'export n'en fournit pas
+PROBABILITES_ETAPES = {
+    "Prospection": 0.05,
+    "Qualification": 0.10,
+    "Découverte": 0.20,
+    "Proposition": 0.40,
+    "Négociation": 0.60,
+    "Engagement": 0.80,
+    "Gagnée": 1.0,
+    "Perdue": 0.0
+}
+
+# Persistance locale (SQLite)
+STOCKAGE_CONFIG = {
+    "chemin_base": os.environ.get("CALCULATEUR_DB", os.path.join("donnees", "calculateur.db")),
+    "taille_pool": 4,        # Connexions partagées entre les sessions Streamlit
+    "taille_lot": 500,       # Projets par transaction lors des insertions en masse
+    "taille_page": 50        # Projets listés par page dans la bibliothèque
+}
+
+# Instrumentation des temps de calcul (activable aussi par ?perf=1 dans l'URL)
+PERF_CONFIG = {
+    "actif": os.environ.get("CALCULATEUR_PERF", "0") == "1",
+    "chemin_jsonl": os.path.join("donnees", "perf", "mesures.jsonl"),
+    "chemin_prometheus": os.path.join("donnees", "perf", "mesures.prom"),
+    "taille_max_octets": 5 * 1024 * 1024,  # Rotation du journal au-delà de 5 Mo
+    "nb_fichiers": 3,                      # Journal courant + 2 archives
+    "historique_reruns": 20                # Exécutions conservées dans le panneau
+}
+
+# Budget mémoire par session : éviction des données recalculables
+MEMOIRE_CONFIG = {
+    "budget_session_octets": 32 * 1024 * 1024,  # Au-delà, les clés dérivées sont évincées
+    "delai_inactivite_s": 15 * 60,              # Session inactive : clés dérivées évincées
+    "intervalle_mesure_s": 30                   # Mesure d'une session au plus toutes les 30 s
+}
+
+# Calculs lourds en arrière-plan (devis, exports, simulations)
+TACHES_CONFIG = {
+    "nb_threads": 4,              # Tâches avec progression (partagées par les sessions)
+    "nb_processus": 2,            # Calculs purs exécutés hors du GIL
+    "budget_s": 120,              # Durée maximale d'une tâche
+    "conservation_s": 600,        # Résultat gardé 10 min après la fin pour l'interface
+    "intervalle_sondage_s": 1.0   # Rafraîchissement de la progression affichée
+}
+
+# Cache disque des calculs lourds, conservé entre les redémarrages (volume donnees/)
+CACHE_DISQUE_CONFIG = {
+    "repertoire": os.environ.get("CALCULATEUR_CACHE", os.path.join("donnees", "cache")),
+    "taille_max_octets": 512 * 1024 * 1024,  # Au-delà, les entrées les moins récemment lues sont supprimées
+    "ttl_s": 7 * 24 * 3600,                  # Entrée écrite il y a plus de 7 jours : recalculée
+    "duree_min_s": 0.05                      # Calculs plus rapides que la lecture : pas mis en cache
+}
+
+# Documents générés (devis PDF, exports Excel) réutilisés tant que leur contenu ne change pas
+ARTEFACTS_CONFIG = {
+    "nb_memoire": 32,                      # Documents gardés en mémoire (partagés par les sessions)
+    "taille_max_disque_octets": 64 * 1024 * 1024,
+    "sous_repertoire": "artefacts"         # Dans le répertoire du cache disque
+}
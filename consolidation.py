@@ -0,0 +1,243 @@
+# consolidation.py
+"""Consolidation des prévisions de plusieurs entités (SAS, agences) sur plusieurs années
+
+Les résultats de chaque entité sont empilés en une matrice de centimes
+(une ligne par entité et par année), puis réduits par groupe (année, pôle)
+en une seule opération vectorielle. Les flux intra-groupe sont éliminés du
+chiffre d'affaires et des charges consolidés : le résultat n'en dépend pas,
+chaque entité restant imposée séparément (pas d'intégration fiscale).
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from config import OBJECTIFS_REMUNERATION
+from models import Previsions
+from monnaie import en_centimes, en_euros
+from perf import chronometre
+from remuneration import calculer_remuneration
+
+# Colonnes de Previsions.colonnes_centimes sommées par la consolidation
+COLONNES_MONTANTS = ("CA Projets", "CA Maintenance", "CA Total", "Charges fixes",
+                     "Résultat brut", "Impôt", "Résultat net")
+
+
+@dataclass(slots=True)
+class Entite:
+    """Une entité du groupe et ses prévisions"""
+    nom: str
+    previsions: Previsions
+    nb_associes: int = OBJECTIFS_REMUNERATION["nb_associes"]
+    pole: str = ""  # Regroupement pour les sous-totaux (ex : « SAS », « Agences »)
+
+
+@dataclass(slots=True)
+class FluxIntraGroupe:
+    """Facturation entre deux entités du groupe : CA de l'émetteur, charge du destinataire"""
+    emetteur: str
+    destinataire: str
+    annee: int
+    montant_ht: float
+
+
+def sommer_par_groupe(cles: np.ndarray, valeurs: np.ndarray, nb_groupes: int) -> np.ndarray:
+    """Somme des lignes de `valeurs` (n, k) par clé de groupe, en une réduction (tri puis np.add.reduceat).
+
+    Les groupes sans ligne valent zéro ; les entiers restent exacts.
+    """
+    sommes = np.zeros((nb_groupes,) + valeurs.shape[1:], dtype=valeurs.dtype)
+    if len(cles) == 0:
+        return sommes
+    ordre = np.argsort(cles, kind="stable")
+    cles_triees = cles[ordre]
+    debuts = np.flatnonzero(np.r_[True, cles_triees[1:] != cles_triees[:-1]])
+    sommes[cles_triees[debuts]] = np.add.reduceat(valeurs[ordre], debuts, axis=0)
+    return sommes
+
+
+@dataclass
+class Consolidation:
+    """Résultats consolidés : montants en centimes par entité et par année, tableaux en euros"""
+    entites: List[str]
+    poles: List[str]
+    annees: np.ndarray            # Années présentes dans au moins une entité, triées
+    entite_ligne: np.ndarray      # Index de l'entité de chaque ligne
+    annee_ligne: np.ndarray       # Index (dans `annees`) de l'année de chaque ligne
+    montants: np.ndarray          # (lignes, COLONNES_MONTANTS) en centimes
+    dividendes: np.ndarray        # Dividendes nets par ligne, en centimes
+    net_par_associe: np.ndarray   # Par ligne, en euros
+    flux_emis: np.ndarray         # Facturé au groupe par ligne, en centimes
+    flux_recus: np.ndarray        # Acheté au groupe par ligne, en centimes
+    eliminations: np.ndarray      # Par année, en centimes
+    eliminations_poles: np.ndarray  # (pôles, années) : flux entre entités d'un même pôle
+
+    def _colonne(self, nom: str) -> np.ndarray:
+        return self.montants[:, COLONNES_MONTANTS.index(nom)]
+
+    def matrice(self, colonne: str) -> np.ndarray:
+        """Tableau (entités, années) en euros d'une colonne de montants ; zéro si l'entité n'a pas l'année"""
+        matrice = np.zeros((len(self.entites), len(self.annees)), dtype=np.int64)
+        matrice[self.entite_ligne, self.annee_ligne] = self._colonne(colonne)
+        return en_euros(matrice)
+
+    def par_entite(self) -> pd.DataFrame:
+        """Une ligne par entité et par année, avant éliminations"""
+        ca_total = self._colonne("CA Total")
+        resultat_net = self._colonne("Résultat net")
+        colonnes = {
+            "Entité": np.asarray(self.entites, dtype=object)[self.entite_ligne],
+            "Pôle": np.asarray(self.poles, dtype=object)[self.entite_ligne],
+            "Année": self.annees[self.annee_ligne],
+        }
+        colonnes.update({nom: en_euros(self.montants[:, i]) for i, nom in enumerate(COLONNES_MONTANTS)})
+        colonnes.update({
+            "Facturé au groupe": en_euros(self.flux_emis),
+            "Acheté au groupe": en_euros(self.flux_recus),
+            "Dividendes nets": en_euros(self.dividendes),
+            "Net par associé": self.net_par_associe,
+            "Taux de marge": np.divide(resultat_net, ca_total, out=np.zeros(len(ca_total)), where=ca_total > 0)
+        })
+        return pd.DataFrame(colonnes)
+
+    def _tableau_consolide(self, montants: np.ndarray, dividendes: np.ndarray, eliminations: np.ndarray,
+                           nb_entites: np.ndarray) -> Dict[str, np.ndarray]:
+        ca_cumule = montants[..., COLONNES_MONTANTS.index("CA Total")]
+        ca_consolide = ca_cumule - eliminations
+        resultat_net = montants[..., COLONNES_MONTANTS.index("Résultat net")]
+        return {
+            "Entités": nb_entites,
+            "CA cumulé": en_euros(ca_cumule),
+            "Éliminations": en_euros(eliminations),
+            "CA consolidé": en_euros(ca_consolide),
+            "Charges fixes": en_euros(montants[..., COLONNES_MONTANTS.index("Charges fixes")] - eliminations),
+            "Résultat brut": en_euros(montants[..., COLONNES_MONTANTS.index("Résultat brut")]),
+            "Impôt": en_euros(montants[..., COLONNES_MONTANTS.index("Impôt")]),
+            "Résultat net": en_euros(resultat_net),
+            "Dividendes nets": en_euros(dividendes),
+            "Taux de marge": np.divide(resultat_net, ca_consolide, out=np.zeros(ca_consolide.shape),
+                                       where=ca_consolide > 0)
+        }
+
+    def consolide(self) -> pd.DataFrame:
+        """Une ligne par année pour l'ensemble du groupe, flux intra-groupe éliminés"""
+        nb_annees = len(self.annees)
+        valeurs = np.column_stack([self.montants, self.dividendes, np.ones(len(self.montants), dtype=np.int64)])
+        sommes = sommer_par_groupe(self.annee_ligne, valeurs, nb_annees)
+        colonnes = {"Année": self.annees}
+        colonnes.update(self._tableau_consolide(sommes[:, :-2], sommes[:, -2], self.eliminations, sommes[:, -1]))
+        return pd.DataFrame(colonnes)
+
+    def par_pole(self) -> pd.DataFrame:
+        """Une ligne par pôle et par année ; seuls les flux internes au pôle y sont éliminés"""
+        noms_poles, pole_entite = np.unique(np.asarray(self.poles, dtype=object), return_inverse=True)
+        nb_annees = len(self.annees)
+        cles = pole_entite[self.entite_ligne] * nb_annees + self.annee_ligne
+        valeurs = np.column_stack([self.montants, self.dividendes, np.ones(len(self.montants), dtype=np.int64)])
+        sommes = sommer_par_groupe(cles, valeurs, len(noms_poles) * nb_annees)
+        presents = sommes[:, -1] > 0
+        colonnes = {
+            "Pôle": np.repeat(noms_poles, nb_annees)[presents],
+            "Année": np.tile(self.annees, len(noms_poles))[presents]
+        }
+        colonnes.update(self._tableau_consolide(sommes[presents, :-2], sommes[presents, -2],
+                                                self.eliminations_poles.reshape(-1)[presents],
+                                                sommes[presents, -1]))
+        return pd.DataFrame(colonnes)
+
+
+@chronometre("consolidation.consolider")
+def consolider(entites: Sequence[Entite], flux: Sequence[FluxIntraGroupe] = ()) -> Consolidation:
+    """Consolide les prévisions des entités et élimine les flux intra-groupe.
+
+    Lève ValueError si deux entités portent le même nom ou si un flux est invalide
+    (entité inconnue, flux d'une entité vers elle-même, montant négatif, année absente
+    des prévisions de l'émetteur ou du destinataire).
+    """
+    noms = [e.nom for e in entites]
+    if len(set(noms)) != len(noms):
+        raise ValueError("Deux entités portent le même nom")
+    index_entite = {nom: i for i, nom in enumerate(noms)}
+
+    # Empilement : une ligne par entité et par année
+    blocs, annees_blocs, entites_blocs = [], [], []
+    for i, entite in enumerate(entites):
+        colonnes = entite.previsions.colonnes_centimes()
+        blocs.append(np.column_stack([colonnes[nom] for nom in COLONNES_MONTANTS]))
+        annees_blocs.append(colonnes["Année"])
+        entites_blocs.append(np.full(len(colonnes["Année"]), i, dtype=np.int64))
+    if blocs:
+        montants = np.concatenate(blocs).astype(np.int64, copy=False)
+        annees_lignes = np.concatenate(annees_blocs)
+        entite_ligne = np.concatenate(entites_blocs)
+    else:
+        montants = np.zeros((0, len(COLONNES_MONTANTS)), dtype=np.int64)
+        annees_lignes = entite_ligne = np.zeros(0, dtype=np.int64)
+    annees, annee_ligne = np.unique(annees_lignes, return_inverse=True)
+
+    # Rémunération de chaque entité avec son propre nombre d'associés
+    nb_associes = np.array([e.nb_associes for e in entites], dtype=np.float64)[entite_ligne]
+    remuneration = calculer_remuneration(en_euros(montants[:, COLONNES_MONTANTS.index("Résultat brut")]),
+                                         nb_associes)
+
+    # Flux intra-groupe : par ligne (émetteur et destinataire) et par année
+    index_annee = {int(a): j for j, a in enumerate(annees)}
+    poles = [e.pole for e in entites]
+    flux_emis = np.zeros(len(montants), dtype=np.int64)
+    flux_recus = np.zeros(len(montants), dtype=np.int64)
+    noms_poles = sorted(set(poles))
+    eliminations_poles = np.zeros((len(noms_poles), len(annees)), dtype=np.int64)
+    if flux:
+        for f in flux:
+            if f.emetteur not in index_entite or f.destinataire not in index_entite:
+                inconnue = f.emetteur if f.emetteur not in index_entite else f.destinataire
+                raise ValueError(f"Flux intra-groupe : entité inconnue {inconnue}")
+            if f.emetteur == f.destinataire:
+                raise ValueError(f"Flux intra-groupe : {f.emetteur} ne peut pas se facturer lui-même")
+            if f.montant_ht < 0:
+                raise ValueError(f"Flux intra-groupe {f.emetteur} → {f.destinataire} : montant négatif")
+            if int(f.annee) not in index_annee:
+                raise ValueError(f"Flux intra-groupe {f.emetteur} → {f.destinataire} : année {f.annee} "
+                                 f"absente des prévisions")
+        emetteurs = np.array([index_entite[f.emetteur] for f in flux], dtype=np.int64)
+        destinataires = np.array([index_entite[f.destinataire] for f in flux], dtype=np.int64)
+        annees_flux = np.array([index_annee[int(f.annee)] for f in flux], dtype=np.int64)
+        montants_flux = en_centimes(np.array([f.montant_ht for f in flux], dtype=np.float64))
+
+        # Ligne (entité, année) de chaque extrémité du flux
+        ligne = np.full((len(entites), len(annees)), -1, dtype=np.int64)
+        ligne[entite_ligne, annee_ligne] = np.arange(len(montants))
+        for extremites, cible in ((emetteurs, flux_emis), (destinataires, flux_recus)):
+            lignes_flux = ligne[extremites, annees_flux]
+            if (lignes_flux < 0).any():
+                f = flux[int(np.argmax(lignes_flux < 0))]
+                raise ValueError(f"Flux intra-groupe {f.emetteur} → {f.destinataire} : année {f.annee} "
+                                 f"absente des prévisions d'une des deux entités")
+            cible += sommer_par_groupe(lignes_flux, montants_flux, len(montants))
+
+        eliminations = sommer_par_groupe(annees_flux, montants_flux, len(annees))
+        pole_index = np.array([noms_poles.index(p) for p in poles], dtype=np.int64)
+        internes = pole_index[emetteurs] == pole_index[destinataires]
+        eliminations_poles = sommer_par_groupe(
+            pole_index[emetteurs[internes]] * len(annees) + annees_flux[internes],
+            montants_flux[internes], len(noms_poles) * len(annees)
+        ).reshape(len(noms_poles), len(annees))
+    else:
+        eliminations = np.zeros(len(annees), dtype=np.int64)
+
+    return Consolidation(
+        entites=noms,
+        poles=poles,
+        annees=annees,
+        entite_ligne=entite_ligne,
+        annee_ligne=annee_ligne,
+        montants=montants,
+        dividendes=np.asarray(en_centimes(np.asarray(remuneration.dividendes_nets)), dtype=np.int64),
+        net_par_associe=np.asarray(remuneration.net_par_associe, dtype=np.float64),
+        flux_emis=flux_emis,
+        flux_recus=flux_recus,
+        eliminations=eliminations,
+        eliminations_poles=eliminations_poles
+    )
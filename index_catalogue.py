@@ -0,0 +1,159 @@
+# index_catalogue.py
+"""Index du catalogue de services, construit une fois par version du catalogue"""
+
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Set, Tuple
+
+from data import Catalogue, catalogue_courant
+from models import Service
+
+_MOT = re.compile(r"\w+")
+
+
+def normaliser(texte: str) -> str:
+    """Minuscules sans accents : « Évaluation » et « evaluation » se retrouvent"""
+    texte = texte or ""
+    if texte.isascii():
+        return texte.casefold()
+    decompose = unicodedata.normalize("NFKD", texte)
+    return "".join(c for c in decompose if not unicodedata.combining(c)).casefold()
+
+
+def mots(texte: str) -> List[str]:
+    return _MOT.findall(normaliser(texte))
+
+
+def _plage_prefixe(vocabulaire: List[str], prefixe: str) -> List[str]:
+    """Mots d'un vocabulaire trié commençant par le préfixe"""
+    debut = bisect_left(vocabulaire, prefixe)
+    fin = bisect_left(vocabulaire, prefixe + "\U0010ffff")
+    return vocabulaire[debut:fin]
+
+
+class IndexCatalogue:
+    """Index en lecture seule : catégories, intervalles de prix, maintenance et recherche plein texte.
+
+    La recherche porte sur le nom, la description et le livrable ; chaque mot de
+    la requête est un préfixe (recherche au fil de la saisie), tous doivent
+    correspondre. Les services dont le nom contient tous les mots passent en premier.
+    """
+
+    def __init__(self, services: Dict[str, Service], version: str = ""):
+        self.version = version
+        self._services: Dict[str, Service] = dict(services)
+        self._rang = {service_id: rang for rang, service_id in enumerate(self._services)}
+        self._par_categorie: Dict[str, List[str]] = {}
+        self._maintenance: Set[str] = set()
+        self._termes: Dict[str, Set[str]] = {}
+        self._termes_nom: Dict[str, Set[str]] = {}
+        self.libelles: Dict[str, str] = {}
+
+        for service_id, service in self._services.items():
+            self._par_categorie.setdefault(service.categorie, []).append(service_id)
+            if service.maintenance_applicable:
+                self._maintenance.add(service_id)
+            for mot in mots(service.nom):
+                self._termes_nom.setdefault(mot, set()).add(service_id)
+            for champ in (service.nom, service.description, service.livrable):
+                for mot in mots(champ):
+                    self._termes.setdefault(mot, set()).add(service_id)
+            self.libelles[service_id] = (f"{service.nom} ({service.prix_min:,.0f} € - "
+                                         f"{service.prix_max:,.0f} €)")
+
+        self.categories: List[str] = sorted(self._par_categorie)
+        self._vocabulaire: List[str] = sorted(self._termes)
+        self._vocabulaire_nom: List[str] = sorted(self._termes_nom)
+        self._prix_min: List[Tuple[float, str]] = sorted((s.prix_min, i) for i, s in self._services.items())
+        self._prix_max: List[Tuple[float, str]] = sorted((s.prix_max, i) for i, s in self._services.items())
+
+    def __len__(self) -> int:
+        return len(self._services)
+
+    def service(self, service_id: str) -> Optional[Service]:
+        return self._services.get(service_id)
+
+    def par_categorie(self, categorie: str) -> List[Service]:
+        return [self._services[i] for i in self._par_categorie.get(categorie, [])]
+
+    def _dans_budget(self, prix_min: Optional[float], prix_max: Optional[float]) -> Set[str]:
+        """Services dont la fourchette [prix_min, prix_max] recoupe l'intervalle demandé"""
+        ids = None
+        if prix_max is not None:
+            # Fourchette commençant sous le plafond
+            ids = {i for _, i in self._prix_min[:bisect_right(self._prix_min, (prix_max, "\U0010ffff"))]}
+        if prix_min is not None:
+            # Fourchette finissant au-dessus du plancher
+            au_dessus = {i for _, i in self._prix_max[bisect_left(self._prix_max, (prix_min, "")):]}
+            ids = au_dessus if ids is None else ids & au_dessus
+        return ids
+
+    @staticmethod
+    def _correspondances(prefixes: List[str], vocabulaire: List[str], termes: Dict[str, Set[str]]) -> Set[str]:
+        """Services contenant, pour chaque préfixe, au moins un mot qui commence par lui"""
+        ids = None
+        for prefixe in prefixes:
+            trouves = set()
+            for mot in _plage_prefixe(vocabulaire, prefixe):
+                trouves |= termes[mot]
+            ids = trouves if ids is None else ids & trouves
+            if not ids:
+                break
+        return ids
+
+    def _ordonner(self, ids: Set[str]) -> List[str]:
+        """Ids dans l'ordre du catalogue : tri des seuls résultats, ou parcours si presque tout correspond"""
+        if len(ids) * 8 > len(self._rang):
+            return [i for i in self._rang if i in ids]
+        return sorted(ids, key=self._rang.__getitem__)
+
+    def rechercher(self, texte: str = None, categorie: str = None,
+                   prix_min: float = None, prix_max: float = None,
+                   maintenance: bool = None, limite: int = None) -> List[Service]:
+        """Services correspondant à tous les critères fournis, dans l'ordre du catalogue.
+
+        Avec une recherche texte, les services dont le nom contient tous les mots passent devant.
+        """
+        ensembles = []
+        if categorie is not None:
+            ensembles.append(set(self._par_categorie.get(categorie, ())))
+        if maintenance is not None:
+            ensembles.append(self._maintenance if maintenance else set(self._services) - self._maintenance)
+        if prix_min is not None or prix_max is not None:
+            ensembles.append(self._dans_budget(prix_min, prix_max))
+        prefixes = mots(texte)
+        if prefixes:
+            ensembles.append(self._correspondances(prefixes, self._vocabulaire, self._termes))
+
+        if ensembles:
+            ensembles.sort(key=len)
+            ids = set(ensembles[0])
+            for ensemble in ensembles[1:]:
+                ids.intersection_update(ensemble)
+            if prefixes:
+                dans_nom = ids & self._correspondances(prefixes, self._vocabulaire_nom, self._termes_nom)
+                ordre = self._ordonner(dans_nom) + self._ordonner(ids - dans_nom)
+            else:
+                ordre = self._ordonner(ids)
+        else:
+            ordre = list(self._services)
+
+        if limite is not None:
+            ordre = ordre[:limite]
+        return [self._services[i] for i in ordre]
+
+
+_index: Optional[IndexCatalogue] = None
+_verrou_index = threading.Lock()
+
+
+def index_catalogue(catalogue: Catalogue = None) -> IndexCatalogue:
+    """Index du catalogue en vigueur, partagé par toutes les sessions et reconstruit à chaque nouvelle version"""
+    global _index
+    catalogue = catalogue or catalogue_courant()
+    with _verrou_index:
+        if _index is None or _index.version != catalogue.version:
+            _index = IndexCatalogue(catalogue.services, catalogue.version)
+        return _index
@@ -0,0 +1,230 @@
+# index_projets.py
+"""Index en mémoire de la bibliothèque de projets sauvegardés"""
+
+import heapq
+import threading
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Dict, Set, Tuple, Optional, Iterable
+
+from stockage import ResumeProjet
+
+# Ligne de service indexée : (service_id, catégorie, montant HT de la ligne)
+LigneIndexee = Tuple[str, Optional[str], float]
+
+# Au-delà de ce nombre de candidats, un critère d'intervalle est résolu par l'index trié
+SEUIL_FILTRAGE_DIRECT = 2000
+
+
+@dataclass
+class PageResultats:
+    """Une page de résultats de recherche"""
+    resultats: List[ResumeProjet]
+    total: int
+    page: int
+    taille_page: int
+
+    @property
+    def nb_pages(self) -> int:
+        return max(1, (self.total - 1) // self.taille_page + 1)
+
+
+def _normaliser(texte: str) -> str:
+    return (texte or "").strip().casefold()
+
+
+def _plage_prefixe(liste: List[Tuple[str, str]], prefixe: str) -> List[Tuple[str, str]]:
+    """Éléments d'une liste triée de (clé, id) dont la clé commence par le préfixe"""
+    debut = bisect_left(liste, (prefixe, ""))
+    fin = bisect_left(liste, (prefixe + "\U0010ffff", ""))
+    return liste[debut:fin]
+
+
+class IndexProjets:
+    """Index multi-critères : client, type, service, catégorie, montant, année et préfixes"""
+
+    def __init__(self):
+        self._verrou = threading.RLock()
+        self._resumes: Dict[str, ResumeProjet] = {}
+        self._lignes: Dict[str, List[LigneIndexee]] = {}
+        self._par_client: Dict[str, Set[str]] = {}
+        self._par_type: Dict[str, Set[str]] = {}
+        self._par_annee: Dict[int, Set[str]] = {}
+        self._par_categorie: Dict[str, Set[str]] = {}
+        self._par_service: Dict[str, Dict[str, float]] = {}
+        self._dates: List[Tuple[datetime, str]] = []
+        self._totaux: List[Tuple[float, str]] = []
+        self._noms: List[Tuple[str, str]] = []
+        self._clients: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._resumes)
+
+    def __contains__(self, projet_id: str) -> bool:
+        return projet_id in self._resumes
+
+    # --- Mises à jour incrémentales ----------------------------------------------
+
+    def _indexer(self, resume: ResumeProjet, lignes: List[LigneIndexee]):
+        """Alimente les index par égalité (les listes triées sont gérées par l'appelant)"""
+        self._resumes[resume.id] = resume
+        self._lignes[resume.id] = lignes
+        self._par_client.setdefault(_normaliser(resume.client), set()).add(resume.id)
+        self._par_type.setdefault(resume.type_client, set()).add(resume.id)
+        self._par_annee.setdefault(resume.date_creation.year, set()).add(resume.id)
+        for service_id, categorie, montant in lignes:
+            montants = self._par_service.setdefault(service_id, {})
+            montants[resume.id] = montants.get(resume.id, 0.0) + montant
+            if categorie:
+                self._par_categorie.setdefault(categorie, set()).add(resume.id)
+
+    def _cles_triees(self, resume: ResumeProjet):
+        return ((self._dates, (resume.date_creation, resume.id)),
+                (self._totaux, (resume.total_ht, resume.id)),
+                (self._noms, (_normaliser(resume.nom), resume.id)),
+                (self._clients, (_normaliser(resume.client), resume.id)))
+
+    def ajouter(self, resume: ResumeProjet, lignes: Iterable[LigneIndexee] = ()):
+        """Indexe (ou réindexe) un projet"""
+        with self._verrou:
+            self.retirer(resume.id)
+            self._indexer(resume, list(lignes))
+            for liste, cle in self._cles_triees(resume):
+                insort(liste, cle)
+
+    def ajouter_en_masse(self, elements: Iterable[Tuple[ResumeProjet, List[LigneIndexee]]]):
+        """Indexe un grand nombre de projets puis trie une seule fois"""
+        elements = list(elements)
+        with self._verrou:
+            for resume, _ in elements:
+                self.retirer(resume.id)
+            for resume, lignes in elements:
+                self._indexer(resume, list(lignes))
+                for liste, cle in self._cles_triees(resume):
+                    liste.append(cle)
+            for liste in (self._dates, self._totaux, self._noms, self._clients):
+                liste.sort()
+
+    def retirer(self, projet_id: str):
+        """Retire un projet de l'index"""
+        with self._verrou:
+            resume = self._resumes.pop(projet_id, None)
+            if resume is None:
+                return
+            lignes = self._lignes.pop(projet_id, [])
+
+            self._par_client.get(_normaliser(resume.client), set()).discard(projet_id)
+            self._par_type.get(resume.type_client, set()).discard(projet_id)
+            self._par_annee.get(resume.date_creation.year, set()).discard(projet_id)
+            for service_id, categorie, _ in lignes:
+                self._par_service.get(service_id, {}).pop(projet_id, None)
+                if categorie:
+                    self._par_categorie.get(categorie, set()).discard(projet_id)
+            for liste, cle in self._cles_triees(resume):
+                self._retirer_trie(liste, cle)
+
+    @staticmethod
+    def _retirer_trie(liste: list, element: tuple):
+        position = bisect_left(liste, element)
+        if position < len(liste) and liste[position] == element:
+            del liste[position]
+
+    # --- Recherche -----------------------------------------------------------------
+
+    def rechercher(self, client: str = None, type_client: str = None,
+                   service_id: str = None, montant_service_min: float = None,
+                   categorie: str = None, total_min: float = None, total_max: float = None,
+                   annee: int = None, prefixe: str = None,
+                   page: int = 1, taille_page: int = 50) -> PageResultats:
+        """Recherche paginée, du projet le plus récent au plus ancien.
+
+        `prefixe` porte sur le nom du projet ou le nom du client.
+        `montant_service_min` filtre sur le montant de la ligne `service_id`.
+        """
+        with self._verrou:
+            # Critères par égalité : ensembles pré-calculés
+            ensembles = []
+            if client is not None:
+                ensembles.append(self._par_client.get(_normaliser(client), set()))
+            if type_client is not None:
+                ensembles.append(self._par_type.get(type_client, set()))
+            if annee is not None:
+                ensembles.append(self._par_annee.get(annee, set()))
+            if categorie is not None:
+                ensembles.append(self._par_categorie.get(categorie, set()))
+            if service_id is not None:
+                montants = self._par_service.get(service_id, {})
+                if montant_service_min is not None:
+                    ensembles.append({i for i, m in montants.items() if m >= montant_service_min})
+                else:
+                    ensembles.append(montants.keys())
+
+            if ensembles:
+                ensembles.sort(key=len)
+                candidats = set(ensembles[0])
+                for ensemble in ensembles[1:]:
+                    candidats.intersection_update(ensemble)
+            else:
+                candidats = None
+
+            # Critères d'intervalle et de préfixe : filtrage direct si peu de candidats
+            if total_min is not None or total_max is not None:
+                candidats = self._filtrer_total(candidats, total_min, total_max)
+            if prefixe:
+                candidats = self._filtrer_prefixe(candidats, _normaliser(prefixe))
+
+            return self._paginer(candidats, page, taille_page)
+
+    def _filtrer_total(self, candidats: Optional[Set[str]], total_min: float, total_max: float) -> Set[str]:
+        borne_min = float('-inf') if total_min is None else total_min
+        borne_max = float('inf') if total_max is None else total_max
+        if candidats is not None and len(candidats) <= SEUIL_FILTRAGE_DIRECT:
+            return {i for i in candidats if borne_min <= self._resumes[i].total_ht <= borne_max}
+
+        debut = bisect_left(self._totaux, (borne_min, ""))
+        fin = bisect_right(self._totaux, (borne_max, "\U0010ffff"))
+        dans_plage = {i for _, i in self._totaux[debut:fin]}
+        return dans_plage if candidats is None else candidats & dans_plage
+
+    def _filtrer_prefixe(self, candidats: Optional[Set[str]], prefixe: str) -> Set[str]:
+        if candidats is not None and len(candidats) <= SEUIL_FILTRAGE_DIRECT:
+            return {i for i in candidats
+                    if _normaliser(self._resumes[i].nom).startswith(prefixe)
+                    or _normaliser(self._resumes[i].client).startswith(prefixe)}
+
+        correspondances = {i for _, i in _plage_prefixe(self._noms, prefixe)}
+        correspondances.update(i for _, i in _plage_prefixe(self._clients, prefixe))
+        return correspondances if candidats is None else candidats & correspondances
+
+    def _paginer(self, candidats: Optional[Set[str]], page: int, taille_page: int) -> PageResultats:
+        page = max(1, page)
+        decalage = (page - 1) * taille_page
+        if candidats is None:
+            # Aucun filtre : lecture directe de la fin de l'index des dates
+            total = len(self._dates)
+            tranche = self._dates[max(0, total - decalage - taille_page):max(0, total - decalage)]
+            ids = [i for _, i in reversed(tranche)]
+        elif len(candidats) <= SEUIL_FILTRAGE_DIRECT:
+            total = len(candidats)
+            ids = heapq.nlargest(decalage + taille_page, candidats,
+                                 key=lambda i: self._resumes[i].date_creation)[decalage:]
+        else:
+            # Beaucoup de candidats : parcours de l'index des dates jusqu'à remplir la page
+            total = len(candidats)
+            ids = []
+            rang = 0
+            for _, projet_id in reversed(self._dates):
+                if projet_id in candidats:
+                    if rang >= decalage:
+                        ids.append(projet_id)
+                        if len(ids) == taille_page:
+                            break
+                    rang += 1
+
+        return PageResultats(
+            resultats=[self._resumes[i] for i in ids],
+            total=total,
+            page=page,
+            taille_page=taille_page
+        )
@@ -0,0 +1,305 @@
+# instantane.py
+"""Instantané binaire versionné d'une session de travail (sauvegarde / restauration)
+
+Format : en-tête fixe (signature, version, drapeaux) puis sections en colonnes
+de tableaux typés. Les chaînes sont dédupliquées dans une table unique et les
+services du catalogue sont référencés par leur id.
+"""
+
+import struct
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+from models import Service, ServiceSelectionne, Projet, PrevisionAnnuelle, Previsions
+
+SIGNATURE = b"CARIBO"
+VERSION = 1
+EN_TETE = struct.Struct("<6sHB")
+DRAPEAU_COMPRESSE = 1
+
+EPOCH = datetime(1970, 1, 1)
+UNE_MICROSECONDE = timedelta(microseconds=1)
+
+
+class InstantaneInvalide(ValueError):
+    """Le fichier fourni n'est pas un instantané lisible par cette version"""
+
+
+class _Ecrivain:
+    """Accumule la table de chaînes et les sections typées"""
+
+    def __init__(self):
+        self.chaines: Dict[str, int] = {}
+        self.sections: List[bytes] = []
+
+    def chaine(self, texte: str) -> int:
+        texte = (texte or "").replace("\x00", "")
+        indice = self.chaines.get(texte)
+        if indice is None:
+            indice = self.chaines[texte] = len(self.chaines)
+        return indice
+
+    def tableau(self, code: str, valeurs):
+        donnees = array(code, valeurs)
+        self.sections.append(struct.pack("<cI", code.encode(), len(donnees)) + donnees.tobytes())
+
+    def octets(self, compresser: bool) -> bytes:
+        table = "\x00".join(self.chaines).encode("utf-8")
+        corps = struct.pack("<II", len(self.chaines), len(table)) + table + b"".join(self.sections)
+        if compresser:
+            corps = zlib.compress(corps, 1)
+        return EN_TETE.pack(SIGNATURE, VERSION, DRAPEAU_COMPRESSE if compresser else 0) + corps
+
+
+class _Lecteur:
+    """Relit les sections dans l'ordre d'écriture"""
+
+    def __init__(self, corps: bytes):
+        nb_chaines, taille_table = struct.unpack_from("<II", corps, 0)
+        debut = 8
+        self.chaines = corps[debut:debut + taille_table].decode("utf-8").split("\x00") if nb_chaines else []
+        if len(self.chaines) != nb_chaines:
+            raise InstantaneInvalide("Table de chaînes corrompue")
+        self.corps = corps
+        self.position = debut + taille_table
+
+    def tableau(self, code: str) -> array:
+        code_lu, longueur = struct.unpack_from("<cI", self.corps, self.position)
+        if code_lu.decode() != code:
+            raise InstantaneInvalide("Section inattendue")
+        self.position += 5
+        donnees = array(code)
+        taille = longueur * donnees.itemsize
+        donnees.frombytes(self.corps[self.position:self.position + taille])
+        if len(donnees) != longueur:
+            raise InstantaneInvalide("Section tronquée")
+        self.position += taille
+        return donnees
+
+    def chaines_de(self, indices) -> List[str]:
+        chaines = self.chaines
+        return [chaines[i] for i in indices]
+
+
+def _ecrire_projets(ecrivain: _Ecrivain, projets: List[Projet]):
+    """Écrit les projets et leurs lignes de services en colonnes"""
+    lignes = [s for p in projets for s in p.services]
+    facteurs = [(nom, valeur) for s in lignes for nom, valeur in s.facteurs_custom.items()]
+
+    ecrivain.tableau("I", [ecrivain.chaine(p.id) for p in projets])
+    ecrivain.tableau("I", [ecrivain.chaine(p.nom) for p in projets])
+    ecrivain.tableau("I", [ecrivain.chaine(p.client) for p in projets])
+    ecrivain.tableau("I", [ecrivain.chaine(p.type_client) for p in projets])
+    ecrivain.tableau("I", [ecrivain.chaine(p.conditions_paiement) for p in projets])
+    ecrivain.tableau("q", [(p.date_creation - EPOCH) // UNE_MICROSECONDE for p in projets])
+    ecrivain.tableau("d", [p.taux_maintenance for p in projets])
+    ecrivain.tableau("I", [len(p.services) for p in projets])
+
+    ecrivain.tableau("I", [ecrivain.chaine(s.service.id) for s in lignes])
+    ecrivain.tableau("I", [ecrivain.chaine(s.complexite) for s in lignes])
+    ecrivain.tableau("q", [s.quantite for s in lignes])
+    ecrivain.tableau("d", [s.prix_unitaire for s in lignes])
+    ecrivain.tableau("I", [len(s.facteurs_custom) for s in lignes])
+
+    ecrivain.tableau("I", [ecrivain.chaine(nom) for nom, _ in facteurs])
+    ecrivain.tableau("d", [valeur for _, valeur in facteurs])
+
+
+def _lire_projets(lecteur: _Lecteur, catalogue: Dict[str, Service]) -> List[Projet]:
+    ids = lecteur.chaines_de(lecteur.tableau("I"))
+    noms = lecteur.chaines_de(lecteur.tableau("I"))
+    clients = lecteur.chaines_de(lecteur.tableau("I"))
+    types_clients = lecteur.chaines_de(lecteur.tableau("I"))
+    conditions = lecteur.chaines_de(lecteur.tableau("I"))
+    dates = lecteur.tableau("q")
+    taux_maintenance = lecteur.tableau("d")
+    nb_services = lecteur.tableau("I")
+
+    services_ids = lecteur.chaines_de(lecteur.tableau("I"))
+    complexites = lecteur.chaines_de(lecteur.tableau("I"))
+    quantites = lecteur.tableau("q")
+    prix_unitaires = lecteur.tableau("d")
+    nb_facteurs = lecteur.tableau("I")
+
+    noms_facteurs = lecteur.chaines_de(lecteur.tableau("I"))
+    valeurs_facteurs = lecteur.tableau("d")
+
+    projets = []
+    ligne = 0
+    facteur = 0
+    for i in range(len(ids)):
+        projet = Projet(
+            id=ids[i],
+            nom=noms[i],
+            client=clients[i],
+            type_client=types_clients[i],
+            date_creation=EPOCH + timedelta(microseconds=dates[i]),
+            taux_maintenance=taux_maintenance[i],
+            conditions_paiement=conditions[i]
+        )
+        for _ in range(nb_services[i]):
+            fin_facteurs = facteur + nb_facteurs[ligne]
+            service = catalogue.get(services_ids[ligne])
+            if service is not None:
+                projet.services.append(ServiceSelectionne(
+                    service=service,
+                    complexite=complexites[ligne],
+                    facteurs_custom=dict(zip(noms_facteurs[facteur:fin_facteurs],
+                                             valeurs_facteurs[facteur:fin_facteurs])),
+                    quantite=quantites[ligne],
+                    prix_unitaire=prix_unitaires[ligne]
+                ))
+            facteur = fin_facteurs
+            ligne += 1
+        projets.append(projet)
+    return projets
+
+
+def exporter_instantane(etat: Dict[str, Any], compresser: bool = True) -> bytes:
+    """Sérialise l'état de travail d'une session.
+
+    `etat` contient : projet_courant, projets_annee_1, multiplicateurs,
+    charges_fixes, previsions_annuelles et mode_avance.
+    """
+    projet_courant: Optional[Projet] = etat.get("projet_courant")
+    projets_annee_1: List[Projet] = etat.get("projets_annee_1") or []
+    previsions: Optional[Previsions] = etat.get("previsions_annuelles")
+    annees = previsions.annees if previsions is not None else []
+
+    # Réservoir de projets uniques : un projet partagé entre années n'est écrit qu'une fois
+    reservoir: Dict[int, int] = {}
+    projets: List[Projet] = []
+
+    def reference(projet: Projet) -> int:
+        indice = reservoir.get(id(projet))
+        if indice is None:
+            indice = reservoir[id(projet)] = len(projets)
+            projets.append(projet)
+        return indice
+
+    ref_courant = reference(projet_courant) if projet_courant is not None else -1
+    refs_annee_1 = [reference(p) for p in projets_annee_1]
+    refs_annees = [[reference(p) for p in prevision.projets] for prevision in annees]
+
+    ecrivain = _Ecrivain()
+    _ecrire_projets(ecrivain, projets)
+
+    # Session
+    charges_fixes = etat.get("charges_fixes") or {}
+    ecrivain.tableau("i", [ref_courant, int(bool(etat.get("mode_avance")))])
+    ecrivain.tableau("I", refs_annee_1)
+    ecrivain.tableau("i", etat.get("multiplicateurs") or [1] * len(projets_annee_1))
+    ecrivain.tableau("I", [ecrivain.chaine(nom) for nom in charges_fixes])
+    ecrivain.tableau("d", list(charges_fixes.values()))
+
+    # Prévisions
+    ecrivain.tableau("I", [ecrivain.chaine(previsions.nom_scenario)] if previsions is not None else [])
+    ecrivain.tableau("i", [prevision.annee for prevision in annees])
+    ecrivain.tableau("d", [prevision.taux_croissance for prevision in annees])
+    ecrivain.tableau("I", [len(refs) for refs in refs_annees])
+    ecrivain.tableau("I", [i for refs in refs_annees for i in refs])
+    ecrivain.tableau("I", [len(prevision.charges_fixes) for prevision in annees])
+    ecrivain.tableau("I", [ecrivain.chaine(nom) for prevision in annees for nom in prevision.charges_fixes])
+    ecrivain.tableau("d", [montant for prevision in annees for montant in prevision.charges_fixes.values()])
+
+    return ecrivain.octets(compresser)
+
+
+def importer_instantane(donnees: bytes, catalogue: Dict[str, Service]) -> Dict[str, Any]:
+    """Reconstruit l'état de session ; les services absents du catalogue sont ignorés"""
+    if len(donnees) < EN_TETE.size:
+        raise InstantaneInvalide("Fichier trop court")
+    signature, version, drapeaux = EN_TETE.unpack_from(donnees, 0)
+    if signature != SIGNATURE:
+        raise InstantaneInvalide("Ce fichier n'est pas un instantané Caribo")
+    if version > VERSION:
+        raise InstantaneInvalide(f"Version d'instantané {version} non supportée (max {VERSION})")
+
+    corps = donnees[EN_TETE.size:]
+    try:
+        if drapeaux & DRAPEAU_COMPRESSE:
+            corps = zlib.decompress(corps)
+        lecteur = _Lecteur(corps)
+        projets = _lire_projets(lecteur, catalogue)
+
+        ref_courant, mode_avance = lecteur.tableau("i")
+        refs_annee_1 = lecteur.tableau("I")
+        multiplicateurs = lecteur.tableau("i")
+        charges_fixes = dict(zip(lecteur.chaines_de(lecteur.tableau("I")), lecteur.tableau("d")))
+
+        nom_scenario = lecteur.chaines_de(lecteur.tableau("I"))
+        annees = lecteur.tableau("i")
+        taux_croissance = lecteur.tableau("d")
+        nb_projets_annee = lecteur.tableau("I")
+        refs_annees = lecteur.tableau("I")
+        nb_charges_annee = lecteur.tableau("I")
+        noms_charges = lecteur.chaines_de(lecteur.tableau("I"))
+        montants_charges = lecteur.tableau("d")
+    except InstantaneInvalide:
+        raise
+    except (zlib.error, struct.error, ValueError, IndexError, OverflowError) as e:
+        raise InstantaneInvalide(f"Instantané corrompu : {e}") from e
+
+    # Références et colonnes par année cohérentes avant de reconstruire quoi que ce soit
+    nb_projets = len(projets)
+    if not -1 <= ref_courant < nb_projets or any(r >= nb_projets for r in (*refs_annee_1, *refs_annees)):
+        raise InstantaneInvalide("Instantané corrompu : référence de projet hors limites")
+    if (len(taux_croissance) != len(annees) or len(nb_projets_annee) != len(annees)
+            or len(nb_charges_annee) != len(annees) or sum(nb_projets_annee) != len(refs_annees)
+            or sum(nb_charges_annee) != len(noms_charges) or len(montants_charges) != len(noms_charges)):
+        raise InstantaneInvalide("Instantané corrompu : colonnes des prévisions incohérentes")
+
+    previsions = None
+    if nom_scenario:
+        previsions = Previsions(nom_scenario=nom_scenario[0])
+        debut_projets = debut_charges = 0
+        for i, annee in enumerate(annees):
+            fin_projets = debut_projets + nb_projets_annee[i]
+            fin_charges = debut_charges + nb_charges_annee[i]
+            previsions.ajouter_annee(PrevisionAnnuelle(
+                annee=annee,
+                projets=[projets[r] for r in refs_annees[debut_projets:fin_projets]],
+                charges_fixes=dict(zip(noms_charges[debut_charges:fin_charges],
+                                       montants_charges[debut_charges:fin_charges])),
+                taux_croissance=taux_croissance[i]
+            ))
+            debut_projets, debut_charges = fin_projets, fin_charges
+
+    return {
+        "projet_courant": projets[ref_courant] if ref_courant >= 0 else None,
+        "projets_annee_1": [projets[r] for r in refs_annee_1],
+        "multiplicateurs": list(multiplicateurs),
+        "charges_fixes": charges_fixes,
+        "previsions_annuelles": previsions,
+        "mode_avance": bool(mode_avance)
+    }
+
+
+def etat_depuis_session(session_state) -> Dict[str, Any]:
+    """Extrait de st.session_state l'état à sauvegarder"""
+    projets_annee_1 = session_state.get('projets_annee_1') or []
+    return {
+        "projet_courant": session_state.get('projet_courant'),
+        "projets_annee_1": projets_annee_1,
+        "multiplicateurs": [session_state.get(f"mult_projet_{i}", 1) for i in range(len(projets_annee_1))],
+        "charges_fixes": session_state.get('charges_fixes') or {},
+        "previsions_annuelles": session_state.get('previsions_annuelles'),
+        "mode_avance": session_state.get('mode_avance', False)
+    }
+
+
+def restaurer_session(session_state, etat: Dict[str, Any]):
+    """Réinjecte un état restauré dans st.session_state (avant la création des widgets)"""
+    if etat["projet_courant"] is not None:
+        session_state.projet_courant = etat["projet_courant"]
+    session_state.projets_annee_1 = etat["projets_annee_1"]
+    for i, multiplicateur in enumerate(etat["multiplicateurs"]):
+        session_state[f"mult_projet_{i}"] = multiplicateur
+    session_state.charges_fixes = etat["charges_fixes"]
+    for nom in etat["charges_fixes"]:
+        # Les widgets de charges se réinitialisent depuis charges_fixes
+        session_state.pop(f"charge_{nom}", None)
+    session_state.previsions_annuelles = etat["previsions_annuelles"] or Previsions()
+    session_state.mode_avance = etat["mode_avance"]
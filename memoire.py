@@ -0,0 +1,298 @@
+# memoire.py
+"""Suivi de la mémoire par session et éviction des données recalculables"""
+
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from types import FunctionType, BuiltinFunctionType, MethodType, ModuleType
+from typing import List, Dict, Set, Optional, MutableMapping, Iterable
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from config import MEMOIRE_CONFIG
+
+# Pseudo-clé : DataFrames de résultats mis en cache par les prévisions de la session
+# (annuelles et entités du groupe), mesurés et libérés comme les clés dérivées
+RESULTATS_PREVISIONS = "previsions.resultats"
+
+# Clés recalculables, de la première à la dernière évincée
+CLES_DERIVEES = (
+    "instantane_session",   # Octets du dernier instantané préparé (re-préparé à la demande)
+    "perf_historique",      # Historique du panneau ⏱ Perf
+    RESULTATS_PREVISIONS,   # Reconstruits depuis les prévisions au prochain affichage
+    "consolidation",        # Dernière consolidation du groupe (recalculée depuis les entités)
+    "pipeline_crm",         # Dernier export CRM importé (réimporté depuis le fichier chargé)
+)
+
+_TYPES_OPAQUES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType, weakref.ref,
+                  type(threading.Lock()), type(threading.RLock()))
+_TYPES_FEUILLES = (str, bytes, bytearray, int, float, complex, bool, type(None))
+
+
+def _taille_figure(figure: Figure) -> int:
+    """Estimation du tampon RGBA d'une figure matplotlib"""
+    largeur, hauteur = figure.canvas.get_width_height()
+    return sys.getsizeof(figure) + largeur * hauteur * 4
+
+
+def taille_profonde(objet, deja_vus: Set[int] = None) -> int:
+    """Taille en octets d'un objet et de tout ce qu'il référence.
+
+    Les objets présents dans `deja_vus` ne sont pas recomptés : partager cet
+    ensemble entre plusieurs appels attribue un objet commun au premier mesuré.
+    """
+    deja_vus = set() if deja_vus is None else deja_vus
+    total = 0
+    pile = [objet]
+    while pile:
+        o = pile.pop()
+        if id(o) in deja_vus:
+            continue
+        deja_vus.add(id(o))
+
+        if isinstance(o, _TYPES_OPAQUES):
+            continue
+        if isinstance(o, _TYPES_FEUILLES):
+            total += sys.getsizeof(o)
+        elif isinstance(o, np.ndarray):
+            # Une vue ne coûte que son en-tête : son tampon est compté une fois, sur l'objet qui le possède
+            total += sys.getsizeof(o)
+            if o.base is not None:
+                pile.append(o.base)
+        elif isinstance(o, pd.DataFrame):
+            total += int(o.memory_usage(index=True, deep=True).sum())
+        elif isinstance(o, (pd.Series, pd.Index)):
+            total += int(o.memory_usage(deep=True))
+        elif isinstance(o, Figure):
+            total += _taille_figure(o)
+        else:
+            total += sys.getsizeof(o)
+            if isinstance(o, dict):
+                pile.extend(o.keys())
+                pile.extend(o.values())
+            elif isinstance(o, (list, tuple, set, frozenset, deque)):
+                pile.extend(o)
+            else:
+                if hasattr(o, "__dict__"):
+                    pile.append(vars(o))
+                for classe in type(o).__mro__:
+                    for nom in getattr(classe, "__slots__", ()):
+                        if hasattr(o, nom):
+                            pile.append(getattr(o, nom))
+    return total
+
+
+def _previsions_session(etat: MutableMapping) -> list:
+    """Prévisions de la session dont les résultats peuvent être en cache"""
+    previsions = [etat.get("previsions_annuelles")]
+    previsions.extend(entite.previsions for entite in etat.get("entites_groupe") or [])
+    return [p for p in previsions if p is not None]
+
+
+def inventaire(etat: MutableMapping, cles: Iterable[str] = None) -> Dict[str, int]:
+    """Octets attribués à chaque clé de l'état de session.
+
+    Les clés de base sont mesurées avant les clés dérivées : la taille d'une
+    clé dérivée est donc ce que son éviction libère réellement. Les résultats
+    en cache des prévisions sont mis de côté d'abord, pour ne pas être
+    attribués à la clé qui porte les prévisions.
+    """
+    cles = list(etat.keys()) + [RESULTATS_PREVISIONS] if cles is None else list(cles)
+    derivees = [c for c in CLES_DERIVEES if c in cles]
+    deja_vus: Set[int] = set()
+    tailles = {}
+    if RESULTATS_PREVISIONS in cles:
+        vus_caches: Set[int] = set()
+        caches = [p.resultats_en_cache for p in _previsions_session(etat)]
+        taille_caches = sum(taille_profonde(c, vus_caches) for c in caches if c is not None)
+        deja_vus |= vus_caches
+    for cle in [c for c in cles if c not in CLES_DERIVEES] + derivees:
+        if cle == RESULTATS_PREVISIONS:
+            tailles[cle] = taille_caches
+            continue
+        try:
+            tailles[cle] = taille_profonde(etat[cle], deja_vus)
+        except KeyError:
+            continue
+    return tailles
+
+
+def evincer(etat: MutableMapping, a_liberer: float = float('inf'),
+            tailles: Dict[str, int] = None) -> List[str]:
+    """Retire des clés dérivées jusqu'à libérer `a_liberer` octets (toutes par défaut)"""
+    evincees = []
+    libere = 0
+    for cle in CLES_DERIVEES:
+        if libere >= a_liberer:
+            break
+        if cle == RESULTATS_PREVISIONS:
+            if not [p for p in _previsions_session(etat) if p.liberer_resultats()]:
+                continue
+        else:
+            try:
+                del etat[cle]
+            except KeyError:
+                continue
+        evincees.append(cle)
+        libere += (tailles or {}).get(cle, 0)
+    return evincees
+
+
+@dataclass(slots=True)
+class SuiviSession:
+    """Dernière mesure connue d'une session"""
+    reference: object                    # weakref vers l'état (ou l'état lui-même)
+    dernier_acces: float
+    derniere_mesure: float = float('-inf')
+    tailles: Dict[str, int] = field(default_factory=dict)
+    inactive_evincee: bool = False
+
+    @property
+    def etat(self) -> Optional[MutableMapping]:
+        return self.reference() if isinstance(self.reference, weakref.ref) else self.reference
+
+    @property
+    def total(self) -> int:
+        return sum(self.tailles.values())
+
+    @property
+    def derives(self) -> int:
+        return sum(t for c, t in self.tailles.items() if c in CLES_DERIVEES)
+
+
+class RegistreSessions:
+    """Registre des sessions du processus : budget par session et éviction des inactives"""
+
+    def __init__(self, budget_octets: int, delai_inactivite_s: float, intervalle_mesure_s: float):
+        self.budget_octets = budget_octets
+        self.delai_inactivite_s = delai_inactivite_s
+        self.intervalle_mesure_s = intervalle_mesure_s
+        self._verrou = threading.Lock()
+        self._sessions: Dict[str, SuiviSession] = {}
+        self._derniere_revue = float('-inf')
+        self.nb_evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def suivre(self, id_session: str, etat: MutableMapping, vue: MutableMapping = None,
+               maintenant: float = None) -> SuiviSession:
+        """Note l'activité d'une session, la mesure périodiquement et applique le budget.
+
+        `etat` est conservé pour l'éviction depuis d'autres threads ; `vue` (par défaut
+        `etat`) sert à parcourir les clés dans le thread de la session.
+        """
+        maintenant = time.monotonic() if maintenant is None else maintenant
+        vue = etat if vue is None else vue
+        with self._verrou:
+            suivi = self._sessions.get(id_session)
+            if suivi is None or suivi.etat is not etat:
+                try:
+                    reference = weakref.ref(etat)
+                except TypeError:
+                    reference = etat
+                suivi = self._sessions[id_session] = SuiviSession(reference, maintenant)
+            suivi.dernier_acces = maintenant
+            suivi.inactive_evincee = False
+            a_mesurer = maintenant - suivi.derniere_mesure >= self.intervalle_mesure_s
+
+        if a_mesurer:
+            suivi.tailles = inventaire(vue)
+            suivi.derniere_mesure = maintenant
+            if suivi.total > self.budget_octets:
+                evincees = evincer(etat, suivi.total - self.budget_octets, suivi.tailles)
+                for cle in evincees:
+                    suivi.tailles.pop(cle, None)
+                self.nb_evictions += len(evincees)
+
+        if maintenant - self._derniere_revue >= self.intervalle_mesure_s:
+            self.evincer_inactives(maintenant)
+        return suivi
+
+    def evincer_inactives(self, maintenant: float = None) -> int:
+        """Évince les données dérivées des sessions inactives ; retourne le nombre de sessions traitées"""
+        maintenant = time.monotonic() if maintenant is None else maintenant
+        with self._verrou:
+            self._derniere_revue = maintenant
+            sessions = list(self._sessions.items())
+
+        nb_sessions = 0
+        for id_session, suivi in sessions:
+            etat = suivi.etat
+            if etat is None:
+                # Session fermée par Streamlit : plus rien à suivre
+                with self._verrou:
+                    self._sessions.pop(id_session, None)
+                continue
+            if suivi.inactive_evincee or maintenant - suivi.dernier_acces < self.delai_inactivite_s:
+                continue
+            evincees = evincer(etat)
+            for cle in evincees:
+                suivi.tailles.pop(cle, None)
+            suivi.inactive_evincee = True
+            self.nb_evictions += len(evincees)
+            nb_sessions += 1
+        return nb_sessions
+
+    def oublier(self, id_session: str):
+        with self._verrou:
+            self._sessions.pop(id_session, None)
+
+    def totaux(self, maintenant: float = None) -> dict:
+        """Totaux du processus pour la vue d'administration"""
+        maintenant = time.monotonic() if maintenant is None else maintenant
+        with self._verrou:
+            sessions = list(self._sessions.items())
+        return {
+            "nb_sessions": len(sessions),
+            "octets_total": sum(s.total for _, s in sessions),
+            "octets_derives": sum(s.derives for _, s in sessions),
+            "nb_evictions": self.nb_evictions,
+            "sessions": sorted((
+                {"session": id_session[:8], "octets": s.total, "octets_derives": s.derives,
+                 "inactivite_s": maintenant - s.dernier_acces, "cle_principale": max(s.tailles, key=s.tailles.get, default="")}
+                for id_session, s in sessions
+            ), key=lambda s: -s["octets"])
+        }
+
+
+_registre: Optional[RegistreSessions] = None
+_verrou_registre = threading.Lock()
+
+
+def registre() -> RegistreSessions:
+    """Registre partagé par toutes les sessions du processus"""
+    global _registre
+    with _verrou_registre:
+        if _registre is None:
+            _registre = RegistreSessions(
+                MEMOIRE_CONFIG["budget_session_octets"],
+                MEMOIRE_CONFIG["delai_inactivite_s"],
+                MEMOIRE_CONFIG["intervalle_mesure_s"]
+            )
+        return _registre
+
+
+def suivre_session_courante(session_state: MutableMapping) -> Optional[SuiviSession]:
+    """Enregistre la session Streamlit en cours (à appeler à chaque exécution du script)"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+    # ctx.session_state reste valable hors du thread de la session, contrairement à st.session_state
+    return registre().suivre(ctx.session_id, ctx.session_state, vue=session_state)
+
+
+def memoire_processus() -> int:
+    """Mémoire résidente du processus en octets (0 si indisponible)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
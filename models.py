@@ -2,17 +2,27 @@
 """Modèles de données et logique métier pour le calculateur Caribo"""
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence
 from datetime import datetime
+import itertools
 import uuid
 
+import numpy as np
+
 from config import (
     TAUX_IS, TAUX_TVA, TAUX_MAINTENANCE_MIN, TAUX_MAINTENANCE_MAX,
-    NIVEAUX_COMPLEXITE
+    NIVEAUX_COMPLEXITE, CONDITIONS_PAIEMENT_DEFAUT
+)
+from monnaie import (
+    en_centimes, en_euros, appliquer_facteur, calculer_tva, calculer_maintenance, impot_societes
 )
+from perf import chronometre
 
+# Identifiants de lignes de service, uniques dans le processus (clés de widgets stables)
+_compteur_lignes = itertools.count(1)
 
-@dataclass
+
+@dataclass(slots=True)
 class FacteurVariation:
     """Représente un facteur qui influence le prix d'un service"""
     nom: str
@@ -22,7 +32,7 @@ class FacteurVariation:
     valeur_defaut: float = 1.0
 
 
-@dataclass
+@dataclass(slots=True)
 class Service:
     """Représente un service du catalogue Caribô"""
     id: str
@@ -35,65 +45,103 @@ class Service:
     prix_max: float
     facteurs_variation: List[FacteurVariation] = field(default_factory=list)
     maintenance_applicable: bool = False
+    # Position de chaque facteur dans facteurs_variation, partagée par toutes les lignes de service
+    index_facteurs: Dict[str, int] = field(init=False, repr=False, compare=False, default=None)
+    valeurs_defaut: tuple = field(init=False, repr=False, compare=False, default=())
+
+    def __post_init__(self):
+        self.index_facteurs = {f.nom: i for i, f in enumerate(self.facteurs_variation)}
+        self.valeurs_defaut = tuple(f.valeur_defaut for f in self.facteurs_variation)
+
+    def aligner_facteurs(self, facteurs_custom: Dict[str, float] = None) -> tuple:
+        """Convertit un dictionnaire de facteurs en valeurs alignées sur facteurs_variation"""
+        if not facteurs_custom:
+            return self.valeurs_defaut
+        return tuple(facteurs_custom.get(f.nom, f.valeur_defaut) for f in self.facteurs_variation)
+
+    def calculer_prix_valeurs(self, valeurs: Sequence[float]) -> float:
+        """Calcule le prix à partir de valeurs de facteurs alignées sur facteurs_variation"""
+        if not valeurs:
+            return self.prix_min + (self.prix_max - self.prix_min) * 0.5
+
+        # Normaliser chaque valeur entre 0 et 1 puis prendre l'impact moyen
+        impact_total = 0.0
+        for facteur, valeur in zip(self.facteurs_variation, valeurs):
+            impact_total += (valeur - facteur.impact_min) / (facteur.impact_max - facteur.impact_min)
+        return self.prix_min + (self.prix_max - self.prix_min) * impact_total / len(valeurs)
 
     def calculer_prix(self, complexite: str = "Moyenne", facteurs_custom: Dict[str, float] = None) -> float:
         """Calcule le prix du service en fonction de la complexité ou des facteurs personnalisés"""
         if facteurs_custom:
             # Mode avancé : calcul basé sur les facteurs personnalisés
-            prix_base = self.prix_min
-            ecart = self.prix_max - self.prix_min
-
-            # Calculer l'impact moyen des facteurs
-            impacts = []
-            for facteur in self.facteurs_variation:
-                valeur = facteurs_custom.get(facteur.nom, facteur.valeur_defaut)
-                # Normaliser la valeur entre 0 et 1
-                impact_normalise = (valeur - facteur.impact_min) / (facteur.impact_max - facteur.impact_min)
-                impacts.append(impact_normalise)
-
-            impact_moyen = sum(impacts) / len(impacts) if impacts else 0.5
-            return prix_base + (ecart * impact_moyen)
+            return self.calculer_prix_valeurs(self.aligner_facteurs(facteurs_custom))
         else:
             # Mode simple : utiliser le niveau de complexité
             niveau = NIVEAUX_COMPLEXITE.get(complexite, 0.5)
             return self.prix_min + (self.prix_max - self.prix_min) * niveau
 
 
-@dataclass
+@dataclass(slots=True, init=False)
 class ServiceSelectionne:
-    """Représente un service sélectionné pour un projet avec ses paramètres"""
-    service: Service
-    complexite: str = "Moyenne"
-    facteurs_custom: Dict[str, float] = field(default_factory=dict)
-    quantite: int = 1
-    prix_unitaire: float = 0.0
+    """Représente un service sélectionné pour un projet avec ses paramètres.
 
-    def __post_init__(self):
-        # CORRECTION : Initialiser automatiquement les facteurs_custom avec les valeurs par défaut
-        # si ils n'existent pas et que le service a des facteurs_variation
-        if not self.facteurs_custom and self.service.facteurs_variation:
-            for facteur in self.service.facteurs_variation:
-                self.facteurs_custom[facteur.nom] = facteur.valeur_defaut
+    Les facteurs sont stockés dans `valeurs_facteurs`, un tuple aligné sur
+    `service.facteurs_variation` ; `facteurs_custom` en offre la vue par nom.
+    `uid` identifie la ligne indépendamment de sa position dans le projet.
+    """
+    service: Service
+    complexite: str
+    valeurs_facteurs: tuple
+    quantite: int
+    prix_unitaire: float
+    uid: int = field(compare=False, repr=False)
+
+    def __init__(self, service: Service, complexite: str = "Moyenne",
+                 facteurs_custom: Dict[str, float] = None, quantite: int = 1,
+                 prix_unitaire: float = 0.0):
+        self.service = service
+        self.complexite = complexite
+        # Les facteurs non renseignés prennent la valeur par défaut du catalogue
+        self.valeurs_facteurs = service.aligner_facteurs(facteurs_custom)
+        self.quantite = quantite
+        self.prix_unitaire = prix_unitaire
+        self.uid = next(_compteur_lignes)
 
         if self.prix_unitaire == 0:
-            # Utiliser les facteurs_custom si disponibles, sinon la complexité
-            if self.facteurs_custom:
-                self.prix_unitaire = self.service.calculer_prix(facteurs_custom=self.facteurs_custom)
+            # Utiliser les facteurs si le service en a, sinon la complexité
+            if self.valeurs_facteurs:
+                self.prix_unitaire = service.calculer_prix_valeurs(self.valeurs_facteurs)
             else:
-                self.prix_unitaire = self.service.calculer_prix(self.complexite)
+                self.prix_unitaire = service.calculer_prix(self.complexite)
+
+    @property
+    def facteurs_custom(self) -> Dict[str, float]:
+        return dict(zip(self.service.index_facteurs, self.valeurs_facteurs))
+
+    @facteurs_custom.setter
+    def facteurs_custom(self, facteurs: Dict[str, float]):
+        self.valeurs_facteurs = self.service.aligner_facteurs(facteurs)
+
+    @property
+    def prix_unitaire_centimes(self) -> int:
+        return en_centimes(self.prix_unitaire)
+
+    @property
+    def prix_total_centimes(self) -> int:
+        return en_centimes(self.prix_unitaire) * self.quantite
 
     @property
     def prix_total(self) -> float:
-        return self.prix_unitaire * self.quantite
+        return en_euros(self.prix_total_centimes)
 
     @property
     def maintenance_annuelle(self) -> float:
         if self.service.maintenance_applicable:
-            return self.prix_total * TAUX_MAINTENANCE_MIN
+            return en_euros(calculer_maintenance(self.prix_total_centimes, TAUX_MAINTENANCE_MIN))
         return 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class Projet:
     """Représente un projet client avec l'ensemble des services sélectionnés"""
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
@@ -103,23 +151,43 @@ class Projet:
     date_creation: datetime = field(default_factory=datetime.now)
     services: List[ServiceSelectionne] = field(default_factory=list)
     taux_maintenance: float = TAUX_MAINTENANCE_MIN
+    conditions_paiement: str = CONDITIONS_PAIEMENT_DEFAUT
+
+    # Totaux exacts en centimes (voir monnaie.py) ; les propriétés en euros en dérivent
+
+    @property
+    def total_ht_centimes(self) -> int:
+        return sum(s.prix_total_centimes for s in self.services)
+
+    @property
+    def tva_centimes(self) -> int:
+        return calculer_tva(self.total_ht_centimes, TAUX_TVA)
+
+    @property
+    def total_ttc_centimes(self) -> int:
+        total_ht = self.total_ht_centimes
+        return total_ht + calculer_tva(total_ht, TAUX_TVA)
+
+    @property
+    def maintenance_annuelle_centimes(self) -> int:
+        base = sum(s.prix_total_centimes for s in self.services if s.service.maintenance_applicable)
+        return calculer_maintenance(base, self.taux_maintenance)
 
     @property
     def total_ht(self) -> float:
-        return sum(s.prix_total for s in self.services)
+        return en_euros(self.total_ht_centimes)
 
     @property
     def tva(self) -> float:
-        return self.total_ht * TAUX_TVA
+        return en_euros(self.tva_centimes)
 
     @property
     def total_ttc(self) -> float:
-        return self.total_ht + self.tva
+        return en_euros(self.total_ttc_centimes)
 
     @property
     def maintenance_annuelle_ht(self) -> float:
-        services_tech = [s for s in self.services if s.service.maintenance_applicable]
-        return sum(s.prix_total * self.taux_maintenance for s in services_tech)
+        return en_euros(self.maintenance_annuelle_centimes)
 
     def ajouter_service(self, service: Service, complexite: str = "Moyenne",
                        quantite: int = 1, facteurs_custom: Dict[str, float] = None):
@@ -143,20 +211,23 @@ class Projet:
             nom=f"{self.nom} (copie)",
             client=self.client,
             type_client=self.type_client,
-            taux_maintenance=self.taux_maintenance
+            taux_maintenance=self.taux_maintenance,
+            conditions_paiement=self.conditions_paiement
         )
         for service in self.services:
-            nouveau.services.append(ServiceSelectionne(
+            copie = ServiceSelectionne(
                 service=service.service,
                 complexite=service.complexite,
-                facteurs_custom=service.facteurs_custom.copy(),
                 quantite=service.quantite,
                 prix_unitaire=service.prix_unitaire
-            ))
+            )
+            # Le tuple de facteurs est immuable : il est partagé sans copie
+            copie.valeurs_facteurs = service.valeurs_facteurs
+            nouveau.services.append(copie)
         return nouveau
 
 
-@dataclass
+@dataclass(slots=True)
 class PrevisionAnnuelle:
     """Représente les prévisions pour une année"""
     annee: int
@@ -164,41 +235,71 @@ class PrevisionAnnuelle:
     charges_fixes: Dict[str, float] = field(default_factory=dict)
     taux_croissance: float = 0.0
 
+    @property
+    def ca_projets_centimes(self) -> int:
+        return sum(p.total_ht_centimes for p in self.projets)
+
+    @property
+    def ca_maintenance_centimes(self) -> int:
+        return sum(p.maintenance_annuelle_centimes for p in self.projets)
+
+    @property
+    def ca_total_centimes(self) -> int:
+        ca_base = self.ca_projets_centimes + self.ca_maintenance_centimes
+        if self.annee > 1:
+            return appliquer_facteur(ca_base, (1 + self.taux_croissance) ** (self.annee - 1))
+        return ca_base
+
+    @property
+    def total_charges_fixes_centimes(self) -> int:
+        return sum(en_centimes(montant) for montant in self.charges_fixes.values())
+
+    @property
+    def resultat_brut_centimes(self) -> int:
+        return self.ca_total_centimes - self.total_charges_fixes_centimes
+
+    @property
+    def impot_centimes(self) -> int:
+        return impot_societes(self.resultat_brut_centimes, TAUX_IS)
+
+    @property
+    def resultat_net_centimes(self) -> int:
+        resultat_brut = self.resultat_brut_centimes
+        return resultat_brut - impot_societes(resultat_brut, TAUX_IS)
+
     @property
     def ca_projets(self) -> float:
-        return sum(p.total_ht for p in self.projets)
+        return en_euros(self.ca_projets_centimes)
 
     @property
     def ca_maintenance(self) -> float:
-        return sum(p.maintenance_annuelle_ht for p in self.projets)
+        return en_euros(self.ca_maintenance_centimes)
 
     @property
     def ca_total(self) -> float:
-        ca_base = self.ca_projets + self.ca_maintenance
-        if self.annee > 1:
-            return ca_base * (1 + self.taux_croissance) ** (self.annee - 1)
-        return ca_base
+        return en_euros(self.ca_total_centimes)
 
     @property
     def total_charges_fixes(self) -> float:
-        return sum(self.charges_fixes.values())
+        return en_euros(self.total_charges_fixes_centimes)
 
     @property
     def resultat_brut(self) -> float:
-        return self.ca_total - self.total_charges_fixes
+        return en_euros(self.resultat_brut_centimes)
 
     @property
     def impot(self) -> float:
-        return max(0, self.resultat_brut * TAUX_IS)
+        return en_euros(self.impot_centimes)
 
     @property
     def resultat_net(self) -> float:
-        return self.resultat_brut - self.impot
+        return en_euros(self.resultat_net_centimes)
 
     @property
     def taux_marge(self) -> float:
-        if self.ca_total > 0:
-            return self.resultat_net / self.ca_total
+        ca_total = self.ca_total_centimes
+        if ca_total > 0:
+            return self.resultat_net_centimes / ca_total
         return 0.0
 
 
@@ -207,10 +308,18 @@ class Previsions:
     """Gère l'ensemble des prévisions sur plusieurs années"""
     nom_scenario: str = "Personnalisé"
     annees: List[PrevisionAnnuelle] = field(default_factory=list)
+    # Incrémenté à chaque modification : invalide le tableau de résultats partagé
+    version: int = field(default=0, init=False, repr=False, compare=False)
+    _resultats_partages: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+
+    def marquer_modifie(self):
+        self.version += 1
 
     def ajouter_annee(self, prevision: PrevisionAnnuelle):
         self.annees.append(prevision)
+        self.marquer_modifie()
 
+    @chronometre("modele.generer_projections")
     def generer_projections(self, nb_annees: int, taux_croissance: float,
                           charges_fixes_base: Dict[str, float],
                           taux_inflation: float = 0.02):
@@ -238,22 +347,77 @@ class Previsions:
 
             self.ajouter_annee(prevision)
 
+    def colonnes_centimes(self) -> Dict[str, np.ndarray]:
+        """Montants de chaque année en centimes int64, mêmes règles que les propriétés de PrevisionAnnuelle"""
+        n = len(self.annees)
+        annees = np.fromiter((p.annee for p in self.annees), dtype=np.int64, count=n)
+        taux_croissance = np.fromiter((p.taux_croissance for p in self.annees), dtype=np.float64, count=n)
+        charges_fixes = np.fromiter((p.total_charges_fixes_centimes for p in self.annees), dtype=np.int64, count=n)
+
+        # Les années projetées partagent la liste de projets de l'année 1 : CA calculé une fois par liste
+        ca_par_liste: Dict[int, tuple] = {}
+        ca_projets = np.empty(n, dtype=np.int64)
+        ca_maintenance = np.empty(n, dtype=np.int64)
+        for i, prev in enumerate(self.annees):
+            ca = ca_par_liste.get(id(prev.projets))
+            if ca is None:
+                ca = ca_par_liste[id(prev.projets)] = (prev.ca_projets_centimes, prev.ca_maintenance_centimes)
+            ca_projets[i], ca_maintenance[i] = ca
+
+        ca_base = ca_projets + ca_maintenance
+        croissance = (1 + taux_croissance) ** (annees - 1)
+        ca_total = np.where(annees > 1, appliquer_facteur(ca_base, croissance), ca_base)
+        resultat_brut = ca_total - charges_fixes
+        impot = impot_societes(resultat_brut, TAUX_IS)
+        resultat_net = resultat_brut - impot
+
+        return {
+            "Année": annees,
+            "CA Projets": ca_projets,
+            "CA Maintenance": ca_maintenance,
+            "CA Total": ca_total,
+            "Charges fixes": charges_fixes,
+            "Résultat brut": resultat_brut,
+            "Impôt": impot,
+            "Résultat net": resultat_net
+        }
+
+    def colonnes_resultats(self) -> Dict[str, np.ndarray]:
+        """Résultats de chaque année en colonnes : montants en euros, identiques au centime aux propriétés"""
+        colonnes = self.colonnes_centimes()
+        ca_total, resultat_net = colonnes["CA Total"], colonnes["Résultat net"]
+        taux_marge = np.divide(resultat_net, ca_total, out=np.zeros(len(ca_total)), where=ca_total > 0)
+        resultats = {nom: valeurs if nom == "Année" else en_euros(valeurs) for nom, valeurs in colonnes.items()}
+        resultats["Taux de marge"] = taux_marge
+        return resultats
+
+    @chronometre("modele.dataframe_resultats")
     def get_dataframe_resultats(self):
         """Retourne un DataFrame avec les résultats pour toutes les années"""
         import pandas as pd
+        return pd.DataFrame(self.colonnes_resultats())
+
+    def get_dataframe_resultats_partage(self):
+        """Retourne le DataFrame des résultats en lecture seule, partagé jusqu'à la prochaine modification.
+
+        Toute écriture lève une ValueError : copier le tableau avant de le modifier.
+        """
+        import pandas as pd
+        cle = (self.version, len(self.annees))
+        if self._resultats_partages is None or self._resultats_partages[0] != cle:
+            colonnes = self.colonnes_resultats()
+            for valeurs in colonnes.values():
+                valeurs.flags.writeable = False
+            self._resultats_partages = (cle, pd.DataFrame(colonnes, copy=False))
+        return self._resultats_partages[1]
 
-        resultats = []
-        for prev in self.annees:
-            resultats.append({
-                "Année": prev.annee,
-                "CA Projets": prev.ca_projets,
-                "CA Maintenance": prev.ca_maintenance,
-                "CA Total": prev.ca_total,
-                "Charges fixes": prev.total_charges_fixes,
-                "Résultat brut": prev.resultat_brut,
-                "Impôt": prev.impot,
-                "Résultat net": prev.resultat_net,
-                "Taux de marge": prev.taux_marge
-            })
-
-        return pd.DataFrame(resultats)
+    @property
+    def resultats_en_cache(self):
+        """DataFrame partagé actuellement conservé (None s'il n'a pas été construit ou a été libéré)"""
+        return self._resultats_partages[1] if self._resultats_partages is not None else None
+
+    def liberer_resultats(self) -> bool:
+        """Libère le DataFrame partagé, reconstruit au prochain appel ; vrai s'il y en avait un"""
+        libere = self._resultats_partages is not None
+        self._resultats_partages = None
+        return libere
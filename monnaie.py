@@ -0,0 +1,115 @@
+# monnaie.py
+"""Montants en centimes entiers : arrondis explicites pour la TVA, la maintenance et l'IS
+
+Les prix saisis restent des euros (float) ; tout total est calculé en centimes
+entiers (int, ou tableau int64 pour les calculs par lot), puis reconverti en
+euros pour l'affichage. Les sommes sont donc exactes et le devis tombe juste :
+Total TTC = Total HT + TVA, au centime près, comme en comptabilité.
+
+Règles d'arrondi (au plus proche, les demis s'éloignant de zéro) :
+- prix unitaire : au centime ;
+- TVA : au centime, sur le total HT du devis (pas ligne par ligne) ;
+- maintenance : au centime, sur le total HT des lignes concernées ;
+- croissance d'une année sur l'autre : CA annuel au centime ;
+- IS : bénéfice imposable arrondi à l'euro, impôt au centime.
+
+Les taux sont convertis en millionièmes entiers : un montant × taux reste en
+int64 tant que le montant ne dépasse pas MONTANT_MAX_CENTIMES.
+"""
+
+import math
+from typing import Sequence, Union
+
+import numpy as np
+
+from config import TAUX_TVA, TAUX_IS
+
+CENTIMES_PAR_EURO = 100
+UNITE_TAUX = 1_000_000
+MONTANT_MAX_CENTIMES = np.iinfo(np.int64).max // UNITE_TAUX  # ≈ 92 milliards d'euros
+
+# Absorbe l'erreur de représentation binaire : 1,005 € vaut 100,49999… centimes en float
+_TOLERANCE = 1e-6
+
+Montants = Union[float, Sequence[float], np.ndarray]
+Centimes = Union[int, np.ndarray]
+
+# Nombres traités en arithmétique Python (np.ndim coûte une conversion en tableau)
+_SCALAIRES = (int, float, np.integer, np.floating)
+
+
+def _est_scalaire(valeur) -> bool:
+    return isinstance(valeur, _SCALAIRES) or (isinstance(valeur, np.ndarray) and valeur.ndim == 0)
+
+
+def _arrondir(valeurs: Montants, facteur: Montants = 1.0) -> Centimes:
+    """Arrondit valeurs × facteur, exprimé en centimes (float), au centime, demis loin de zéro"""
+    if _est_scalaire(valeurs) and _est_scalaire(facteur):
+        valeur = float(valeurs) * float(facteur)
+        arrondi = math.floor(abs(valeur) + 0.5 + _TOLERANCE)
+        return -arrondi if valeur < 0 else arrondi
+    # Un seul tableau intermédiaire, modifié en place ; astype tronque vers zéro,
+    # il suffit donc d'ajouter ±0,5 selon le signe
+    decales = np.multiply(valeurs, facteur, dtype=np.float64)
+    negatifs = decales < 0 if decales.size and decales.min() < 0 else None
+    decales += 0.5 + _TOLERANCE
+    if negatifs is not None:
+        decales[negatifs] -= 1 + 2 * _TOLERANCE
+    return decales.astype(np.int64)
+
+
+def _diviser_arrondi(numerateur: Centimes, diviseur: int, multiplicateur: int = 1) -> Centimes:
+    """Division entière de numerateur × multiplicateur, arrondie au plus proche, demis loin de zéro"""
+    if _est_scalaire(numerateur):
+        produit = int(numerateur) * multiplicateur
+        quotient = (abs(produit) + diviseur // 2) // diviseur
+        return -quotient if produit < 0 else quotient
+    quotient = np.multiply(numerateur, multiplicateur, dtype=np.int64)
+    negatifs = quotient < 0 if quotient.size and quotient.min() < 0 else None
+    if negatifs is not None:
+        np.negative(quotient, out=quotient, where=negatifs)
+    quotient += diviseur // 2
+    quotient //= diviseur
+    if negatifs is not None:
+        np.negative(quotient, out=quotient, where=negatifs)
+    return quotient
+
+
+def en_centimes(euros: Montants) -> Centimes:
+    """Montant en euros → centimes entiers (int, ou tableau int64)"""
+    return _arrondir(euros, CENTIMES_PAR_EURO)
+
+
+def en_euros(centimes: Centimes) -> Union[float, np.ndarray]:
+    """Centimes entiers → euros (float, ou tableau float64) pour l'affichage et les graphiques"""
+    if _est_scalaire(centimes):
+        return int(centimes) / CENTIMES_PAR_EURO
+    return np.asarray(centimes, dtype=np.int64) / CENTIMES_PAR_EURO
+
+
+def appliquer_taux(centimes: Centimes, taux: float) -> Centimes:
+    """Montant × taux, arrondi au centime, en arithmétique entière"""
+    return _diviser_arrondi(centimes, UNITE_TAUX, round(taux * UNITE_TAUX))
+
+
+def appliquer_facteur(centimes: Centimes, facteur: Montants) -> Centimes:
+    """Montant × facteur quelconque (croissance composée…), arrondi au centime"""
+    return _arrondir(centimes, facteur)
+
+
+def calculer_tva(ht_centimes: Centimes, taux: float = TAUX_TVA) -> Centimes:
+    """TVA d'un total HT, arrondie au centime"""
+    return appliquer_taux(ht_centimes, taux)
+
+
+def calculer_maintenance(ht_centimes: Centimes, taux: float) -> Centimes:
+    """Maintenance annuelle d'un total HT de lignes concernées, arrondie au centime"""
+    return appliquer_taux(ht_centimes, taux)
+
+
+def impot_societes(resultat_centimes: Centimes, taux: float = TAUX_IS) -> Centimes:
+    """IS d'un résultat : base arrondie à l'euro, nulle en cas de perte ; impôt au centime"""
+    base = _diviser_arrondi(resultat_centimes, CENTIMES_PAR_EURO) * CENTIMES_PAR_EURO
+    if _est_scalaire(base):
+        return appliquer_taux(max(0, base), taux)
+    return appliquer_taux(np.maximum(0, base), taux)
@@ -0,0 +1,74 @@
+# moteur_calculateur.py
+"""Moteur de calcul du calculateur financier autonome (calculateur.py)"""
+
+import pandas as pd
+
+
+def calculer_resultats(activites, rh, charges_fixes, projection, services,
+                       taux_is=0.25, taux_charges_patronales=0.6):
+    """Calcule les résultats financiers année par année (sans dépendance à Streamlit)"""
+    resultats = []
+    annees = projection["annees"]
+    taux_croissance = projection["taux_croissance"]
+
+    # Calcul du CA initial
+    ca_initial = 0
+    for service, quantite in activites.items():
+        prix_unitaire = services[service]["prix_unitaire"]
+        ca_initial += quantite * prix_unitaire
+
+    # Abonnements de maintenance (15-20% des projets)
+    valeur_projets = activites["projets_sur_mesure"] * services["projets_sur_mesure"]["prix_unitaire"]
+    maintenance_initiale = valeur_projets * 0.15  # 15% du coût des projets
+    ca_initial += maintenance_initiale
+
+    # Charges de personnel initiales
+    salaires_fondateurs_base = rh["nb_fondateurs"] * rh["salaire_net_fondateur"] * (1 + taux_charges_patronales) * 12
+    salaires_autres_base = rh["nb_salaries"] * rh["salaire_chargé_salarié"] + rh["nb_alternants"] * rh["cout_alternant"]
+
+    # Total des charges fixes
+    total_charges_fixes_base = sum(charges_fixes.values())
+
+    for annee in range(1, annees+1):
+        # Application du taux de croissance au CA
+        ca = ca_initial * (1 + taux_croissance) ** (annee-1)
+
+        # Évolution des salaires
+        salaires_fondateurs = salaires_fondateurs_base * (1 + 0.02) ** (annee-1)  # 2% d'inflation sur salaires
+
+        # Pour les autres salaires, on suit une logique d'embauche progressive
+        if annee == 1:
+            salaires_autres = salaires_autres_base
+        else:
+            # Embauche progressive - hypothèse d'une équipe qui grandit avec le CA
+            # Au-delà de 100k€ de CA, on ajoute 1 salarié par tranches de 50k€ supplémentaires
+            salaries_theoriques = max(0, int((ca - 100000) / 50000))
+            salaires_autres = salaries_theoriques * rh["salaire_chargé_salarié"]
+
+        # Évolution des charges fixes: on sépare l'inflation des coûts fixes
+        # - Loyer: indexé sur l'inflation (2%)
+        # - Logiciels, matériel: indexé sur la croissance
+        charges_fixes_inflations = charges_fixes["loyer"] * (1 + 0.02) ** (annee-1)
+        charges_fixes_variables = (total_charges_fixes_base - charges_fixes["loyer"]) * (1 + taux_croissance/2) ** (annee-1)
+        charges_fixes_actuelles = charges_fixes_inflations + charges_fixes_variables
+
+        # Calculs financiers
+        total_charges = salaires_fondateurs + salaires_autres + charges_fixes_actuelles
+        resultat_brut = ca - total_charges
+        impot = max(0, resultat_brut * taux_is)
+        resultat_net = resultat_brut - impot
+
+        resultats.append({
+            "Année": annee,
+            "CA": ca,
+            "Salaires fondateurs": salaires_fondateurs,
+            "Autres salaires": salaires_autres,
+            "Charges fixes": charges_fixes_actuelles,
+            "Total charges": total_charges,
+            "Résultat brut": resultat_brut,
+            "Impôt": impot,
+            "Résultat net": resultat_net,
+            "Taux de marge": resultat_net / ca if ca > 0 else 0
+        })
+
+    return pd.DataFrame(resultats)
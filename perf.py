@@ -0,0 +1,246 @@
+# perf.py
+"""Instrumentation des temps de calcul par exécution (rerun) Streamlit"""
+
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Dict, Optional, MutableMapping
+
+from config import PERF_CONFIG
+
+# Exécution en cours dans le thread du script ; None quand la mesure est désactivée
+_rerun_courant: ContextVar[Optional['Rerun']] = ContextVar("rerun_courant", default=None)
+_CONTEXTE_NUL = nullcontext()
+
+
+@dataclass(slots=True)
+class Span:
+    """Durée d'un bloc mesuré, relative au début de l'exécution"""
+    nom: str
+    debut_ms: float
+    duree_ms: float
+    profondeur: int
+
+
+@dataclass(slots=True)
+class Rerun:
+    """Ensemble des spans d'une exécution du script"""
+    session: str
+    horodatage: datetime = field(default_factory=datetime.now)
+    origine: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+    profondeur: int = 0
+    duree_ms: float = 0.0
+    interrompu: bool = False
+    termine: bool = False
+
+    def vers_dict(self) -> dict:
+        return {
+            "horodatage": self.horodatage.isoformat(timespec="milliseconds"),
+            "session": self.session,
+            "duree_ms": round(self.duree_ms, 3),
+            "interrompu": self.interrompu,
+            "spans": [{"nom": s.nom, "debut_ms": round(s.debut_ms, 3),
+                       "duree_ms": round(s.duree_ms, 3), "profondeur": s.profondeur}
+                      for s in self.spans]
+        }
+
+
+@contextmanager
+def _mesurer_actif(rerun: Rerun, nom: str):
+    debut = time.perf_counter()
+    profondeur = rerun.profondeur
+    rerun.profondeur += 1
+    try:
+        yield
+    finally:
+        rerun.profondeur = profondeur
+        fin = time.perf_counter()
+        rerun.spans.append(Span(nom, (debut - rerun.origine) * 1000, (fin - debut) * 1000, profondeur))
+
+
+def mesurer(nom: str):
+    """Context manager mesurant un bloc ; sans effet hors d'une exécution instrumentée"""
+    rerun = _rerun_courant.get()
+    if rerun is None or rerun.termine:
+        return _CONTEXTE_NUL
+    return _mesurer_actif(rerun, nom)
+
+
+def chronometre(nom: str = None):
+    """Décorateur mesurant chaque appel de la fonction"""
+    def decorateur(fonction):
+        libelle = nom or f"{fonction.__module__}.{fonction.__qualname__}"
+
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            rerun = _rerun_courant.get()
+            if rerun is None or rerun.termine:
+                return fonction(*args, **kwargs)
+            with _mesurer_actif(rerun, libelle):
+                return fonction(*args, **kwargs)
+        return enveloppe
+    return decorateur
+
+
+# --- Cycle d'une exécution -------------------------------------------------------------
+
+def debut_rerun(session_state: MutableMapping, actif: bool):
+    """Démarre la mesure d'une exécution (à appeler en tête de script).
+
+    Une exécution précédente restée ouverte (st.rerun, st.stop) est clôturée comme interrompue.
+    """
+    precedent = session_state.get('perf_rerun')
+    if precedent is not None and not precedent.termine:
+        fin_rerun(session_state, interrompu=True)
+
+    session_state['perf_actif'] = actif
+    if not actif:
+        _rerun_courant.set(None)
+        return
+    session = session_state.setdefault('perf_session', uuid.uuid4().hex[:8])
+    rerun = Rerun(session=session)
+    session_state['perf_rerun'] = rerun
+    _rerun_courant.set(rerun)
+
+
+def fin_rerun(session_state: MutableMapping, interrompu: bool = False) -> Optional[Rerun]:
+    """Clôture l'exécution, l'ajoute à l'historique de la session et au journal"""
+    rerun = session_state.get('perf_rerun')
+    if rerun is None or rerun.termine:
+        return None
+    rerun.termine = True
+    rerun.interrompu = interrompu
+    rerun.duree_ms = (time.perf_counter() - rerun.origine) * 1000
+    # Ordre d'ouverture des blocs, plus lisible qu'un ordre de fermeture
+    rerun.spans.sort(key=lambda s: (s.debut_ms, s.profondeur))
+
+    historique = session_state.get('perf_historique')
+    if historique is None:
+        historique = session_state['perf_historique'] = deque(maxlen=PERF_CONFIG["historique_reruns"])
+    historique.append(rerun)
+
+    try:
+        journal().enregistrer(rerun)
+    except OSError:
+        pass  # La mesure ne doit jamais empêcher l'application de fonctionner
+    return rerun
+
+
+def chronometre_fragment(nom: str = None):
+    """Décorateur à placer sous @st.fragment : mesure aussi les réexécutions du fragment seul.
+
+    Dans l'exécution complète du script, le fragment est un bloc mesuré comme avec
+    chronometre ; réexécuté seul, après fin_rerun, il est mesuré comme une exécution.
+    """
+    def decorateur(fonction):
+        mesure = chronometre(nom)(fonction)
+
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            rerun = _rerun_courant.get()
+            if rerun is not None and not rerun.termine:
+                return mesure(*args, **kwargs)
+            import streamlit as st  # Importé ici : perf est aussi chargé par les processus de calcul
+            if not st.session_state.get('perf_actif'):
+                return fonction(*args, **kwargs)
+            debut_rerun(st.session_state, True)
+            try:
+                resultat = mesure(*args, **kwargs)
+            except BaseException:  # st.rerun() lève une exception : exécution interrompue
+                fin_rerun(st.session_state, interrompu=True)
+                raise
+            fin_rerun(st.session_state)
+            return resultat
+        return enveloppe
+    return decorateur
+
+
+# --- Journal sur disque ----------------------------------------------------------------
+
+class JournalMesures:
+    """Journal JSONL à rotation par taille et export texte au format Prometheus"""
+
+    def __init__(self, chemin_jsonl: str, chemin_prometheus: str,
+                 taille_max_octets: int, nb_fichiers: int):
+        self.chemin_jsonl = chemin_jsonl
+        self.chemin_prometheus = chemin_prometheus
+        self.taille_max_octets = taille_max_octets
+        self.nb_fichiers = nb_fichiers
+        self._verrou = threading.Lock()
+        # Agrégats par nom de span : [nombre, somme en secondes, maximum en secondes]
+        self._agregats: Dict[str, List[float]] = {}
+        self._nb_reruns = 0
+
+    def enregistrer(self, rerun: Rerun):
+        ligne = json.dumps(rerun.vers_dict(), ensure_ascii=False) + "\n"
+        with self._verrou:
+            self._nb_reruns += 1
+            for span in [Span("rerun", 0.0, rerun.duree_ms, 0)] + rerun.spans:
+                agregat = self._agregats.setdefault(span.nom, [0, 0.0, 0.0])
+                agregat[0] += 1
+                agregat[1] += span.duree_ms / 1000
+                agregat[2] = max(agregat[2], span.duree_ms / 1000)
+
+            os.makedirs(os.path.dirname(self.chemin_jsonl) or ".", exist_ok=True)
+            self._pivoter()
+            with open(self.chemin_jsonl, "a", encoding="utf-8") as f:
+                f.write(ligne)
+            self._ecrire_prometheus()
+
+    def _pivoter(self):
+        """Renomme mesures.jsonl en mesures.jsonl.1 (etc.) quand il dépasse la taille maximale"""
+        try:
+            if os.path.getsize(self.chemin_jsonl) < self.taille_max_octets:
+                return
+        except FileNotFoundError:
+            return
+        for i in range(self.nb_fichiers - 1, 0, -1):
+            source = self.chemin_jsonl if i == 1 else f"{self.chemin_jsonl}.{i - 1}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.chemin_jsonl}.{i}")
+
+    def _ecrire_prometheus(self):
+        lignes = [
+            "# HELP caribo_reruns_total Exécutions du script mesurées",
+            "# TYPE caribo_reruns_total counter",
+            f"caribo_reruns_total {self._nb_reruns}",
+            "# HELP caribo_span_secondes Durée des blocs mesurés",
+            "# TYPE caribo_span_secondes summary",
+        ]
+        maximums = ["# HELP caribo_span_secondes_max Durée maximale observée par bloc",
+                    "# TYPE caribo_span_secondes_max gauge"]
+        for nom, (nombre, somme, maximum) in sorted(self._agregats.items()):
+            etiquette = nom.replace("\\", "\\\\").replace('"', '\\"')
+            lignes.append(f'caribo_span_secondes_count{{span="{etiquette}"}} {nombre}')
+            lignes.append(f'caribo_span_secondes_sum{{span="{etiquette}"}} {somme:.6f}')
+            maximums.append(f'caribo_span_secondes_max{{span="{etiquette}"}} {maximum:.6f}')
+        lignes.extend(maximums)
+        temporaire = f"{self.chemin_prometheus}.tmp"
+        with open(temporaire, "w", encoding="utf-8") as f:
+            f.write("\n".join(lignes) + "\n")
+        os.replace(temporaire, self.chemin_prometheus)
+
+
+_journal: Optional[JournalMesures] = None
+_verrou_journal = threading.Lock()
+
+
+def journal() -> JournalMesures:
+    """Journal partagé par toutes les sessions du processus"""
+    global _journal
+    with _verrou_journal:
+        if _journal is None:
+            _journal = JournalMesures(
+                PERF_CONFIG["chemin_jsonl"], PERF_CONFIG["chemin_prometheus"],
+                PERF_CONFIG["taille_max_octets"], PERF_CONFIG["nb_fichiers"]
+            )
+        return _journal
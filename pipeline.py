@@ -0,0 +1,377 @@
+# pipeline.py
+"""Pipeline commercial pondéré : import en masse d'un export CRM et CA attendu par année
+
+L'export (CSV ou Excel) est lu par lots ; chaque opportunité est rattachée aux
+services du catalogue cités dans sa colonne « Services ». Son montant est
+réparti entre ces services au prorata de leur prix catalogue moyen, au centime
+près. Les opportunités restent en colonnes numpy (une ligne par opportunité,
+une ligne par couple opportunité × service) : le CA attendu est une somme
+pondérée par la probabilité de gain, calculée en centimes par réduction groupée.
+"""
+
+import io
+import re
+import time
+import zipfile
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils.exceptions import InvalidFileException
+
+from config import PIPELINE_CRM, PROBABILITES_ETAPES
+from consolidation import sommer_par_groupe
+from index_catalogue import normaliser
+from models import Service, ServiceSelectionne, Projet
+from monnaie import en_centimes, en_euros, appliquer_facteur, appliquer_taux
+from perf import chronometre
+
+TYPE_CLIENT_DEFAUT = "Non renseigné"
+_NON_NUMERIQUE = re.compile(r"[\s€%]")  # Espaces (insécables compris), symboles
+
+
+@dataclass(slots=True)
+class RapportImport:
+    """Bilan d'un import : lignes lues, lignes rejetées par motif, services non reconnus"""
+    nb_lignes: int = 0
+    nb_importees: int = 0
+    colonnes: Dict[str, str] = field(default_factory=dict)   # Champ → en-tête du fichier
+    rejets: Counter = field(default_factory=Counter)
+    services_inconnus: Counter = field(default_factory=Counter)
+    duree_s: float = 0.0
+
+    @property
+    def nb_rejetees(self) -> int:
+        return self.nb_lignes - self.nb_importees
+
+
+@dataclass(slots=True)
+class PipelineCRM:
+    """Opportunités importées, en colonnes ; les montants sont en centimes"""
+    services: List[Service]               # Services du catalogue référencés par les lignes
+    identifiants: np.ndarray
+    clients: np.ndarray
+    types_client: np.ndarray
+    etapes: np.ndarray
+    annees: np.ndarray                    # Année de signature attendue
+    probabilites: np.ndarray              # Probabilité de gain, 0 → 1
+    montants: np.ndarray                  # Montant HT de chaque opportunité
+    ligne_opportunite: np.ndarray         # Opportunité de chaque ligne opportunité × service
+    ligne_service: np.ndarray             # Index dans `services`
+    ligne_montant: np.ndarray             # Part du montant de l'opportunité portée par le service
+    rapport: RapportImport = field(default_factory=RapportImport)
+
+    def __len__(self) -> int:
+        return len(self.montants)
+
+    @property
+    def maintenances(self) -> np.ndarray:
+        """Maintenance annuelle de chaque opportunité gagnée, sur les services qui en comportent"""
+        applicable = np.fromiter((s.maintenance_applicable for s in self.services), dtype=bool,
+                                 count=len(self.services))
+        base = sommer_par_groupe(self.ligne_opportunite,
+                                 np.where(applicable[self.ligne_service], self.ligne_montant, 0), len(self))
+        return appliquer_taux(base, PIPELINE_CRM["taux_maintenance"])
+
+    @chronometre("pipeline.attendu")
+    def attendu_centimes(self) -> Dict[str, np.ndarray]:
+        """CA attendu par année de signature, en centimes.
+
+        La maintenance d'une opportunité signée une année est récurrente :
+        elle compte cette année-là et chacune des suivantes de l'horizon.
+        """
+        if len(self) == 0:
+            return {"Année": np.zeros(0, dtype=np.int64)}
+        annees = np.arange(self.annees.min(), self.annees.max() + 1, dtype=np.int64)
+        index_annee = self.annees - annees[0]
+        montants_ponderes = appliquer_facteur(self.montants, self.probabilites)
+        maintenance_ponderee = appliquer_facteur(self.maintenances, self.probabilites)
+        sommes = sommer_par_groupe(
+            index_annee,
+            np.column_stack([np.ones(len(self), dtype=np.int64), self.montants,
+                             montants_ponderes, maintenance_ponderee]),
+            len(annees)
+        )
+        ca_maintenance = np.cumsum(sommes[:, 3])
+        return {
+            "Année": annees,
+            "Opportunités": sommes[:, 0],
+            "CA non pondéré": sommes[:, 1],
+            "CA Projets": sommes[:, 2],
+            "CA Maintenance": ca_maintenance,
+            "CA Total": sommes[:, 2] + ca_maintenance
+        }
+
+    def attendu_par_annee(self) -> pd.DataFrame:
+        """CA attendu par année, en euros"""
+        colonnes = self.attendu_centimes()
+        return pd.DataFrame({nom: valeurs if nom in ("Année", "Opportunités") else en_euros(valeurs)
+                             for nom, valeurs in colonnes.items()})
+
+    def par_etape(self) -> pd.DataFrame:
+        """Opportunités, montant et montant pondéré par étape du pipeline"""
+        etapes, codes = np.unique(self.etapes, return_inverse=True)
+        montants_ponderes = appliquer_facteur(self.montants, self.probabilites)
+        sommes = sommer_par_groupe(codes, np.column_stack([np.ones(len(self), dtype=np.int64), self.montants,
+                                                           montants_ponderes]), len(etapes))
+        probabilites = np.bincount(codes, weights=self.probabilites, minlength=len(etapes)) / sommes[:, 0]
+        return pd.DataFrame({
+            "Étape": etapes,
+            "Opportunités": sommes[:, 0],
+            "Probabilité moyenne": probabilites,
+            "Montant": en_euros(sommes[:, 1]),
+            "Montant pondéré": en_euros(sommes[:, 2])
+        }).sort_values("Probabilité moyenne", kind="stable", ignore_index=True)
+
+    def vers_projets(self, annee: int) -> List[Projet]:
+        """Pipeline pondéré d'une année en projets : un par type de client, une ligne par service.
+
+        Le prix de chaque ligne est la somme pondérée des parts de montant des
+        opportunités de ce type de client sur ce service.
+        """
+        lignes = np.flatnonzero(self.annees[self.ligne_opportunite] == annee)
+        opportunites = self.ligne_opportunite[lignes]
+        ponderees = appliquer_facteur(self.ligne_montant[lignes], self.probabilites[opportunites])
+        types, codes_type = np.unique(self.types_client[opportunites], return_inverse=True)
+        sommes = sommer_par_groupe(codes_type * len(self.services) + self.ligne_service[lignes],
+                                   ponderees, len(types) * len(self.services)).reshape(len(types), -1)
+
+        projets = []
+        for i, type_client in enumerate(types):
+            projet = Projet(nom=f"Pipeline CRM {annee} – {type_client}", client="Pipeline CRM",
+                            type_client=type_client, taux_maintenance=PIPELINE_CRM["taux_maintenance"])
+            for j in np.flatnonzero(sommes[i] > 0):
+                projet.services.append(ServiceSelectionne(self.services[j], prix_unitaire=en_euros(int(sommes[i, j]))))
+            if projet.services:
+                projets.append(projet)
+        return projets
+
+
+# --- Import ------------------------------------------------------------------------------
+
+def _lire_lots(contenu: bytes, nom_fichier: str, taille_lot: int) -> Iterator[pd.DataFrame]:
+    """Lots de lignes du fichier, toutes les valeurs en texte (conversions faites ensuite)"""
+    if nom_fichier.lower().endswith((".xlsx", ".xlsm")):
+        try:
+            df = pd.read_excel(io.BytesIO(contenu), dtype=str, keep_default_na=False, engine="openpyxl")
+        except (zipfile.BadZipFile, InvalidFileException, KeyError, ValueError) as e:
+            # Fichier tronqué, ou autre chose qu'un classeur sous une extension .xlsx
+            raise ValueError(f"Fichier Excel illisible ({nom_fichier}) : {e}") from e
+        for debut in range(0, len(df), taille_lot):
+            yield df.iloc[debut:debut + taille_lot]
+        return
+
+    # Exports CRM français : souvent en Windows-1252, séparés par des points-virgules
+    try:
+        texte = contenu.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texte = contenu.decode("cp1252")
+    entete = texte.split("\n", 1)[0]
+    separateur = max((";", ",", "\t"), key=entete.count)
+    yield from pd.read_csv(io.StringIO(texte), sep=separateur, dtype=str, keep_default_na=False,
+                           chunksize=taille_lot)
+
+
+def _associer_colonnes(entetes: List[str]) -> Dict[str, str]:
+    """Champ → en-tête du fichier, d'après les en-têtes acceptés de la configuration"""
+    par_entete = {normaliser(str(e).strip()): e for e in entetes}
+    colonnes = {}
+    for champ, acceptes in PIPELINE_CRM["colonnes"].items():
+        for accepte in acceptes:
+            if normaliser(accepte) in par_entete:
+                colonnes[champ] = par_entete[normaliser(accepte)]
+                break
+    if "services" not in colonnes:
+        raise ValueError("Colonne des services introuvable (attendue : "
+                         f"{', '.join(PIPELINE_CRM['colonnes']['services'])}).")
+    if "etape" not in colonnes and "probabilite" not in colonnes:
+        raise ValueError("Il faut une colonne « Étape » ou « Probabilité » pour pondérer les opportunités.")
+    return colonnes
+
+
+def _nombres(serie: pd.Series) -> np.ndarray:
+    """Texte → nombres ; accepte « 12 500,50 € » et « 40 % » ; NaN si vide ou illisible"""
+    texte = serie.str.replace(_NON_NUMERIQUE, "", regex=True).str.replace(",", ".", regex=False)
+    return np.array(pd.to_numeric(texte, errors="coerce"), dtype=np.float64)
+
+
+class _Correspondances:
+    """Texte de la colonne Services → index des services du catalogue, mémorisé par valeur distincte"""
+
+    def __init__(self, catalogue: Dict[str, Service]):
+        self.services = list(catalogue.values())
+        self.prix_moyens = np.fromiter((en_centimes(s.calculer_prix()) for s in self.services),
+                                       dtype=np.int64, count=len(self.services))
+        self._index = {}
+        for i, service in enumerate(self.services):
+            self._index[normaliser(service.nom)] = i
+            self._index[normaliser(service.id)] = i
+        self._separateurs = re.compile(f"[{re.escape(PIPELINE_CRM['separateurs_services'])}]")
+        self._deja_vus: Dict[str, tuple] = {}
+
+    def services_de(self, texte: str, rapport: RapportImport, nombre: int) -> tuple:
+        resultat = self._deja_vus.get(texte)
+        if resultat is None:
+            index, inconnus = [], []
+            for nom in self._separateurs.split(texte):
+                nom = nom.strip()
+                if not nom:
+                    continue
+                i = self._index.get(normaliser(nom))
+                if i is None:
+                    inconnus.append(nom)
+                elif i not in index:
+                    index.append(i)
+            resultat = self._deja_vus[texte] = (tuple(index), tuple(inconnus))
+        for nom in resultat[1]:
+            rapport.services_inconnus[nom] += nombre
+        return resultat[0]
+
+
+def _probabilites(lot: pd.DataFrame, colonnes: Dict[str, str], etapes: np.ndarray,
+                  en_pourcentage: Optional[bool]) -> tuple:
+    """Probabilité lue dans l'export, sinon déduite de l'étape.
+
+    L'échelle 0-100 est fixée au premier lot qui contient une probabilité renseignée :
+    un début d'export aux probabilités vides ne présume pas de la suite.
+    """
+    probabilites = np.full(len(lot), np.nan)
+    if "probabilite" in colonnes:
+        probabilites = _nombres(lot[colonnes["probabilite"]])
+        if en_pourcentage is None:
+            if "%" in colonnes["probabilite"]:
+                en_pourcentage = True
+            elif not np.isnan(probabilites).all():
+                en_pourcentage = bool(np.nanmax(probabilites) > 1)
+        if en_pourcentage:
+            probabilites = probabilites / 100
+    manquantes = np.isnan(probabilites)
+    if manquantes.any():
+        par_etape = {normaliser(e): p for e, p in PROBABILITES_ETAPES.items()}
+        uniques, codes = np.unique(etapes[manquantes], return_inverse=True)
+        valeurs = np.array([par_etape.get(normaliser(e), np.nan) for e in uniques], dtype=np.float64)
+        probabilites[manquantes] = valeurs[codes]
+    return probabilites, en_pourcentage
+
+
+def _annees(lot: pd.DataFrame, colonnes: Dict[str, str], annee_defaut: int) -> np.ndarray:
+    annees = np.full(len(lot), np.nan)
+    if "annee" in colonnes:
+        annees = _nombres(lot[colonnes["annee"]])
+    if "date_cloture" in colonnes and np.isnan(annees).any():
+        dates = pd.to_datetime(lot[colonnes["date_cloture"]], dayfirst=True, errors="coerce")
+        annees = np.where(np.isnan(annees), dates.dt.year.to_numpy(dtype=np.float64), annees)
+    return np.where(np.isnan(annees), annee_defaut, annees).astype(np.int64)
+
+
+def _texte(lot: pd.DataFrame, colonnes: Dict[str, str], champ: str, defaut: str) -> np.ndarray:
+    if champ not in colonnes:
+        return np.full(len(lot), defaut, dtype=object)
+    valeurs = lot[colonnes[champ]].str.strip().to_numpy(dtype=object)
+    valeurs[valeurs == ""] = defaut
+    return valeurs
+
+
+@chronometre("pipeline.importer")
+def importer_crm(contenu: bytes, nom_fichier: str, catalogue: Dict[str, Service],
+                 annee_defaut: int = None, taille_lot: int = PIPELINE_CRM["taille_lot"]) -> PipelineCRM:
+    """Importe un export CRM (CSV ou Excel) et rattache ses opportunités au catalogue.
+
+    Lève ValueError si le fichier n'a pas les colonnes nécessaires ; les lignes
+    inexploitables sont comptées par motif dans le rapport, sans arrêter l'import.
+    """
+    debut = time.perf_counter()
+    annee_defaut = annee_defaut or date.today().year
+    correspondances = _Correspondances(catalogue)
+    rapport = RapportImport()
+    colonnes: Dict[str, str] = {}
+    en_pourcentage = None
+    morceaux: Dict[str, list] = {cle: [] for cle in ("identifiants", "clients", "types_client", "etapes",
+                                                     "annees", "probabilites", "montants", "ligne_opportunite",
+                                                     "ligne_service", "ligne_montant")}
+    nb_importees = 0
+
+    for lot in _lire_lots(contenu, nom_fichier, taille_lot):
+        if not colonnes:
+            colonnes = rapport.colonnes = _associer_colonnes(list(lot.columns))
+        rapport.nb_lignes += len(lot)
+        lot = lot.reset_index(drop=True)
+
+        # Services : chaque valeur distincte de la colonne est analysée une fois
+        codes, uniques = pd.factorize(lot[colonnes["services"]], sort=False)
+        nb_par_unique = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        services_uniques = [correspondances.services_de(u, rapport, int(n)) for u, n in zip(uniques, nb_par_unique)]
+        nb_services = np.fromiter(map(len, services_uniques), dtype=np.int64, count=len(uniques))[codes]
+
+        etapes = _texte(lot, colonnes, "etape", "")
+        probabilites, en_pourcentage = _probabilites(lot, colonnes, etapes, en_pourcentage)
+        montants = _nombres(lot[colonnes["montant"]]) if "montant" in colonnes else np.full(len(lot), np.nan)
+
+        # Rejets, un motif par ligne (le premier rencontré)
+        motifs = (
+            ("Aucun service du catalogue", nb_services == 0),
+            ("Probabilité manquante ou étape inconnue", np.isnan(probabilites)),
+            ("Probabilité hors de 0-100 %", (probabilites < 0) | (probabilites > 1)),
+            ("Montant négatif", montants < 0),
+        )
+        valides = np.ones(len(lot), dtype=bool)
+        for motif, rejet in motifs:
+            rejet &= valides
+            if rejet.any():
+                rapport.rejets[motif] += int(rejet.sum())
+                valides &= ~rejet
+        gardees = np.flatnonzero(valides)
+        if len(gardees) == 0:
+            continue
+
+        # Lignes opportunité × service, dans l'ordre des opportunités
+        nb_lignes = nb_services[gardees]
+        services_plats = np.fromiter((i for s in services_uniques for i in s), dtype=np.int64)
+        debuts_uniques = np.cumsum([len(s) for s in services_uniques]) - [len(s) for s in services_uniques]
+        rang = np.arange(nb_lignes.sum()) - np.repeat(np.cumsum(nb_lignes) - nb_lignes, nb_lignes)
+        ligne_opportunite = np.repeat(np.arange(len(gardees)), nb_lignes)
+        ligne_service = services_plats[np.asarray(debuts_uniques, dtype=np.int64)[codes[gardees]][ligne_opportunite]
+                                       + rang]
+
+        # Montant absent : somme des prix catalogue moyens des services cités
+        poids = correspondances.prix_moyens[ligne_service]
+        montants_centimes = en_centimes(np.nan_to_num(montants[gardees]))
+        sans_montant = np.isnan(montants[gardees])
+        montants_centimes[sans_montant] = sommer_par_groupe(ligne_opportunite, poids, len(gardees))[sans_montant]
+
+        # Répartition au prorata des prix moyens, par parts cumulées : la somme des lignes est exacte
+        cumul = np.cumsum(poids)
+        fins = np.cumsum(nb_lignes) - 1
+        avant = np.r_[0, cumul[fins[:-1]]][ligne_opportunite]
+        total = cumul[fins][ligne_opportunite] - avant
+        parts_cumulees = np.divide(cumul - avant, total, out=(rang + 1) / nb_lignes[ligne_opportunite],
+                                   where=total > 0)
+        cumuls = appliquer_facteur(montants_centimes[ligne_opportunite], parts_cumulees)
+        precedents = np.where(rang > 0, np.r_[0, cumuls[:-1]], 0)
+
+        morceaux["ligne_opportunite"].append(ligne_opportunite + nb_importees)
+        morceaux["ligne_service"].append(ligne_service)
+        morceaux["ligne_montant"].append(cumuls - precedents)
+        morceaux["montants"].append(montants_centimes)
+        morceaux["probabilites"].append(probabilites[gardees])
+        morceaux["annees"].append(_annees(lot, colonnes, annee_defaut)[gardees])
+        morceaux["etapes"].append(np.where(etapes[gardees] == "", "Non renseignée", etapes[gardees]))
+        morceaux["types_client"].append(_texte(lot, colonnes, "type_client", TYPE_CLIENT_DEFAUT)[gardees])
+        morceaux["clients"].append(_texte(lot, colonnes, "client", "")[gardees])
+        identifiants = (_texte(lot, colonnes, "identifiant", "")[gardees] if "identifiant" in colonnes
+                        else np.array([f"L{rapport.nb_lignes - len(lot) + i + 2}" for i in gardees], dtype=object))
+        morceaux["identifiants"].append(identifiants)
+        nb_importees += len(gardees)
+
+    if not colonnes:
+        raise ValueError("Fichier vide : aucune ligne d'opportunité.")
+    rapport.nb_importees = nb_importees
+    vides = {"ligne_opportunite": np.int64, "ligne_service": np.int64, "ligne_montant": np.int64,
+             "montants": np.int64, "probabilites": np.float64, "annees": np.int64}
+    tableaux = {cle: np.concatenate(valeurs) if valeurs else np.zeros(0, dtype=vides.get(cle, object))
+                for cle, valeurs in morceaux.items()}
+    rapport.duree_s = time.perf_counter() - debut
+    return PipelineCRM(services=correspondances.services, rapport=rapport, **tableaux)
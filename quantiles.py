@@ -0,0 +1,158 @@
+# quantiles.py
+"""Résumés de quantiles en flux (t-digest) : mémoire constante, alimentés par lots, fusionnables
+
+Une EsquisseQuantiles suit un lot de séries à la fois, par exemple une par
+métrique et par année d'une simulation. Chaque série est résumée par au plus
+`compression / 2 + 1` centroïdes (moyenne, poids), plus serrés vers les queues
+de distribution où la précision compte pour les percentiles extrêmes. Ajouter
+un lot de valeurs ou fusionner l'esquisse d'un autre processus revient à
+concaténer des centroïdes puis à les recompresser : le résultat ne dépend pas
+du découpage en lots, à l'approximation près.
+
+Toutes les séries sont compressées ensemble par opérations sur tableaux
+(tri par ligne, puis réduction par groupe avec np.add.reduceat).
+"""
+
+import math
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+def _fusionner_tries(moyennes_a: np.ndarray, poids_a: np.ndarray,
+                     moyennes_b: np.ndarray, poids_b: np.ndarray):
+    """Fusionne ligne à ligne deux tableaux de centroïdes triés, sans retrier l'ensemble
+
+    Les centroïdes de `a` (les moins nombreux en général) sont insérés à leur
+    rang dans `b` ; les cases vides (+inf) restent en fin de ligne.
+    """
+    nb_series, largeur_a = moyennes_a.shape
+    if largeur_a == 0:
+        return moyennes_b, poids_b
+    positions = np.empty((nb_series, largeur_a), dtype=np.int64)
+    for i in range(nb_series):
+        positions[i] = np.searchsorted(moyennes_b[i], moyennes_a[i], side="right")
+    # Moyennes égales à l'arrondi près peuvent être inversées : rangs rendus croissants
+    positions = np.maximum.accumulate(positions, axis=1) + np.arange(largeur_a)
+    largeur = largeur_a + moyennes_b.shape[1]
+    lignes = np.arange(nb_series)[:, None]
+    depuis_b = np.ones((nb_series, largeur), dtype=bool)
+    depuis_b[lignes, positions] = False
+    moyennes = np.empty((nb_series, largeur))
+    poids = np.empty((nb_series, largeur))
+    moyennes[lignes, positions] = moyennes_a
+    poids[lignes, positions] = poids_a
+    moyennes[depuis_b] = moyennes_b.ravel()
+    poids[depuis_b] = poids_b.ravel()
+    return moyennes, poids
+
+
+class EsquisseQuantiles:
+    """Résumés t-digest d'un lot de séries de forme `forme`"""
+
+    def __init__(self, forme: Tuple[int, ...], compression: int = 200):
+        self.forme = tuple(forme)
+        self.compression = compression
+        nb_series = math.prod(self.forme)
+        # Centroïdes par série, complétés par des cases vides (poids nul, moyenne +inf)
+        self.moyennes = np.full((nb_series, 0), np.inf)
+        self.poids = np.zeros((nb_series, 0))
+        self.minimum = np.full(nb_series, np.inf)
+        self.maximum = np.full(nb_series, -np.inf)
+        self.nombre = np.zeros(nb_series, dtype=np.int64)
+
+    @property
+    def nb_series(self) -> int:
+        return self.moyennes.shape[0]
+
+    @property
+    def nb_centroides_max(self) -> int:
+        return self.moyennes.shape[1]
+
+    @property
+    def octets(self) -> int:
+        return (self.moyennes.nbytes + self.poids.nbytes + self.minimum.nbytes
+                + self.maximum.nbytes + self.nombre.nbytes)
+
+    def ajouter(self, valeurs: np.ndarray) -> 'EsquisseQuantiles':
+        """Ajoute un lot d'observations de forme (n,) + forme ; les NaN sont ignorés"""
+        valeurs = np.asarray(valeurs, dtype=np.float64)
+        if valeurs.shape[1:] != self.forme:
+            raise ValueError(f"Forme {valeurs.shape[1:]} attendue {self.forme}")
+        lignes = valeurs.reshape(len(valeurs), self.nb_series).T
+        valides = ~np.isnan(lignes)
+        self.minimum = np.fmin(self.minimum, np.min(lignes, axis=1, initial=np.inf, where=valides))
+        self.maximum = np.fmax(self.maximum, np.max(lignes, axis=1, initial=-np.inf, where=valides))
+        self.nombre += valides.sum(axis=1)
+        # Les NaN sont triés en fin de ligne : ils deviennent des cases vides
+        tries = np.sort(np.ascontiguousarray(lignes), axis=1)
+        poids = (~np.isnan(tries)).astype(np.float64)
+        self._compresser(*_fusionner_tries(self.moyennes, self.poids, np.nan_to_num(tries, nan=np.inf), poids))
+        return self
+
+    def fusionner(self, autre: 'EsquisseQuantiles') -> 'EsquisseQuantiles':
+        """Intègre une esquisse de même forme (un autre lot, un autre processus)"""
+        if autre.forme != self.forme:
+            raise ValueError(f"Esquisses de formes différentes : {autre.forme} et {self.forme}")
+        self.minimum = np.fmin(self.minimum, autre.minimum)
+        self.maximum = np.fmax(self.maximum, autre.maximum)
+        self.nombre = self.nombre + autre.nombre
+        self._compresser(*_fusionner_tries(self.moyennes, self.poids, autre.moyennes, autre.poids))
+        return self
+
+    def _compresser(self, moyennes: np.ndarray, poids: np.ndarray):
+        """Regroupe les centroïdes de chaque série (triés par ligne) selon l'échelle k1 du t-digest
+
+        Les cases k1 sont délimitées par des seuils de rang, étroits vers 0 et 1 :
+        un searchsorted par série donne le début de chaque groupe, sans calcul par point.
+        """
+        nb_series, largeur = moyennes.shape
+        cumul = np.cumsum(poids, axis=1)
+        gauche = cumul - poids
+        totaux = cumul[:, -1] if largeur else np.zeros(nb_series)
+        nb_valides = np.count_nonzero(poids > 0, axis=1)
+        seuils = (np.sin(2 * np.pi * np.arange(self.compression // 2) / self.compression - np.pi / 2) + 1) / 2
+
+        debuts, nb_par_serie = [], np.zeros(nb_series, dtype=np.int64)
+        for i in range(nb_series):
+            if nb_valides[i] == 0:
+                continue
+            debuts_serie = np.unique(np.searchsorted(gauche[i, :nb_valides[i]], seuils * totaux[i]))
+            debuts_serie = debuts_serie[debuts_serie < nb_valides[i]]
+            debuts.append(debuts_serie + i * largeur)
+            nb_par_serie[i] = len(debuts_serie)
+        if not debuts:
+            self.moyennes = np.full((nb_series, 0), np.inf)
+            self.poids = np.zeros((nb_series, 0))
+            return
+
+        # Les cases vides de fin de ligne (poids nul) rejoignent le dernier groupe sans l'altérer
+        debuts = np.concatenate(debuts)
+        produits = np.multiply(moyennes, poids, out=np.zeros_like(poids), where=poids > 0).ravel()
+        poids_groupes = np.add.reduceat(poids.ravel(), debuts)
+        moyennes_groupes = np.add.reduceat(produits, debuts) / poids_groupes
+
+        # Retour en tableau complété : position de chaque groupe dans sa série
+        series = np.repeat(np.arange(nb_series), nb_par_serie)
+        positions = np.arange(len(debuts)) - np.repeat(np.cumsum(nb_par_serie) - nb_par_serie, nb_par_serie)
+        self.moyennes = np.full((nb_series, int(nb_par_serie.max())), np.inf)
+        self.poids = np.zeros_like(self.moyennes)
+        self.moyennes[series, positions] = moyennes_groupes
+        self.poids[series, positions] = poids_groupes
+
+    def quantiles(self, q: Sequence[float]) -> np.ndarray:
+        """Quantiles estimés, de forme forme + (len(q),) ; NaN pour une série vide"""
+        q = np.asarray(q, dtype=np.float64)
+        resultat = np.full((self.nb_series, len(q)), np.nan)
+        for i in range(self.nb_series):
+            valides = self.poids[i] > 0
+            poids, moyennes = self.poids[i, valides], self.moyennes[i, valides]
+            if len(poids) == 0:
+                continue
+            total = poids.sum()
+            # Interpolation entre les milieux des centroïdes, bornée par les extrêmes observés
+            milieux = np.cumsum(poids) - poids / 2
+            abscisses = np.r_[0.0, milieux, total]
+            ordonnees = np.r_[self.minimum[i], moyennes, self.maximum[i]]
+            resultat[i] = np.interp(q * total, abscisses, ordonnees)
+        return resultat.reshape(self.forme + (len(q),))
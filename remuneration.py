@@ -0,0 +1,81 @@
+# remuneration.py
+"""Rémunération des associés de la SAS : IS, flat tax et dividendes en calcul vectoriel
+
+Les bénéfices peuvent être un scalaire, une série d'années ou un tableau
+scénarios × années : tous les calculs se font par opérations sur tableaux.
+"""
+
+from dataclasses import dataclass
+from typing import Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from config import TAUX_IS, TAUX_FLAT_TAX, OBJECTIFS_REMUNERATION
+from monnaie import en_centimes, en_euros, impot_societes, appliquer_taux
+from perf import chronometre
+
+Montants = Union[float, Sequence[float], np.ndarray]
+
+
+@dataclass(slots=True)
+class Remuneration:
+    """Rémunération réalisable, de même forme que les bénéfices fournis"""
+    benefice_brut: np.ndarray
+    impot: np.ndarray
+    benefice_apres_is: np.ndarray
+    dividendes_nets: np.ndarray
+    net_par_associe: np.ndarray
+    ecart_objectif: np.ndarray      # Bénéfice brut - bénéfice avant IS requis
+    ecart_objectif_net: np.ndarray  # Net par associé - objectif net par associé
+    taux_is: float
+    taux_flat_tax: float
+
+    @property
+    def objectif_atteint(self) -> np.ndarray:
+        return self.ecart_objectif >= 0
+
+    def vers_dataframe(self, annees: Montants) -> pd.DataFrame:
+        """Tableau par année (rémunération d'un seul scénario)"""
+        return pd.DataFrame({
+            "Année": np.asarray(annees, dtype=np.int64),
+            "Bénéfice brut": self.benefice_brut,
+            f"IS ({self.taux_is:.0%})": self.impot,
+            "Bénéfice après IS": self.benefice_apres_is,
+            "Dividendes nets possibles": self.dividendes_nets,
+            "Net par associé": self.net_par_associe
+        })
+
+
+@chronometre("remuneration.calculer")
+def calculer_remuneration(benefice_brut: Montants,
+                          nb_associes: Montants = OBJECTIFS_REMUNERATION["nb_associes"],
+                          taux_is: float = TAUX_IS,
+                          taux_flat_tax: float = TAUX_FLAT_TAX,
+                          objectifs: dict = OBJECTIFS_REMUNERATION) -> Remuneration:
+    """Calcule IS, bénéfice après IS et dividendes nets (par associé) à partir du bénéfice brut.
+
+    `nb_associes` peut être un tableau diffusable sur les bénéfices (un nombre par scénario).
+    """
+    # IS et flat tax en centimes, aux règles d'arrondi de monnaie.py
+    benefice_centimes = np.asarray(en_centimes(np.asarray(benefice_brut, dtype=np.float64)), dtype=np.int64)
+    impot_centimes = impot_societes(benefice_centimes, taux_is)
+    apres_is_centimes = benefice_centimes - impot_centimes
+    dividendes_centimes = apres_is_centimes - appliquer_taux(apres_is_centimes, taux_flat_tax)
+
+    benefice = en_euros(benefice_centimes)
+    impot = en_euros(impot_centimes)
+    apres_is = en_euros(apres_is_centimes)
+    dividendes_nets = en_euros(dividendes_centimes)
+    net_par_associe = dividendes_nets / np.asarray(nb_associes, dtype=np.float64)
+    return Remuneration(
+        benefice_brut=benefice,
+        impot=impot,
+        benefice_apres_is=apres_is,
+        dividendes_nets=dividendes_nets,
+        net_par_associe=net_par_associe,
+        ecart_objectif=benefice - objectifs["benefice_avant_is_necessaire"],
+        ecart_objectif_net=net_par_associe - objectifs["dividendes_nets_par_associe"],
+        taux_is=taux_is,
+        taux_flat_tax=taux_flat_tax
+    )
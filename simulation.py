@@ -0,0 +1,193 @@
+# simulation.py
+"""Simulation stochastique des prévisions : chemins tirés par lots, résumés en quantiles
+
+Chaque chemin tire une croissance annuelle autour du taux des prévisions et un
+aléa de volume sur le CA. Les montants sont calculés en centimes (règles de
+monnaie.py), puis chaque lot est résumé dans une EsquisseQuantiles : la mémoire
+ne dépend que de la taille du lot, pas du nombre de chemins. Les lots sont
+calculés dans le pool de processus et leurs esquisses fusionnées au fil de l'eau.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import TAUX_IS, TAUX_FLAT_TAX, SIMULATION_STOCHASTIQUE
+from models import Previsions
+from monnaie import en_euros, appliquer_facteur, appliquer_taux, impot_societes
+from perf import chronometre
+from quantiles import EsquisseQuantiles
+
+METRIQUES = ("CA Projets", "CA Maintenance", "CA Total", "Charges fixes", "Résultat brut",
+             "Impôt", "Résultat net", "Taux de marge", "Net par associé")
+
+
+@dataclass(frozen=True, slots=True)
+class ParametresSimulation:
+    """Entrées d'une simulation, sérialisables vers les processus de calcul"""
+    annees: Tuple[int, ...]
+    ca_projets_centimes: int        # CA de l'année 1, avant croissance
+    ca_maintenance_centimes: int
+    charges_fixes_centimes: Tuple[int, ...]
+    taux_croissance: float
+    ecart_type_croissance: float
+    volatilite_ca: float            # Écart-type de l'aléa annuel de volume (loi log-normale de moyenne 1)
+    nb_associes: int
+    taux_is: float = TAUX_IS
+    taux_flat_tax: float = TAUX_FLAT_TAX
+
+
+def parametres_depuis_previsions(previsions: Previsions, nb_associes: int,
+                                 volatilite_ca: float = SIMULATION_STOCHASTIQUE["volatilite_ca"],
+                                 ecart_type_croissance: float = SIMULATION_STOCHASTIQUE["ecart_type_croissance"]
+                                 ) -> ParametresSimulation:
+    colonnes = previsions.colonnes_centimes()
+    return ParametresSimulation(
+        annees=tuple(colonnes["Année"].tolist()),
+        ca_projets_centimes=int(colonnes["CA Projets"][0]),
+        ca_maintenance_centimes=int(colonnes["CA Maintenance"][0]),
+        charges_fixes_centimes=tuple(colonnes["Charges fixes"].tolist()),
+        taux_croissance=previsions.annees[1].taux_croissance if len(previsions.annees) > 1 else 0.0,
+        ecart_type_croissance=ecart_type_croissance,
+        volatilite_ca=volatilite_ca,
+        nb_associes=nb_associes
+    )
+
+
+def simuler_lot(parametres: ParametresSimulation, nb_chemins: int, graine: np.random.SeedSequence,
+                compression: int = SIMULATION_STOCHASTIQUE["compression"]) -> EsquisseQuantiles:
+    """Tire `nb_chemins` chemins et retourne leur esquisse (métriques × années)"""
+    generateur = np.random.default_rng(graine)
+    annees = np.asarray(parametres.annees, dtype=np.int64)
+
+    # Croissance composée à partir de l'année 2, aléa de volume chaque année
+    croissance = np.ones((nb_chemins, len(annees)))
+    if len(annees) > 1:
+        taux = generateur.normal(parametres.taux_croissance, parametres.ecart_type_croissance,
+                                 (nb_chemins, len(annees) - 1))
+        croissance[:, 1:] = np.cumprod(1 + np.maximum(taux, -0.95), axis=1)
+    sigma = parametres.volatilite_ca
+    facteurs = croissance * generateur.lognormal(-sigma ** 2 / 2, sigma, croissance.shape)
+
+    ca_projets = appliquer_facteur(parametres.ca_projets_centimes, facteurs)
+    ca_maintenance = appliquer_facteur(parametres.ca_maintenance_centimes, facteurs)
+    ca_total = ca_projets + ca_maintenance
+    charges_fixes = np.broadcast_to(np.asarray(parametres.charges_fixes_centimes, dtype=np.int64), ca_total.shape)
+    resultat_brut = ca_total - charges_fixes
+    impot = impot_societes(resultat_brut, parametres.taux_is)
+    resultat_net = resultat_brut - impot
+    dividendes = resultat_net - appliquer_taux(resultat_net, parametres.taux_flat_tax)
+    taux_marge = np.divide(resultat_net, ca_total, out=np.zeros(ca_total.shape), where=ca_total > 0)
+
+    valeurs = np.stack([en_euros(ca_projets), en_euros(ca_maintenance), en_euros(ca_total),
+                        en_euros(charges_fixes), en_euros(resultat_brut), en_euros(impot),
+                        en_euros(resultat_net), taux_marge, en_euros(dividendes) / parametres.nb_associes],
+                       axis=1)
+    return EsquisseQuantiles((len(METRIQUES), len(annees)), compression).ajouter(valeurs)
+
+
+@dataclass(slots=True)
+class ResultatSimulation:
+    """Esquisse fusionnée des chemins simulés jusqu'ici"""
+    annees: Tuple[int, ...]
+    esquisse: EsquisseQuantiles
+    nb_chemins: int
+    duree_s: float
+
+    def bandes(self, metrique: str,
+               quantiles: Sequence[float] = SIMULATION_STOCHASTIQUE["quantiles"]) -> pd.DataFrame:
+        """Quantiles d'une métrique par année, colonnes « P5 », « P50 »…"""
+        valeurs = self.esquisse.quantiles(quantiles)[METRIQUES.index(metrique)]
+        df = pd.DataFrame(valeurs, columns=[f"P{q * 100:g}" for q in quantiles])
+        df.insert(0, "Année", np.asarray(self.annees, dtype=np.int64))
+        return df
+
+    def tableau(self, quantiles: Sequence[float] = SIMULATION_STOCHASTIQUE["quantiles"]) -> pd.DataFrame:
+        """Toutes les métriques : une ligne par métrique et par année"""
+        valeurs = self.esquisse.quantiles(quantiles)
+        df = pd.DataFrame(valeurs.reshape(-1, len(quantiles)), columns=[f"P{q * 100:g}" for q in quantiles])
+        df.insert(0, "Année", np.tile(np.asarray(self.annees, dtype=np.int64), len(METRIQUES)))
+        df.insert(0, "Métrique", np.repeat(METRIQUES, len(self.annees)))
+        return df
+
+
+def _decouper(nb_chemins: int, taille_lot: int) -> list:
+    return [min(taille_lot, nb_chemins - debut) for debut in range(0, nb_chemins, taille_lot)]
+
+
+@chronometre("simulation.simuler")
+def simuler(parametres: ParametresSimulation, nb_chemins: int,
+            graine: int = SIMULATION_STOCHASTIQUE["graine"],
+            taille_lot: int = SIMULATION_STOCHASTIQUE["taille_lot"],
+            progression=None) -> ResultatSimulation:
+    """Simule tous les lots dans le processus courant (benchmarks, scripts)
+
+    Les graines des lots dérivent de `graine` : même résultat que simuler_en_parallele.
+    """
+    debut = time.perf_counter()
+    tailles = _decouper(nb_chemins, taille_lot)
+    resultat = ResultatSimulation(parametres.annees, None, 0, 0.0)
+    for taille, graine_lot in zip(tailles, np.random.SeedSequence(graine).spawn(len(tailles))):
+        _integrer(resultat, simuler_lot(parametres, taille, graine_lot), taille, debut)
+        if progression is not None:
+            progression.avancer(resultat.nb_chemins / nb_chemins, f"{resultat.nb_chemins:,} chemins".replace(",", " "))
+    return resultat
+
+
+def _integrer(resultat: ResultatSimulation, esquisse: EsquisseQuantiles, nb_chemins: int, debut: float):
+    if resultat.esquisse is None:
+        resultat.esquisse = esquisse
+    else:
+        resultat.esquisse.fusionner(esquisse)
+    resultat.nb_chemins += nb_chemins
+    resultat.duree_s = time.perf_counter() - debut
+
+
+def simuler_en_parallele(parametres: ParametresSimulation, nb_chemins: int,
+                         graine: int = SIMULATION_STOCHASTIQUE["graine"],
+                         taille_lot: int = SIMULATION_STOCHASTIQUE["taille_lot"],
+                         progression=None) -> ResultatSimulation:
+    """Tâche en thread : lots soumis au pool de processus, esquisses fusionnées à leur arrivée
+
+    Chaque lot fusionné publie un résultat partiel (copie de l'esquisse courante)
+    pour que les bandes s'affinent pendant le calcul.
+    """
+    from taches import gestionnaire
+
+    debut = time.perf_counter()
+    tailles = _decouper(nb_chemins, taille_lot)
+    graines = np.random.SeedSequence(graine).spawn(len(tailles))
+    # Lots propres à cet appel : mêmes paramètres et mêmes graines qu'une autre session ne
+    # doivent pas être regroupés, l'annulation de l'une retirerait les lots de l'autre
+    lots = {
+        gestionnaire().soumettre_processus(simuler_lot, parametres, taille, graine_lot): taille
+        for taille, graine_lot in zip(tailles, graines)
+    }
+    resultat = ResultatSimulation(parametres.annees, None, 0, 0.0)
+    en_attente = set(lots)
+    try:
+        while en_attente:
+            finis, en_attente = wait(en_attente, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in finis:
+                _integrer(resultat, future.result(), lots[future], debut)
+            if progression is not None:
+                partiel = None
+                if finis:
+                    partiel = ResultatSimulation(resultat.annees, _copier(resultat.esquisse),
+                                                 resultat.nb_chemins, resultat.duree_s)
+                progression.avancer(resultat.nb_chemins / nb_chemins,
+                                    f"{resultat.nb_chemins:,} chemins".replace(",", " "), partiel)
+    finally:
+        # Tâche annulée ou lot en échec : les lots non démarrés sont retirés du pool
+        for future in en_attente:
+            future.cancel()
+    return resultat
+
+
+def _copier(esquisse: EsquisseQuantiles) -> EsquisseQuantiles:
+    copie = EsquisseQuantiles(esquisse.forme, esquisse.compression)
+    return copie.fusionner(esquisse)
@@ -0,0 +1,443 @@
+# stockage.py
+"""Persistance SQLite des projets, templates et prévisions"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Dict, Optional, Iterable, Iterator
+
+from config import STOCKAGE_CONFIG
+from models import Service, ServiceSelectionne, Projet, PrevisionAnnuelle, Previsions
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projets (
+    id TEXT PRIMARY KEY,
+    nom TEXT NOT NULL,
+    client TEXT NOT NULL DEFAULT '',
+    type_client TEXT NOT NULL DEFAULT '',
+    date_creation TEXT NOT NULL,
+    total_ht REAL NOT NULL DEFAULT 0,
+    taux_maintenance REAL NOT NULL,
+    conditions_paiement TEXT NOT NULL,
+    nb_services INTEGER NOT NULL DEFAULT 0,
+    nature TEXT NOT NULL DEFAULT 'projet'
+);
+CREATE INDEX IF NOT EXISTS idx_projets_client ON projets(client);
+CREATE INDEX IF NOT EXISTS idx_projets_type_client ON projets(type_client);
+CREATE INDEX IF NOT EXISTS idx_projets_date_creation ON projets(date_creation);
+CREATE INDEX IF NOT EXISTS idx_projets_total_ht ON projets(total_ht);
+CREATE INDEX IF NOT EXISTS idx_projets_nature ON projets(nature, date_creation);
+
+CREATE TABLE IF NOT EXISTS services_selectionnes (
+    projet_id TEXT NOT NULL REFERENCES projets(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    service_id TEXT NOT NULL,
+    complexite TEXT NOT NULL,
+    quantite INTEGER NOT NULL,
+    prix_unitaire REAL NOT NULL,
+    facteurs TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (projet_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_services_service_id ON services_selectionnes(service_id);
+
+CREATE TABLE IF NOT EXISTS templates (
+    cle TEXT PRIMARY KEY,
+    projet_id TEXT NOT NULL REFERENCES projets(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS previsions (
+    id TEXT PRIMARY KEY,
+    nom_scenario TEXT NOT NULL,
+    date_creation TEXT NOT NULL,
+    nb_annees INTEGER NOT NULL,
+    contenu TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_previsions_date_creation ON previsions(date_creation);
+"""
+
+
+@dataclass
+class ResumeProjet:
+    """Ligne légère de la bibliothèque, sans les services (chargement paresseux)"""
+    id: str
+    nom: str
+    client: str
+    type_client: str
+    date_creation: datetime
+    total_ht: float
+    nb_services: int
+
+
+def service_vers_dict(service_sel: ServiceSelectionne) -> Dict:
+    """Sérialise une ligne de service (le service est référencé par son id)"""
+    return {
+        "service_id": service_sel.service.id,
+        "complexite": service_sel.complexite,
+        "quantite": service_sel.quantite,
+        "prix_unitaire": service_sel.prix_unitaire,
+        "facteurs": dict(service_sel.facteurs_custom)
+    }
+
+
+def projet_vers_dict(projet: Projet) -> Dict:
+    """Sérialise un projet en dictionnaire JSON"""
+    return {
+        "id": projet.id,
+        "nom": projet.nom,
+        "client": projet.client,
+        "type_client": projet.type_client,
+        "date_creation": projet.date_creation.isoformat(),
+        "taux_maintenance": projet.taux_maintenance,
+        "conditions_paiement": projet.conditions_paiement,
+        "services": [service_vers_dict(s) for s in projet.services]
+    }
+
+
+def projet_depuis_dict(donnees: Dict, catalogue: Dict[str, Service]) -> Projet:
+    """Reconstruit un projet ; les services absents du catalogue sont ignorés"""
+    projet = Projet(
+        id=donnees["id"],
+        nom=donnees["nom"],
+        client=donnees["client"],
+        type_client=donnees["type_client"],
+        date_creation=datetime.fromisoformat(donnees["date_creation"]),
+        taux_maintenance=donnees["taux_maintenance"],
+        conditions_paiement=donnees["conditions_paiement"]
+    )
+    for ligne in donnees["services"]:
+        service = catalogue.get(ligne["service_id"])
+        if service is None:
+            continue
+        projet.services.append(ServiceSelectionne(
+            service=service,
+            complexite=ligne["complexite"],
+            facteurs_custom=dict(ligne["facteurs"]),
+            quantite=ligne["quantite"],
+            prix_unitaire=ligne["prix_unitaire"]
+        ))
+    return projet
+
+
+class PoolConnexions:
+    """Pool de connexions SQLite partagé entre les threads des sessions Streamlit"""
+
+    def __init__(self, chemin: str, taille: int = STOCKAGE_CONFIG["taille_pool"]):
+        self.chemin = chemin
+        self._connexions = queue.Queue(maxsize=taille)
+        for _ in range(taille):
+            self._connexions.put(self._ouvrir())
+
+    def _ouvrir(self) -> sqlite3.Connection:
+        connexion = sqlite3.connect(self.chemin, check_same_thread=False, timeout=30,
+                                    isolation_level=None)
+        connexion.row_factory = sqlite3.Row
+        connexion.execute("PRAGMA journal_mode=WAL")
+        connexion.execute("PRAGMA synchronous=NORMAL")
+        connexion.execute("PRAGMA foreign_keys=ON")
+        return connexion
+
+    @contextmanager
+    def connexion(self) -> Iterator[sqlite3.Connection]:
+        """Emprunte une connexion le temps d'un bloc"""
+        connexion = self._connexions.get()
+        try:
+            yield connexion
+        finally:
+            self._connexions.put(connexion)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Emprunte une connexion et encadre le bloc dans une transaction"""
+        with self.connexion() as connexion:
+            connexion.execute("BEGIN IMMEDIATE")
+            try:
+                yield connexion
+            except BaseException:
+                connexion.execute("ROLLBACK")
+                raise
+            connexion.execute("COMMIT")
+
+    def fermer(self):
+        while not self._connexions.empty():
+            self._connexions.get_nowait().close()
+
+
+class StockageProjets:
+    """Stockage local des projets, templates utilisateur et prévisions"""
+
+    def __init__(self, chemin: str = STOCKAGE_CONFIG["chemin_base"],
+                 taille_pool: int = STOCKAGE_CONFIG["taille_pool"]):
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        self.pool = PoolConnexions(chemin, taille_pool)
+        self._index = None
+        self._verrou_index = threading.Lock()
+        self._categories: Dict[str, str] = {}
+        with self.pool.connexion() as connexion:
+            connexion.executescript(SCHEMA)
+
+    # --- Projets -------------------------------------------------------------
+
+    def _inserer_projets(self, connexion: sqlite3.Connection, projets: List[Projet], nature: str):
+        ids = [(p.id,) for p in projets]
+        connexion.executemany("DELETE FROM services_selectionnes WHERE projet_id = ?", ids)
+        connexion.executemany(
+            """INSERT OR REPLACE INTO projets
+               (id, nom, client, type_client, date_creation, total_ht, taux_maintenance,
+                conditions_paiement, nb_services, nature)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [(p.id, p.nom, p.client, p.type_client, p.date_creation.isoformat(), p.total_ht,
+              p.taux_maintenance, p.conditions_paiement, len(p.services), nature)
+             for p in projets]
+        )
+        connexion.executemany(
+            """INSERT INTO services_selectionnes
+               (projet_id, position, service_id, complexite, quantite, prix_unitaire, facteurs)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            [(p.id, position, s.service.id, s.complexite, s.quantite, s.prix_unitaire,
+              json.dumps(s.facteurs_custom, ensure_ascii=False))
+             for p in projets for position, s in enumerate(p.services)]
+        )
+
+    def sauvegarder_projet(self, projet: Projet):
+        """Enregistre (ou remplace) un projet et ses services"""
+        self.sauvegarder_projets([projet])
+
+    def sauvegarder_projets(self, projets: Iterable[Projet],
+                            taille_lot: int = STOCKAGE_CONFIG["taille_lot"]) -> int:
+        """Enregistre des projets en masse, par lots d'une transaction chacun"""
+        total = 0
+        lot = []
+        for projet in projets:
+            lot.append(projet)
+            if len(lot) >= taille_lot:
+                self._enregistrer_lot(lot)
+                total += len(lot)
+                lot = []
+        if lot:
+            self._enregistrer_lot(lot)
+            total += len(lot)
+        return total
+
+    def _enregistrer_lot(self, lot: List[Projet]):
+        with self.pool.transaction() as connexion:
+            self._inserer_projets(connexion, lot, "projet")
+        if self._index is not None:
+            self._index.ajouter_en_masse((self._resume_projet(p), self._lignes_projet(p)) for p in lot)
+
+    def compter_projets(self) -> int:
+        with self.pool.connexion() as connexion:
+            return connexion.execute(
+                "SELECT COUNT(*) FROM projets WHERE nature = 'projet'").fetchone()[0]
+
+    def lister_projets(self, limite: int = STOCKAGE_CONFIG["taille_page"], decalage: int = 0,
+                       client: str = None, type_client: str = None) -> List[ResumeProjet]:
+        """Liste les projets du plus récent au plus ancien sans charger leurs services"""
+        conditions = ["nature = 'projet'"]
+        parametres = []
+        if client:
+            conditions.append("client = ?")
+            parametres.append(client)
+        if type_client:
+            conditions.append("type_client = ?")
+            parametres.append(type_client)
+
+        requete = f"""SELECT id, nom, client, type_client, date_creation, total_ht, nb_services
+                      FROM projets WHERE {' AND '.join(conditions)}
+                      ORDER BY date_creation DESC LIMIT ? OFFSET ?"""
+        with self.pool.connexion() as connexion:
+            lignes = connexion.execute(requete, parametres + [limite, decalage]).fetchall()
+        return [self._resume(ligne) for ligne in lignes]
+
+    @staticmethod
+    def _resume(ligne: sqlite3.Row) -> ResumeProjet:
+        return ResumeProjet(
+            id=ligne["id"],
+            nom=ligne["nom"],
+            client=ligne["client"],
+            type_client=ligne["type_client"],
+            date_creation=datetime.fromisoformat(ligne["date_creation"]),
+            total_ht=ligne["total_ht"],
+            nb_services=ligne["nb_services"]
+        )
+
+    def charger_projet(self, projet_id: str, catalogue: Dict[str, Service]) -> Optional[Projet]:
+        """Hydrate un projet complet à partir de son id"""
+        with self.pool.connexion() as connexion:
+            ligne = connexion.execute("SELECT * FROM projets WHERE id = ?", (projet_id,)).fetchone()
+            if ligne is None:
+                return None
+            services = connexion.execute(
+                """SELECT service_id, complexite, quantite, prix_unitaire, facteurs
+                   FROM services_selectionnes WHERE projet_id = ? ORDER BY position""",
+                (projet_id,)
+            ).fetchall()
+
+        return projet_depuis_dict({
+            "id": ligne["id"],
+            "nom": ligne["nom"],
+            "client": ligne["client"],
+            "type_client": ligne["type_client"],
+            "date_creation": ligne["date_creation"],
+            "taux_maintenance": ligne["taux_maintenance"],
+            "conditions_paiement": ligne["conditions_paiement"],
+            "services": [dict(s, facteurs=json.loads(s["facteurs"])) for s in services]
+        }, catalogue)
+
+    def supprimer_projet(self, projet_id: str):
+        with self.pool.transaction() as connexion:
+            connexion.execute("DELETE FROM projets WHERE id = ?", (projet_id,))
+        if self._index is not None:
+            self._index.retirer(projet_id)
+
+    # --- Index de recherche ----------------------------------------------------------
+
+    def index(self, categories: Dict[str, str] = None):
+        """Retourne l'index de recherche de la bibliothèque, construit au premier appel.
+
+        `categories` associe chaque id de service à sa catégorie du catalogue.
+        """
+        with self._verrou_index:
+            if self._index is None:
+                self._index = self._construire_index(categories or {})
+        return self._index
+
+    def _construire_index(self, categories: Dict[str, str]):
+        from index_projets import IndexProjets
+
+        self._categories = dict(categories)
+
+        with self.pool.connexion() as connexion:
+            lignes_projets = connexion.execute(
+                """SELECT id, nom, client, type_client, date_creation, total_ht, nb_services
+                   FROM projets WHERE nature = 'projet'"""
+            ).fetchall()
+            lignes_services = connexion.execute(
+                """SELECT s.projet_id, s.service_id, SUM(s.prix_unitaire * s.quantite) AS montant
+                   FROM services_selectionnes s JOIN projets p ON p.id = s.projet_id
+                   WHERE p.nature = 'projet'
+                   GROUP BY s.projet_id, s.service_id"""
+            ).fetchall()
+
+        lignes_par_projet: Dict[str, list] = {}
+        for ligne in lignes_services:
+            lignes_par_projet.setdefault(ligne["projet_id"], []).append(
+                (ligne["service_id"], self._categories.get(ligne["service_id"]), ligne["montant"]))
+
+        index = IndexProjets()
+        index.ajouter_en_masse((self._resume(ligne), lignes_par_projet.get(ligne["id"], []))
+                               for ligne in lignes_projets)
+        return index
+
+    @staticmethod
+    def _resume_projet(projet: Projet) -> ResumeProjet:
+        return ResumeProjet(
+            id=projet.id,
+            nom=projet.nom,
+            client=projet.client,
+            type_client=projet.type_client,
+            date_creation=projet.date_creation,
+            total_ht=projet.total_ht,
+            nb_services=len(projet.services)
+        )
+
+    def _lignes_projet(self, projet: Projet) -> list:
+        return [(s.service.id, self._categories.get(s.service.id, s.service.categorie), s.prix_total)
+                for s in projet.services]
+
+    # --- Templates utilisateur ------------------------------------------------
+
+    def sauvegarder_template(self, cle: str, projet: Projet):
+        """Enregistre un projet comme template utilisateur"""
+        with self.pool.transaction() as connexion:
+            ancien = connexion.execute("SELECT projet_id FROM templates WHERE cle = ?", (cle,)).fetchone()
+            if ancien is not None:
+                connexion.execute("DELETE FROM projets WHERE id = ?", (ancien["projet_id"],))
+            self._inserer_projets(connexion, [projet], "template")
+            connexion.execute("INSERT OR REPLACE INTO templates (cle, projet_id) VALUES (?, ?)",
+                              (cle, projet.id))
+        if self._index is not None:
+            self._index.retirer(projet.id)
+
+    def charger_templates(self, catalogue: Dict[str, Service]) -> Dict[str, Projet]:
+        with self.pool.connexion() as connexion:
+            lignes = connexion.execute("SELECT cle, projet_id FROM templates ORDER BY cle").fetchall()
+        templates = {}
+        for ligne in lignes:
+            projet = self.charger_projet(ligne["projet_id"], catalogue)
+            if projet is not None:
+                templates[ligne["cle"]] = projet
+        return templates
+
+    def supprimer_template(self, cle: str):
+        with self.pool.transaction() as connexion:
+            connexion.execute(
+                "DELETE FROM projets WHERE id IN (SELECT projet_id FROM templates WHERE cle = ?)", (cle,))
+
+    # --- Prévisions --------------------------------------------------------------
+
+    def sauvegarder_previsions(self, previsions: Previsions) -> str:
+        """Enregistre des prévisions ; les projets partagés entre années ne sont stockés qu'une fois"""
+        projets = {}
+        annees = []
+        for prevision in previsions.annees:
+            for projet in prevision.projets:
+                projets.setdefault(projet.id, projet)
+            annees.append({
+                "annee": prevision.annee,
+                "projets": [p.id for p in prevision.projets],
+                "charges_fixes": prevision.charges_fixes,
+                "taux_croissance": prevision.taux_croissance
+            })
+
+        contenu = {
+            "projets": [projet_vers_dict(p) for p in projets.values()],
+            "annees": annees
+        }
+        previsions_id = str(uuid.uuid4())
+        with self.pool.transaction() as connexion:
+            connexion.execute(
+                "INSERT INTO previsions (id, nom_scenario, date_creation, nb_annees, contenu) VALUES (?, ?, ?, ?, ?)",
+                (previsions_id, previsions.nom_scenario, datetime.now().isoformat(), len(annees),
+                 json.dumps(contenu, ensure_ascii=False))
+            )
+        return previsions_id
+
+    def lister_previsions(self, limite: int = STOCKAGE_CONFIG["taille_page"]) -> List[Dict]:
+        with self.pool.connexion() as connexion:
+            lignes = connexion.execute(
+                """SELECT id, nom_scenario, date_creation, nb_annees FROM previsions
+                   ORDER BY date_creation DESC LIMIT ?""", (limite,)
+            ).fetchall()
+        return [dict(ligne) for ligne in lignes]
+
+    def charger_previsions(self, previsions_id: str, catalogue: Dict[str, Service]) -> Optional[Previsions]:
+        with self.pool.connexion() as connexion:
+            ligne = connexion.execute("SELECT nom_scenario, contenu FROM previsions WHERE id = ?",
+                                      (previsions_id,)).fetchone()
+        if ligne is None:
+            return None
+
+        contenu = json.loads(ligne["contenu"])
+        projets = {d["id"]: projet_depuis_dict(d, catalogue) for d in contenu["projets"]}
+        previsions = Previsions(nom_scenario=ligne["nom_scenario"])
+        for annee in contenu["annees"]:
+            previsions.ajouter_annee(PrevisionAnnuelle(
+                annee=annee["annee"],
+                projets=[projets[i] for i in annee["projets"]],
+                charges_fixes=annee["charges_fixes"],
+                taux_croissance=annee["taux_croissance"]
+            ))
+        return previsions
+
+    def supprimer_previsions(self, previsions_id: str):
+        with self.pool.transaction() as connexion:
+            connexion.execute("DELETE FROM previsions WHERE id = ?", (previsions_id,))
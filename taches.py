@@ -0,0 +1,275 @@
+# taches.py
+"""Exécution des calculs lourds en arrière-plan : déduplication, progression, annulation et budget de temps
+
+Les tâches sont partagées par toutes les sessions du processus : deux demandes
+identiques en cours (même nom, mêmes arguments) renvoient la même tâche. Le
+script Streamlit soumet la tâche, conserve son identifiant et la sonde à
+chaque exécution au lieu de bloquer en attendant le résultat.
+"""
+
+import hashlib
+import multiprocessing
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, CancelledError
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from config import TACHES_CONFIG
+
+# États d'une tâche
+EN_ATTENTE = "en attente"
+EN_COURS = "en cours"
+TERMINEE = "terminée"
+ECHOUEE = "échouée"
+ANNULEE = "annulée"
+EXPIREE = "expirée"
+ETATS_FINAUX = (TERMINEE, ECHOUEE, ANNULEE, EXPIREE)
+
+
+class TacheInterrompue(Exception):
+    """Levée dans une tâche annulée ou hors budget (voir Progression.verifier)"""
+
+
+@dataclass(slots=True)
+class Tache:
+    """Suivi d'une tâche soumise au gestionnaire"""
+    id: str
+    nom: str
+    budget_s: float
+    processus: bool = False
+    etat: str = EN_ATTENTE
+    progression: float = 0.0
+    message: str = ""
+    resultats_partiels: List[Any] = field(default_factory=list)
+    resultat: Any = None
+    erreur: Optional[str] = None
+    soumise: float = field(default_factory=time.monotonic)
+    debut: Optional[float] = None
+    fin: Optional[float] = None
+    annulation: threading.Event = field(default_factory=threading.Event, repr=False)
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def terminee(self) -> bool:
+        return self.etat in ETATS_FINAUX
+
+    @property
+    def duree_s(self) -> float:
+        if self.debut is None:
+            return 0.0
+        return (self.fin or time.monotonic()) - self.debut
+
+
+class Progression:
+    """Transmise aux tâches exécutées en thread : avancement, résultats partiels, annulation"""
+
+    def __init__(self, tache: Tache):
+        self._tache = tache
+
+    @property
+    def interrompue(self) -> bool:
+        tache = self._tache
+        return tache.annulation.is_set() or (tache.debut is not None
+                                             and time.monotonic() - tache.debut > tache.budget_s)
+
+    def verifier(self):
+        """Lève TacheInterrompue si la tâche a été annulée ou a dépassé son budget"""
+        if self.interrompue:
+            raise TacheInterrompue(self._tache.id)
+
+    def avancer(self, fraction: float, message: str = None, partiel: Any = None):
+        """Publie l'avancement (0 → 1) et éventuellement un résultat partiel, puis vérifie l'annulation"""
+        self._tache.progression = min(max(fraction, 0.0), 1.0)
+        if message is not None:
+            self._tache.message = message
+        if partiel is not None:
+            self._tache.resultats_partiels.append(partiel)
+        self.verifier()
+
+
+def empreinte_appel(nom: str, args: tuple, kwargs: dict) -> str:
+    """Clé de déduplication : nom de la tâche et contenu des arguments"""
+    try:
+        contenu = pickle.dumps((args, sorted(kwargs.items())), protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        # Arguments non sérialisables : pas de déduplication possible
+        contenu = uuid.uuid4().bytes
+    return f"{nom}:{hashlib.sha256(contenu).hexdigest()[:16]}"
+
+
+class GestionnaireTaches:
+    """Pool de threads (tâches avec progression) et de processus (calcul pur, hors GIL)"""
+
+    def __init__(self, nb_threads: int, nb_processus: int, budget_s: float, conservation_s: float):
+        self.budget_s = budget_s
+        self.conservation_s = conservation_s
+        self._threads = ThreadPoolExecutor(max_workers=nb_threads, thread_name_prefix="tache")
+        self._nb_processus = nb_processus
+        self._processus: Optional[ProcessPoolExecutor] = None
+        self._verrou = threading.Lock()
+        self._taches: Dict[str, Tache] = {}
+
+    def _pool_processus(self) -> ProcessPoolExecutor:
+        # Démarré à la première tâche en processus ; "spawn" évite de dupliquer les threads du serveur
+        if self._processus is None:
+            self._processus = ProcessPoolExecutor(max_workers=self._nb_processus,
+                                                  mp_context=multiprocessing.get_context("spawn"))
+        return self._processus
+
+    def soumettre(self, nom: str, fonction: Callable, *args, processus: bool = False,
+                  budget_s: float = None, **kwargs) -> Tache:
+        """Soumet `fonction(*args, **kwargs)` et retourne sa tâche.
+
+        En thread, la fonction reçoit en plus `progression=Progression(...)`.
+        En processus (`processus=True`), fonction et arguments doivent être
+        sérialisables ; il n'y a ni progression ni annulation une fois démarrée.
+        Une tâche identique encore en cours est renvoyée telle quelle.
+        """
+        cle = empreinte_appel(nom, args, kwargs)
+        with self._verrou:
+            self._purger()
+            existante = self._taches.get(cle)
+            if existante is not None and not self._actualiser(existante).terminee:
+                return existante
+
+            tache = Tache(id=cle, nom=nom, budget_s=budget_s or self.budget_s, processus=processus)
+            self._taches[cle] = tache
+            if processus:
+                tache.debut = time.monotonic()
+                tache.etat = EN_COURS
+                tache.future = self._pool_processus().submit(fonction, *args, **kwargs)
+                tache.future.add_done_callback(lambda future: self._conclure(tache, future))
+            else:
+                tache.future = self._threads.submit(self._executer, tache, fonction, args, kwargs)
+        return tache
+
+    def soumettre_processus(self, fonction: Callable, *args, **kwargs) -> Future:
+        """Soumet directement au pool de processus, sans tâche ni regroupement des appels identiques.
+
+        Pour les sous-calculs d'une tâche : l'appelant est seul à détenir le Future
+        et peut l'annuler sans toucher au calcul d'une autre session.
+        """
+        with self._verrou:
+            pool = self._pool_processus()
+        return pool.submit(fonction, *args, **kwargs)
+
+    def deja_calculee(self, nom: str, resultat: Any) -> Tache:
+        """Tâche terminée d'emblée, pour un résultat déjà disponible (cache) affiché comme les autres"""
+        maintenant = time.monotonic()
+        tache = Tache(id=f"{nom}:{uuid.uuid4().hex[:16]}", nom=nom, budget_s=self.budget_s,
+                      etat=TERMINEE, progression=1.0, resultat=resultat, debut=maintenant, fin=maintenant)
+        with self._verrou:
+            self._purger()
+            self._taches[tache.id] = tache
+        return tache
+
+    def _executer(self, tache: Tache, fonction: Callable, args: tuple, kwargs: dict):
+        if tache.annulation.is_set():
+            self._terminer(tache, ANNULEE)
+            return
+        tache.debut = time.monotonic()
+        tache.etat = EN_COURS
+        progression = Progression(tache)
+        try:
+            resultat = fonction(*args, progression=progression, **kwargs)
+        except TacheInterrompue:
+            if tache.annulation.is_set():
+                self._terminer(tache, ANNULEE)
+            else:
+                self._terminer(tache, EXPIREE, erreur=f"Budget de {tache.budget_s:.0f} s dépassé")
+        except Exception as e:  # L'erreur est rapportée à l'interface, pas propagée au pool
+            self._terminer(tache, ECHOUEE, erreur=f"{type(e).__name__} : {e}")
+        else:
+            tache.progression = 1.0
+            self._terminer(tache, TERMINEE, resultat)
+
+    def _conclure(self, tache: Tache, future: Future):
+        """Fin d'une tâche en processus (rappel du pool)"""
+        if tache.terminee:
+            return  # Déjà annulée ou expirée : le résultat tardif est ignoré
+        try:
+            resultat = future.result()
+        except CancelledError:
+            self._terminer(tache, ANNULEE)
+        except Exception as e:
+            self._terminer(tache, ECHOUEE, erreur=f"{type(e).__name__} : {e}")
+        else:
+            tache.progression = 1.0
+            self._terminer(tache, TERMINEE, resultat)
+
+    @staticmethod
+    def _terminer(tache: Tache, etat: str, resultat: Any = None, erreur: str = None):
+        if tache.terminee:
+            return  # Premier état final retenu (une tâche expirée ne devient pas terminée)
+        tache.resultat = resultat
+        tache.erreur = erreur
+        tache.fin = time.monotonic()
+        tache.etat = etat
+
+    def _actualiser(self, tache: Tache) -> Tache:
+        """Applique le budget de temps, y compris aux tâches qui ne vérifient pas leur progression"""
+        if (not tache.terminee and tache.debut is not None
+                and time.monotonic() - tache.debut > tache.budget_s):
+            tache.annulation.set()
+            tache.future.cancel()
+            self._terminer(tache, EXPIREE, erreur=f"Budget de {tache.budget_s:.0f} s dépassé")
+        return tache
+
+    def tache(self, id_tache: Optional[str]) -> Optional[Tache]:
+        """Tâche par identifiant (None si inconnue ou purgée)"""
+        if id_tache is None:
+            return None
+        with self._verrou:
+            tache = self._taches.get(id_tache)
+        return self._actualiser(tache) if tache is not None else None
+
+    def annuler(self, id_tache: str) -> bool:
+        """Demande l'annulation ; une tâche en processus déjà démarrée est seulement abandonnée"""
+        tache = self.tache(id_tache)
+        if tache is None or tache.terminee:
+            return False
+        tache.annulation.set()
+        # Pas encore démarrée : retirée du pool ; en processus : résultat abandonné.
+        # En thread, la tâche s'arrête à son prochain appel de progression.
+        if tache.future.cancel() or tache.processus:
+            self._terminer(tache, ANNULEE)
+        return True
+
+    def _purger(self):
+        """Oublie les tâches terminées depuis plus de `conservation_s` (verrou déjà pris)"""
+        limite = time.monotonic() - self.conservation_s
+        for cle in [c for c, t in self._taches.items() if t.terminee and t.fin < limite]:
+            del self._taches[cle]
+
+    def en_cours(self) -> List[Tache]:
+        with self._verrou:
+            taches = list(self._taches.values())
+        return [t for t in map(self._actualiser, taches) if not t.terminee]
+
+    def arreter(self):
+        for tache in self.en_cours():
+            tache.annulation.set()
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processus is not None:
+            self._processus.shutdown(wait=False, cancel_futures=True)
+
+
+_gestionnaire: Optional[GestionnaireTaches] = None
+_verrou_gestionnaire = threading.Lock()
+
+
+def gestionnaire() -> GestionnaireTaches:
+    """Gestionnaire partagé par toutes les sessions du processus"""
+    global _gestionnaire
+    with _verrou_gestionnaire:
+        if _gestionnaire is None:
+            _gestionnaire = GestionnaireTaches(
+                TACHES_CONFIG["nb_threads"],
+                TACHES_CONFIG["nb_processus"],
+                TACHES_CONFIG["budget_s"],
+                TACHES_CONFIG["conservation_s"]
+            )
+        return _gestionnaire
@@ -0,0 +1,160 @@
+# templates_precalcules.py
+"""Artefact précalculé des templates de projets : prix, totaux et projection par défaut.
+
+L'artefact est un fichier JSON livré avec l'application. Son empreinte est
+celle des sources qui déterminent les prix (data.py, config.py, models.py et
+le catalogue) : dès qu'elles changent, l'artefact est recalculé et réécrit au
+premier chargement, y compris quand le catalogue est modifié à chaud.
+
+Usage (régénération explicite, par exemple à la construction de l'image) :
+    python -m templates_precalcules
+"""
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from config import CHARGES_FIXES_DEFAUT
+from data import catalogue_courant, creer_catalogue_services, creer_templates_projets
+from models import Projet, PrevisionAnnuelle, Previsions, Service
+from stockage import projet_vers_dict, projet_depuis_dict
+
+FORMAT = 1
+RACINE = os.path.dirname(os.path.abspath(__file__))
+CHEMIN_ARTEFACT = os.path.join(RACINE, "ressources", "templates_precalcules.json")
+SOURCES = ("data.py", "config.py", "models.py", "monnaie.py")
+
+# Projection par défaut : mêmes valeurs que les curseurs de l'onglet Prévisions
+PROJECTION_DEFAUT = {
+    "nb_annees": 3,
+    "taux_croissance": 0.12,
+    "taux_inflation": 0.025
+}
+
+
+@dataclass(slots=True)
+class TemplatePrecalcule:
+    """Template prêt à l'emploi : projet tarifé, totaux et projection par défaut"""
+    cle: str
+    projet: Projet
+    totaux: Dict[str, float]
+    projection: pd.DataFrame
+
+
+def empreinte_sources(sources: List[str] = SOURCES) -> str:
+    """Empreinte SHA-256 du contenu des fichiers sources et du catalogue en vigueur"""
+    empreinte = hashlib.sha256()
+    for nom in sources:
+        with open(os.path.join(RACINE, nom), "rb") as f:
+            empreinte.update(nom.encode() + b"\0" + f.read())
+    empreinte.update(b"catalogue\0" + catalogue_courant().version.encode())
+    return empreinte.hexdigest()
+
+
+def _projection_defaut(projet: Projet) -> pd.DataFrame:
+    previsions = Previsions(nom_scenario="Template")
+    previsions.ajouter_annee(PrevisionAnnuelle(annee=1, projets=[projet],
+                                               charges_fixes=dict(CHARGES_FIXES_DEFAUT)))
+    previsions.generer_projections(PROJECTION_DEFAUT["nb_annees"], PROJECTION_DEFAUT["taux_croissance"],
+                                   CHARGES_FIXES_DEFAUT, PROJECTION_DEFAUT["taux_inflation"])
+    return previsions.get_dataframe_resultats()
+
+
+def calculer_artefact(empreinte: str) -> dict:
+    """Tarifie chaque template et calcule sa projection par défaut"""
+    catalogue = creer_catalogue_services()
+    templates = {}
+    for cle, projet in creer_templates_projets(catalogue).items():
+        # Identifiant et date fixes : l'artefact ne change qu'avec les sources (copie renouvelée au chargement)
+        projet.id = f"template-{cle}"
+        projet.date_creation = datetime(2000, 1, 1)
+        templates[cle] = {
+            "projet": projet_vers_dict(projet),
+            "totaux": {
+                "total_ht": projet.total_ht,
+                "tva": projet.tva,
+                "total_ttc": projet.total_ttc,
+                "maintenance_annuelle_ht": projet.maintenance_annuelle_ht
+            },
+            "projection": _projection_defaut(projet).to_dict(orient="split", index=False)
+        }
+    return {
+        "format": FORMAT,
+        "empreinte": empreinte,
+        "projection": PROJECTION_DEFAUT,
+        "templates": templates
+    }
+
+
+def lire_artefact(chemin: str = CHEMIN_ARTEFACT) -> Optional[dict]:
+    """Artefact sur disque, ou None s'il est absent ou illisible"""
+    try:
+        with open(chemin, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ecrire_artefact(artefact: dict, chemin: str = CHEMIN_ARTEFACT):
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    temporaire = f"{chemin}.tmp"
+    with open(temporaire, "w", encoding="utf-8") as f:
+        json.dump(artefact, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    os.replace(temporaire, chemin)
+
+
+def artefact_a_jour(chemin: str = CHEMIN_ARTEFACT) -> dict:
+    """Artefact valide pour les sources actuelles, recalculé et réécrit si périmé"""
+    empreinte = empreinte_sources()
+    artefact = lire_artefact(chemin)
+    if artefact and artefact.get("format") == FORMAT and artefact.get("empreinte") == empreinte:
+        return artefact
+
+    artefact = calculer_artefact(empreinte)
+    try:
+        ecrire_artefact(artefact, chemin)
+    except OSError:
+        pass  # Image en lecture seule : l'artefact recalculé sert pour ce processus
+    return artefact
+
+
+def construire_templates(artefact: dict, catalogue: Dict[str, Service]) -> Dict[str, TemplatePrecalcule]:
+    """Reconstruit les templates sans recalculer les prix (prix unitaires lus dans l'artefact)"""
+    return {
+        cle: TemplatePrecalcule(
+            cle=cle,
+            projet=projet_depuis_dict(contenu["projet"], catalogue),
+            totaux=contenu["totaux"],
+            projection=pd.DataFrame(contenu["projection"]["data"], columns=contenu["projection"]["columns"])
+        )
+        for cle, contenu in artefact["templates"].items()
+    }
+
+
+_templates: Optional[Dict[str, TemplatePrecalcule]] = None
+_version_catalogue: Optional[str] = None
+_verrou_templates = threading.Lock()
+
+
+def templates() -> Dict[str, TemplatePrecalcule]:
+    """Templates partagés par toutes les sessions du processus (lecture seule), reconstruits si le catalogue change"""
+    global _templates, _version_catalogue
+    catalogue = catalogue_courant()
+    with _verrou_templates:
+        if _templates is None or _version_catalogue != catalogue.version:
+            _templates = construire_templates(artefact_a_jour(), dict(catalogue.services))
+            _version_catalogue = catalogue.version
+        return _templates
+
+
+if __name__ == "__main__":
+    artefact = calculer_artefact(empreinte_sources())
+    ecrire_artefact(artefact)
+    print(f"{len(artefact['templates'])} templates précalculés → {CHEMIN_ARTEFACT}")
@@ -0,0 +1,244 @@
+# tresorerie.py
+"""Moteur de trésorerie mensuelle : échéanciers de paiement, TVA et charges"""
+
+from dataclasses import dataclass
+from typing import List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    TAUX_TVA, ECHEANCIERS_PAIEMENT, CONDITIONS_PAIEMENT_DEFAUT,
+    TRESORERIE_PARAMS, SIMULATION_PARAMS
+)
+from cache_disque import memoiser_disque
+from models import Projet
+from monnaie import en_centimes, en_euros, appliquer_facteur, calculer_tva
+from perf import chronometre
+
+Scalaire = Union[float, Sequence[float], np.ndarray]
+
+
+@dataclass
+class CalendrierProjets:
+    """Occurrences de projets à plat : un élément par projet signé"""
+    mois_debut: np.ndarray   # Mois de commande (0 = premier mois)
+    duree_mois: np.ndarray   # Durée de réalisation en mois
+    montant_ht: np.ndarray   # Montant HT en centimes (int64) de l'année 1
+    annee: np.ndarray        # Année d'exercice (1, 2, ...) pour la croissance
+    conditions: np.ndarray   # Index de l'échéancier dans ECHEANCIERS_PAIEMENT
+
+    def __len__(self) -> int:
+        return len(self.montant_ht)
+
+
+@dataclass
+class ResultatTresorerie:
+    """Résultats mensuels de trésorerie, tableaux de forme (mois, scénarios)"""
+    encaissements: np.ndarray
+    tva_collectee: np.ndarray
+    tva_reversee: np.ndarray
+    charges_fixes: np.ndarray
+    salaires: np.ndarray
+    flux_net: np.ndarray
+    solde: np.ndarray
+    bfr: np.ndarray
+
+    @property
+    def nb_mois(self) -> int:
+        return self.solde.shape[0]
+
+    @property
+    def nb_scenarios(self) -> int:
+        return self.solde.shape[1]
+
+    @property
+    def solde_min(self) -> np.ndarray:
+        """Point bas de trésorerie par scénario"""
+        return self.solde.min(axis=0)
+
+    @property
+    def mois_solde_min(self) -> np.ndarray:
+        """Mois (1 = premier mois) du point bas par scénario"""
+        return self.solde.argmin(axis=0) + 1
+
+    @property
+    def besoin_financement(self) -> np.ndarray:
+        """Financement externe nécessaire pour ne jamais passer sous zéro"""
+        return np.maximum(0.0, -self.solde_min)
+
+    @property
+    def bfr_max(self) -> np.ndarray:
+        return self.bfr.max(axis=0)
+
+    def get_dataframe(self, scenario: int = 0) -> pd.DataFrame:
+        """Retourne le détail mensuel d'un scénario"""
+        return pd.DataFrame({
+            "Mois": np.arange(1, self.nb_mois + 1),
+            "Encaissements TTC": self.encaissements[:, scenario],
+            "TVA reversée": self.tva_reversee[:, scenario],
+            "Charges fixes": self.charges_fixes[:, scenario],
+            "Salaires": self.salaires[:, scenario],
+            "Flux net": self.flux_net[:, scenario],
+            "Trésorerie": self.solde[:, scenario],
+            "BFR": self.bfr[:, scenario]
+        })
+
+    def get_dataframe_synthese(self, noms_scenarios: List[str] = None) -> pd.DataFrame:
+        """Retourne une ligne de synthèse par scénario"""
+        noms = noms_scenarios or [f"Scénario {i + 1}" for i in range(self.nb_scenarios)]
+        return pd.DataFrame({
+            "Scénario": noms,
+            "Trésorerie fin": self.solde[-1],
+            "Point bas": self.solde_min,
+            "Mois du point bas": self.mois_solde_min,
+            "BFR max": self.bfr_max,
+            "Besoin de financement": self.besoin_financement
+        })
+
+
+def estimer_duree_mois(montant_ht_centimes: np.ndarray) -> np.ndarray:
+    """Estime la durée de réalisation selon la taille du projet (montants HT en centimes)"""
+    montant_ht = np.asarray(montant_ht_centimes, dtype=np.int64)
+    return np.select(
+        [montant_ht >= en_centimes(40000), montant_ht >= en_centimes(15000)],
+        [SIMULATION_PARAMS["duree_gros_projet_mois"], SIMULATION_PARAMS["duree_projet_moyen_mois"]],
+        default=SIMULATION_PARAMS["duree_petit_projet_mois"]
+    ).astype(np.int64)
+
+
+@chronometre("tresorerie.calendrier")
+def construire_calendrier(projets: List[Projet], multiplicateurs: Sequence[int] = None,
+                          nb_annees: int = 1) -> CalendrierProjets:
+    """Répartit les projets de l'année type sur chaque année de la projection.
+
+    Un projet de multiplicateur m est signé m fois par an, à intervalles réguliers.
+    """
+    noms_conditions = list(ECHEANCIERS_PAIEMENT.keys())
+    if not projets:
+        vide = np.zeros(0, dtype=np.int64)
+        return CalendrierProjets(vide, vide, vide, vide, vide)
+
+    multiplicateurs = np.asarray(multiplicateurs if multiplicateurs is not None else [1] * len(projets),
+                                 dtype=np.int64)
+    montants = np.fromiter((p.total_ht_centimes for p in projets), dtype=np.int64, count=len(projets))
+    conditions = np.array([
+        noms_conditions.index(p.conditions_paiement) if p.conditions_paiement in ECHEANCIERS_PAIEMENT
+        else noms_conditions.index(CONDITIONS_PAIEMENT_DEFAUT)
+        for p in projets
+    ], dtype=np.int64)
+
+    # Occurrences sur une année : rang k de chaque répétition d'un même projet
+    idx = np.repeat(np.arange(len(projets)), multiplicateurs)
+    debut_groupe = np.repeat(np.cumsum(multiplicateurs) - multiplicateurs, multiplicateurs)
+    rang = np.arange(len(idx)) - debut_groupe
+    mois_dans_annee = (12 * (rang + 0.5) / multiplicateurs[idx]).astype(np.int64)
+
+    # Duplication sur les années de projection
+    annees = np.repeat(np.arange(1, nb_annees + 1), len(idx))
+    idx_total = np.tile(idx, nb_annees)
+
+    return CalendrierProjets(
+        mois_debut=np.tile(mois_dans_annee, nb_annees) + 12 * (annees - 1),
+        duree_mois=estimer_duree_mois(montants)[idx_total],
+        montant_ht=montants[idx_total],
+        annee=annees,
+        conditions=conditions[idx_total]
+    )
+
+
+def _matrice_echeances(calendrier: CalendrierProjets, nb_mois: int, avec_delai: bool) -> np.ndarray:
+    """Matrice (mois, projets) des parts de TTC échues chaque mois"""
+    matrice = np.zeros((nb_mois, len(calendrier)))
+    for i, tranches in enumerate(ECHEANCIERS_PAIEMENT.values()):
+        projets = np.flatnonzero(calendrier.conditions == i)
+        if projets.size == 0:
+            continue
+        for part, avancement, delai in tranches:
+            mois = (calendrier.mois_debut[projets]
+                    + np.rint(avancement * calendrier.duree_mois[projets]).astype(np.int64))
+            if avec_delai:
+                mois = mois + delai
+            dans_horizon = mois < nb_mois
+            np.add.at(matrice, (mois[dans_horizon], projets[dans_horizon]), part)
+    return matrice
+
+
+def _matrice_production(calendrier: CalendrierProjets, nb_mois: int) -> np.ndarray:
+    """Matrice (mois, projets) de la production réalisée, répartie uniformément"""
+    variations = np.zeros((nb_mois + 1, len(calendrier)))
+    colonnes = np.arange(len(calendrier))
+    debut = np.minimum(calendrier.mois_debut, nb_mois)
+    fin = np.minimum(calendrier.mois_debut + np.maximum(calendrier.duree_mois, 1), nb_mois)
+    taux = 1.0 / np.maximum(calendrier.duree_mois, 1)
+    np.add.at(variations, (debut, colonnes), taux)
+    np.add.at(variations, (fin, colonnes), -taux)
+    return np.cumsum(variations, axis=0)[:nb_mois]
+
+
+def _decaler(tableau: np.ndarray, decalage: int) -> np.ndarray:
+    """Décale un tableau (mois, scénarios) de quelques mois vers le futur"""
+    if decalage <= 0:
+        return tableau.copy()
+    resultat = np.zeros_like(tableau)
+    resultat[decalage:] = tableau[:-decalage]
+    return resultat
+
+
+@memoiser_disque("tresorerie.calcul", sources=("monnaie.py",))
+@chronometre("tresorerie.calcul")
+def calculer_tresorerie(calendrier: CalendrierProjets,
+                        nb_mois: int,
+                        charges_fixes_annuelles: Scalaire,
+                        taux_croissance: Scalaire = 0.0,
+                        taux_inflation: Scalaire = 0.02,
+                        salaires_annuels: Scalaire = 0.0,
+                        tresorerie_initiale: Scalaire = TRESORERIE_PARAMS["tresorerie_initiale"],
+                        delai_tva_mois: int = TRESORERIE_PARAMS["delai_reversement_tva_mois"]) -> ResultatTresorerie:
+    """Calcule la trésorerie mensuelle pour un lot de scénarios.
+
+    Chaque paramètre peut être un scalaire ou un tableau d'un élément par scénario.
+    La TVA est exigible à l'encaissement (prestations de services) et reversée
+    après `delai_tva_mois` ; les charges sont supposées toutes taxes comprises.
+    """
+    nb_mois = int(min(nb_mois, TRESORERIE_PARAMS["horizon_max_mois"]))
+    croissance, inflation, charges, salaires, initiale = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(x, dtype=float)) for x in
+          (taux_croissance, taux_inflation, charges_fixes_annuelles, salaires_annuels, tresorerie_initiale))
+    )
+
+    # Montants TTC facturés par projet et par scénario (croissance appliquée à l'année de signature),
+    # arrondis au centime comme sur le devis ; l'étalement mensuel se fait ensuite en euros
+    facteur_croissance = (1 + croissance[None, :]) ** (calendrier.annee[:, None] - 1)
+    montants_ht = appliquer_facteur(calendrier.montant_ht[:, None], facteur_croissance)
+    montants_ttc = en_euros(montants_ht + calculer_tva(montants_ht, TAUX_TVA))
+
+    # Encaissements selon les échéanciers
+    encaissements = _matrice_echeances(calendrier, nb_mois, avec_delai=True) @ montants_ttc
+    tva_collectee = encaissements * (TAUX_TVA / (1 + TAUX_TVA))
+    tva_reversee = _decaler(tva_collectee, delai_tva_mois)
+
+    # Charges mensuelles indexées chaque année
+    annee_mois = np.arange(nb_mois) // 12
+    indexation = (1 + inflation[None, :]) ** annee_mois[:, None]
+    charges_mensuelles = charges[None, :] / 12 * indexation
+    salaires_mensuels = salaires[None, :] / 12 * indexation
+
+    flux_net = encaissements - tva_reversee - charges_mensuelles - salaires_mensuels
+    solde = initiale[None, :] + np.cumsum(flux_net, axis=0)
+
+    # BFR : production réalisée non encaissée, moins la TVA collectée non reversée
+    production_ttc = _matrice_production(calendrier, nb_mois) @ montants_ttc
+    bfr = (np.cumsum(production_ttc, axis=0) - np.cumsum(encaissements, axis=0)
+           - (np.cumsum(tva_collectee, axis=0) - np.cumsum(tva_reversee, axis=0)))
+
+    return ResultatTresorerie(
+        encaissements=encaissements,
+        tva_collectee=tva_collectee,
+        tva_reversee=tva_reversee,
+        charges_fixes=charges_mensuelles,
+        salaires=salaires_mensuels,
+        flux_net=flux_net,
+        solde=solde,
+        bfr=bfr
+    )
@@ -2,20 +2,30 @@
 """Fonctions utilitaires pour le calculateur Caribo"""
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime
 from typing import List, Dict, Any
+import functools
 import io
+from xml.sax.saxutils import escape
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import (
+    SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, PageBreak
+)
 from reportlab.platypus.tableofcontents import TableOfContents
 
 from config import GRAPH_CONFIG, PDF_CONFIG
+from consolidation import Consolidation
 from models import Projet, Previsions
+from monnaie import en_euros
+from perf import chronometre
+from simulation import ResultatSimulation
 
 
 def format_currency(value: float, include_cents: bool = False) -> str:
@@ -33,12 +43,12 @@ def format_percentage(value: float, decimals: int = 1) -> str:
 def init_session_state():
     """Initialise les variables de session Streamlit"""
     if 'initialized' not in st.session_state:
-        from data import creer_catalogue_services, creer_templates_projets
+        from data import creer_catalogue_services, catalogue_courant
         from config import CHARGES_FIXES_DEFAUT
 
-        # Charger le catalogue et les templates
+        # Charger le catalogue (les templates sont partagés par le processus, voir load_template_projet)
         st.session_state.catalogue_services = creer_catalogue_services()
-        st.session_state.templates_projets = creer_templates_projets(st.session_state.catalogue_services)
+        st.session_state.version_catalogue = catalogue_courant().version
 
         # Initialiser le projet en cours
         st.session_state.projet_courant = Projet(nom="Nouveau projet")
@@ -55,6 +65,23 @@ def init_session_state():
         st.session_state.initialized = True
 
 
+def actualiser_catalogue():
+    """Remplace le catalogue de la session quand le fichier catalogue a changé (projets en cours conservés)"""
+    from data import catalogue_courant
+    catalogue = catalogue_courant()
+    if st.session_state.get('version_catalogue') != catalogue.version:
+        st.session_state.catalogue_services = dict(catalogue.services)
+        st.session_state.version_catalogue = catalogue.version
+
+
+@st.cache_resource
+def get_stockage():
+    """Retourne le stockage SQLite partagé par toutes les sessions"""
+    from stockage import StockageProjets
+    return StockageProjets()
+
+
+@chronometre("graphique.ca_evolution")
 def creer_graphique_ca_evolution(df_resultats: pd.DataFrame) -> plt.Figure:
     """Crée un graphique d'évolution du CA et du résultat net"""
     plt.style.use(GRAPH_CONFIG['style'])
@@ -82,6 +109,7 @@ def creer_graphique_ca_evolution(df_resultats: pd.DataFrame) -> plt.Figure:
     return fig
 
 
+@chronometre("graphique.repartition")
 def creer_graphique_repartition(df_resultats: pd.DataFrame, annee: int = 1) -> plt.Figure:
     """Crée un graphique de répartition des charges et résultats"""
     plt.style.use(GRAPH_CONFIG['style'])
@@ -130,8 +158,153 @@ def creer_graphique_repartition(df_resultats: pd.DataFrame, annee: int = 1) -> p
     return fig
 
 
+@chronometre("graphique.consolidation")
+def creer_graphique_consolidation(consolidation: Consolidation, nb_max_entites: int = 8) -> plt.Figure:
+    """CA par entité empilé chaque année (les plus petites regroupées), CA consolidé et résultat net du groupe"""
+    plt.style.use(GRAPH_CONFIG['style'])
+    fig, ax = plt.subplots(figsize=GRAPH_CONFIG['figsize'])
+
+    annees = consolidation.annees
+    ca = consolidation.matrice("CA Total")
+    ordre = np.argsort(-ca.sum(axis=1), kind="stable")
+    principales = ordre[:nb_max_entites]
+    series = [(consolidation.entites[i], ca[i]) for i in principales]
+    if len(ordre) > nb_max_entites:
+        series.append((f"Autres ({len(ordre) - nb_max_entites})", ca[ordre[nb_max_entites:]].sum(axis=0)))
+
+    # Barres empilées : CA de chaque entité avant éliminations
+    base = np.zeros(len(annees))
+    couleurs = plt.get_cmap("tab20").colors
+    for k, (nom, valeurs) in enumerate(series):
+        ax.bar(annees, valeurs, bottom=base, label=nom, color=couleurs[k % len(couleurs)], alpha=0.85)
+        base += valeurs
+
+    consolide = consolidation.consolide()
+    ax.plot(annees, consolide["CA consolidé"], marker='o', linewidth=2, color='black', label="CA consolidé")
+    ax.plot(annees, consolide["Résultat net"], marker='s', linewidth=2,
+            color=GRAPH_CONFIG['colors'][2], label="Résultat net consolidé")
+
+    # Mise en forme
+    ax.set_xlabel("Année", fontsize=12)
+    ax.set_ylabel("Montant (€)", fontsize=12)
+    ax.set_title("Consolidation du groupe", fontsize=14, fontweight='bold')
+    ax.set_xticks(annees)
+    ax.grid(True, axis='y', linestyle='--', alpha=0.7)
+    ax.legend(loc='upper left', framealpha=0.9, fontsize=8)
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f"{x/1000:.0f}k€"))
+
+    plt.tight_layout()
+
+    return fig
+
+
+@chronometre("graphique.bandes")
+def creer_graphique_bandes(simulation: ResultatSimulation, df_resultats: pd.DataFrame,
+                           metriques: tuple = ("CA Total", "Résultat net")) -> plt.Figure:
+    """Bandes de percentiles simulées (paires extrêmes vers le centre), médiane et prévision de référence"""
+    plt.style.use(GRAPH_CONFIG['style'])
+    fig, ax = plt.subplots(figsize=GRAPH_CONFIG['figsize'])
+
+    for k, metrique in enumerate(metriques):
+        couleur = GRAPH_CONFIG['colors'][k]
+        bandes = simulation.bandes(metrique)
+        percentiles = list(bandes.columns[1:])
+        # P5–P95 puis P25–P75 : chaque paire plus opaque que la précédente
+        for i in range(len(percentiles) // 2):
+            bas, haut = percentiles[i], percentiles[-1 - i]
+            ax.fill_between(bandes["Année"], bandes[bas], bandes[haut], color=couleur,
+                            alpha=0.15 * (i + 1), linewidth=0, label=f"{metrique} {bas}–{haut}")
+        if len(percentiles) % 2:
+            median = percentiles[len(percentiles) // 2]
+            ax.plot(bandes["Année"], bandes[median], linewidth=2, color=couleur, label=f"{metrique} médiane")
+        ax.plot(df_resultats["Année"], df_resultats[metrique], marker='o', linestyle='--',
+                color=couleur, label=f"{metrique} prévu")
+
+    # Mise en forme
+    ax.set_xlabel("Année", fontsize=12)
+    ax.set_ylabel("Montant (€)", fontsize=12)
+    ax.set_title(f"Bandes de percentiles ({simulation.nb_chemins:,} chemins)".replace(",", " "),
+                 fontsize=14, fontweight='bold')
+    ax.set_xticks(df_resultats["Année"])
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.legend(loc='upper left', framealpha=0.9, fontsize=8)
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f"{x/1000:.0f}k€"))
+
+    plt.tight_layout()
+
+    return fig
+
+
+# Colonnes du tableau des services : largeurs fixes, reportlab n'a pas à mesurer le contenu
+LARGEURS_COLONNES_DEVIS = (3.5*inch, 1*inch, 1.5*inch, 1.5*inch)
+MARGE_CELLULE = 12  # Rembourrage gauche + droite par défaut d'une cellule (points)
+
+
+@functools.lru_cache(maxsize=1)
+def styles_devis() -> Dict[str, Any]:
+    """Styles du devis, construits une fois par processus puis partagés (lecture seule)"""
+    styles = getSampleStyleSheet()
+    return {
+        "titre": ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=PDF_CONFIG['title_size'],
+            textColor=colors.HexColor('#1f77b4'),
+            spaceAfter=30
+        ),
+        "sous_titre": ParagraphStyle(
+            'CustomSubtitle',
+            parent=styles['Heading2'],
+            fontSize=PDF_CONFIG['subtitle_size'],
+            textColor=colors.HexColor('#333333'),
+            spaceAfter=20
+        ),
+        "normal": styles['Normal'],
+        "services": TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('FONTNAME', (0, 1), (-1, -1), PDF_CONFIG['font_family']),
+            ('FONTSIZE', (0, 1), (-1, -1), PDF_CONFIG['font_size']),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige]),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]),
+        "totaux": TableStyle([
+            ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (2, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (2, -1), (-1, -1), 12),
+            ('LINEABOVE', (2, -1), (-1, -1), 2, colors.black),
+        ])
+    }
+
+
+def _cellule_service(nom: str, style: ParagraphStyle):
+    """Nom du service : texte simple s'il tient sur une ligne, paragraphe (retour à la ligne) sinon"""
+    largeur = stringWidth(nom, PDF_CONFIG['font_family'], PDF_CONFIG['font_size'])
+    if largeur <= LARGEURS_COLONNES_DEVIS[0] - MARGE_CELLULE:
+        return nom
+    return Paragraph(escape(nom), style)
+
+
+def _numeroter_page(canvas, doc):
+    canvas.saveState()
+    canvas.setFont(PDF_CONFIG['font_family'], 8)
+    canvas.drawRightString(doc.pagesize[0] - PDF_CONFIG['margin'], PDF_CONFIG['margin'] / 2, f"Page {doc.page}")
+    canvas.restoreState()
+
+
+@chronometre("export.pdf_devis")
 def generer_pdf_devis(projet: Projet) -> bytes:
-    """Génère un devis PDF pour un projet"""
+    """Génère un devis PDF pour un projet.
+
+    Le tableau des services est paginé (en-tête répété sur chaque page, lignes
+    coupées entre deux pages si besoin) : un devis de plusieurs centaines de
+    lignes se met en page en temps linéaire.
+    """
     buffer = io.BytesIO()
 
     # Créer le document
@@ -143,88 +316,53 @@ def generer_pdf_devis(projet: Projet) -> bytes:
         topMargin=PDF_CONFIG['margin'],
         bottomMargin=PDF_CONFIG['margin']
     )
-
-    # Styles
-    styles = getSampleStyleSheet()
-    style_title = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=PDF_CONFIG['title_size'],
-        textColor=colors.HexColor('#1f77b4'),
-        spaceAfter=30
-    )
-    style_subtitle = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=PDF_CONFIG['subtitle_size'],
-        textColor=colors.HexColor('#333333'),
-        spaceAfter=20
-    )
+    styles = styles_devis()
 
     # Contenu du document
     elements = []
 
     # En-tête
-    elements.append(Paragraph("DEVIS", style_title))
-    elements.append(Paragraph(f"Projet : {projet.nom}", style_subtitle))
-    elements.append(Paragraph(f"Client : {projet.client}", styles['Normal']))
-    elements.append(Paragraph(f"Date : {datetime.now().strftime('%d/%m/%Y')}", styles['Normal']))
+    elements.append(Paragraph("DEVIS", styles["titre"]))
+    elements.append(Paragraph(f"Projet : {escape(projet.nom)}", styles["sous_titre"]))
+    elements.append(Paragraph(f"Client : {escape(projet.client)}", styles["normal"]))
+    elements.append(Paragraph(f"Date : {datetime.now().strftime('%d/%m/%Y')}", styles["normal"]))
     elements.append(Spacer(1, 0.5*inch))
 
     # Tableau des services
     data = [["Service", "Quantité", "Prix unitaire HT", "Total HT"]]
-
-    for service_sel in projet.services:
-        data.append([
-            Paragraph(service_sel.service.nom, styles['Normal']),
+    data.extend(
+        [
+            _cellule_service(service_sel.service.nom, styles["normal"]),
             str(service_sel.quantite),
-            format_currency(service_sel.prix_unitaire),
-            format_currency(service_sel.prix_total)
-        ])
+            format_currency(en_euros(service_sel.prix_unitaire_centimes), include_cents=True),
+            format_currency(service_sel.prix_total, include_cents=True)
+        ]
+        for service_sel in projet.services
+    )
 
-    # Créer le tableau
-    table = Table(data, colWidths=[3.5*inch, 1*inch, 1.5*inch, 1.5*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-
-    elements.append(table)
+    elements.append(LongTable(data, colWidths=LARGEURS_COLONNES_DEVIS, style=styles["services"],
+                              repeatRows=1, splitByRow=1, splitInRow=1))
     elements.append(Spacer(1, 0.3*inch))
 
-    # Totaux
+    # Totaux au centime : Total TTC = Total HT + TVA, tels qu'affichés (voir monnaie.py)
     total_data = [
-        ["", "", "Total HT :", format_currency(projet.total_ht)],
-        ["", "", "TVA (8,5%) :", format_currency(projet.tva)],
-        ["", "", "Total TTC :", format_currency(projet.total_ttc)]
+        ["", "", "Total HT :", format_currency(projet.total_ht, include_cents=True)],
+        ["", "", "TVA (8,5%) :", format_currency(projet.tva, include_cents=True)],
+        ["", "", "Total TTC :", format_currency(projet.total_ttc, include_cents=True)]
     ]
 
-    if projet.maintenance_annuelle_ht > 0:
-        total_data.insert(1, ["", "", "Maintenance annuelle HT :", format_currency(projet.maintenance_annuelle_ht)])
-
-    total_table = Table(total_data, colWidths=[3.5*inch, 1*inch, 1.5*inch, 1.5*inch])
-    total_table.setStyle(TableStyle([
-        ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
-        ('FONTNAME', (2, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (2, -1), (-1, -1), 12),
-        ('LINEABOVE', (2, -1), (-1, -1), 2, colors.black),
-    ]))
+    maintenance_ht = projet.maintenance_annuelle_ht
+    if maintenance_ht > 0:
+        total_data.insert(1, ["", "", "Maintenance annuelle HT :", format_currency(maintenance_ht, include_cents=True)])
 
-    elements.append(total_table)
+    # Les totaux restent groupés sur une même page
+    elements.append(Table(total_data, colWidths=LARGEURS_COLONNES_DEVIS, style=styles["totaux"]))
 
     # Générer le PDF
-    doc.build(elements)
+    doc.build(elements, onFirstPage=_numeroter_page, onLaterPages=_numeroter_page)
 
     # Retourner le contenu du buffer
-    buffer.seek(0)
-    return buffer.read()
+    return buffer.getvalue()
 
 
 def calculer_seuil_rentabilite(ca: float, charges_fixes: float, charges_variables: float) -> tuple:
@@ -243,6 +381,7 @@ def calculer_seuil_rentabilite(ca: float, charges_fixes: float, charges_variable
     return seuil, marge_securite
 
 
+@chronometre("export.excel")
 def export_to_excel(df_resultats: pd.DataFrame, projet: Projet = None) -> bytes:
     """Exporte les résultats vers un fichier Excel"""
     output = io.BytesIO()
@@ -284,8 +423,11 @@ def export_to_excel(df_resultats: pd.DataFrame, projet: Projet = None) -> bytes:
     return output.read()
 
 
+@chronometre("template.chargement")
 def load_template_projet(template_key: str) -> Projet:
-    """Charge un template de projet depuis le catalogue"""
-    if template_key in st.session_state.templates_projets:
-        return st.session_state.templates_projets[template_key].dupliquer()
+    """Charge un template de projet depuis l'artefact précalculé (copie, sans recalcul des prix)"""
+    from templates_precalcules import templates
+    template = templates().get(template_key)
+    if template is not None:
+        return template.projet.dupliquer()
     return None
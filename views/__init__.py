@@ -3,6 +3,11 @@
 
 from .previsions import render_previsions_tab
 from .resultats import render_resultats_tab
+from .consolidation import render_consolidation_tab
 from .export import render_export_tab
+from .bibliotheque import render_bibliotheque_sidebar
+from .performance import render_perf_panel, render_memoire_panel
+from .taches import render_tache
 
-__all__ = ['render_previsions_tab', 'render_resultats_tab', 'render_export_tab']
+__all__ = ['render_previsions_tab', 'render_resultats_tab', 'render_consolidation_tab', 'render_export_tab',
+           'render_bibliotheque_sidebar', 'render_perf_panel', 'render_memoire_panel', 'render_tache']
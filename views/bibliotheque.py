@@ -0,0 +1,150 @@
+# views/bibliotheque.py
+"""Module pour la bibliothèque de projets sauvegardés (barre latérale)"""
+
+import streamlit as st
+from datetime import datetime
+
+from config import STOCKAGE_CONFIG, TYPES_CLIENTS
+from utils import format_currency, get_stockage
+from perf import chronometre
+from instantane import (
+    exporter_instantane, importer_instantane, etat_depuis_session, restaurer_session,
+    InstantaneInvalide
+)
+
+
+@chronometre("vue.bibliotheque")
+def render_bibliotheque_sidebar():
+    """Affiche la sauvegarde et la réouverture des projets, templates et prévisions"""
+    st.header("💾 Bibliothèque")
+    stockage = get_stockage()
+
+    # Sauvegarde du projet en cours
+    if st.button("💾 Sauvegarder le projet en cours", use_container_width=True):
+        if st.session_state.projet_courant.services:
+            stockage.sauvegarder_projet(st.session_state.projet_courant)
+            st.success(f"Projet '{st.session_state.projet_courant.nom}' sauvegardé !")
+        else:
+            st.error("Le projet en cours est vide.")
+
+    # Recherche dans les projets sauvegardés, une page à la fois
+    catalogue = st.session_state.catalogue_services
+    index = stockage.index({service_id: s.categorie for service_id, s in catalogue.items()})
+    st.caption(f"{len(index)} projets sauvegardés")
+
+    with st.expander("🔎 Rechercher", expanded=False):
+        prefixe = st.text_input("Nom du projet ou du client", key="bibliotheque_prefixe")
+        type_client = st.selectbox("Type de client", ["Tous"] + TYPES_CLIENTS, key="bibliotheque_type")
+        service_id = st.selectbox(
+            "Contient le service",
+            [None] + list(catalogue.keys()),
+            format_func=lambda i: "Tous" if i is None else catalogue[i].nom,
+            key="bibliotheque_service"
+        )
+        montant_service_min = st.number_input("Montant minimum de ce service (€)", min_value=0,
+                                              value=0, step=1000, key="bibliotheque_montant_service",
+                                              disabled=service_id is None)
+        total_min = st.number_input("Total HT minimum (€)", min_value=0, value=0, step=1000,
+                                    key="bibliotheque_total_min")
+        annee = st.number_input("Année de création (0 = toutes)", min_value=0, value=0,
+                                key="bibliotheque_annee")
+
+    criteres = dict(
+        prefixe=prefixe or None,
+        type_client=None if type_client == "Tous" else type_client,
+        service_id=service_id,
+        montant_service_min=montant_service_min or None,
+        total_min=total_min or None,
+        annee=annee or None
+    )
+    resultats = index.rechercher(**criteres, taille_page=STOCKAGE_CONFIG["taille_page"])
+    if resultats.nb_pages > 1:
+        page = st.number_input("Page", min_value=1, max_value=resultats.nb_pages, value=1,
+                               key="bibliotheque_page")
+        if page > 1:
+            resultats = index.rechercher(**criteres, page=page, taille_page=STOCKAGE_CONFIG["taille_page"])
+
+    if resultats.resultats:
+        st.caption(f"{resultats.total} résultats")
+        resume = st.selectbox(
+            "Projet",
+            options=resultats.resultats,
+            format_func=lambda r: f"{r.nom} – {r.client or 'sans client'} ({format_currency(r.total_ht)})",
+            key="bibliotheque_projet"
+        )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("📂 Ouvrir", use_container_width=True, key="bibliotheque_ouvrir"):
+                projet = stockage.charger_projet(resume.id, st.session_state.catalogue_services)
+                if projet is not None:
+                    st.session_state.projet_courant = projet
+                    st.rerun()
+        with col2:
+            if st.button("🗑️ Supprimer", use_container_width=True, key="bibliotheque_supprimer"):
+                stockage.supprimer_projet(resume.id)
+                st.rerun()
+
+    # Templates utilisateur
+    st.divider()
+    st.subheader("📋 Mes templates")
+    nom_template = st.text_input("Nom du template", key="bibliotheque_nom_template")
+    if st.button("Enregistrer comme template", use_container_width=True, disabled=not nom_template):
+        stockage.sauvegarder_template(nom_template, st.session_state.projet_courant.dupliquer())
+        st.success(f"Template '{nom_template}' enregistré !")
+
+    templates = stockage.charger_templates(st.session_state.catalogue_services)
+    if templates:
+        cle_template = st.selectbox("Template", list(templates.keys()), key="bibliotheque_template")
+        if st.button("📂 Charger le template", use_container_width=True):
+            st.session_state.projet_courant = templates[cle_template].dupliquer()
+            st.rerun()
+
+    # Prévisions
+    st.divider()
+    st.subheader("📈 Prévisions")
+    previsions = st.session_state.get('previsions_annuelles')
+    if previsions is not None and previsions.annees:
+        if st.button("💾 Sauvegarder les prévisions", use_container_width=True):
+            stockage.sauvegarder_previsions(previsions)
+            st.success("Prévisions sauvegardées !")
+
+    sauvegardes = stockage.lister_previsions()
+    if sauvegardes:
+        sauvegarde = st.selectbox(
+            "Prévisions sauvegardées",
+            options=sauvegardes,
+            format_func=lambda p: f"{p['nom_scenario']} – {p['nb_annees']} ans ({p['date_creation'][:16].replace('T', ' ')})",
+            key="bibliotheque_previsions"
+        )
+        if st.button("📂 Recharger les prévisions", use_container_width=True):
+            chargees = stockage.charger_previsions(sauvegarde["id"], st.session_state.catalogue_services)
+            if chargees is not None:
+                st.session_state.previsions_annuelles = chargees
+                st.session_state.setdefault('projets_annee_1', [])
+                st.rerun()
+
+    # Instantané complet de la session
+    st.divider()
+    st.subheader("📦 Session")
+    if st.button("Préparer l'instantané de session", use_container_width=True):
+        st.session_state.instantane_session = exporter_instantane(etat_depuis_session(st.session_state))
+    if st.session_state.get('instantane_session'):
+        st.download_button(
+            "💾 Télécharger l'instantané",
+            data=st.session_state.instantane_session,
+            file_name=f"Session_Caribo_{datetime.now().strftime('%Y%m%d_%H%M')}.caribo",
+            mime="application/octet-stream",
+            use_container_width=True
+        )
+
+    fichier = st.file_uploader("Restaurer un instantané", type=["caribo"], key="instantane_fichier")
+    if fichier is not None and st.session_state.get('instantane_restaure') != fichier.file_id:
+        try:
+            etat = importer_instantane(fichier.getvalue(), st.session_state.catalogue_services)
+        except InstantaneInvalide as e:
+            st.error(f"❌ {e}")
+        else:
+            restaurer_session(st.session_state, etat)
+            st.session_state.instantane_restaure = fichier.file_id
+            st.rerun()
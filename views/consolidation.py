@@ -0,0 +1,162 @@
+# views/consolidation.py
+"""Module pour l'onglet de consolidation des prévisions de plusieurs entités"""
+
+import streamlit as st
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from config import OBJECTIFS_REMUNERATION
+from consolidation import Entite, FluxIntraGroupe, consolider
+from utils import format_currency, creer_graphique_consolidation
+from perf import chronometre
+from affichage import afficher_tableau, COLONNES_ENTIERES
+
+COLONNES_FLUX = ["Émetteur", "Destinataire", "Année", "Montant HT"]
+ENTIERS_CONSOLIDATION = COLONNES_ENTIERES + ("Entités", "Associés", "Années")
+
+
+def _ajouter_entite(nom: str, pole: str, nb_associes: int):
+    previsions = st.session_state.get("previsions_annuelles")
+    if previsions is None or not previsions.annees:
+        st.error("Générez d'abord des prévisions dans l'onglet 'Prévisions annuelles'.")
+    elif not nom:
+        st.error("Donnez un nom à l'entité.")
+    elif any(e.nom == nom for e in st.session_state.entites_groupe):
+        st.error(f"L'entité '{nom}' existe déjà.")
+    else:
+        # Chaque génération crée de nouvelles Previsions : l'entité garde celles-ci telles quelles
+        st.session_state.entites_groupe.append(Entite(nom, previsions, int(nb_associes), pole))
+        st.success(f"Entité '{nom}' ajoutée au groupe.")
+
+
+def _lire_flux(df_flux: pd.DataFrame) -> list:
+    """Flux saisis dans l'éditeur ; les lignes incomplètes sont ignorées"""
+    complets = df_flux.dropna(subset=COLONNES_FLUX)
+    return [
+        FluxIntraGroupe(ligne["Émetteur"], ligne["Destinataire"], int(ligne["Année"]), float(ligne["Montant HT"]))
+        for ligne in complets.to_dict("records")
+    ]
+
+
+def _consolidation_session(flux: list):
+    """Consolidation recalculée seulement si une entité ou un flux a changé"""
+    cle = (
+        tuple((e.nom, id(e.previsions), e.previsions.version, e.nb_associes, e.pole)
+              for e in st.session_state.entites_groupe),
+        tuple((f.emetteur, f.destinataire, f.annee, f.montant_ht) for f in flux)
+    )
+    en_cache = st.session_state.get("consolidation")
+    if en_cache is None or en_cache[0] != cle:
+        en_cache = (cle, consolider(st.session_state.entites_groupe, flux))
+        st.session_state.consolidation = en_cache
+    return en_cache[1]
+
+
+@chronometre("vue.consolidation")
+def render_consolidation_tab():
+    """Affiche la consolidation des entités du groupe (SAS, agences)"""
+    st.header("🏢 Consolidation du groupe")
+    st.markdown("Ajoutez les prévisions de chaque entité, déclarez les refacturations internes : "
+                "le groupe est consolidé année par année.")
+
+    if 'entites_groupe' not in st.session_state:
+        st.session_state.entites_groupe = []
+        st.session_state.flux_groupe = pd.DataFrame({
+            "Émetteur": pd.Series(dtype="object"),
+            "Destinataire": pd.Series(dtype="object"),
+            "Année": pd.Series(dtype="Int64"),
+            "Montant HT": pd.Series(dtype="float64")
+        })
+
+    # Ajout d'une entité à partir des prévisions générées
+    st.subheader("➕ Ajouter une entité")
+    with st.form("ajout_entite", clear_on_submit=True):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            nom = st.text_input("Nom de l'entité")
+        with col2:
+            pole = st.text_input("Pôle", placeholder="SAS, Agences…")
+        with col3:
+            nb_associes = st.number_input("Associés", min_value=1, max_value=50,
+                                          value=OBJECTIFS_REMUNERATION["nb_associes"])
+        if st.form_submit_button("Ajouter les prévisions actuelles comme entité", use_container_width=True):
+            _ajouter_entite(nom.strip(), pole.strip(), nb_associes)
+
+    entites = st.session_state.entites_groupe
+    if not entites:
+        st.info("Aucune entité. Générez des prévisions puis ajoutez-les ici, une entité à la fois.")
+        return
+
+    # Entités du groupe
+    st.subheader(f"🏛️ Entités ({len(entites)})")
+    afficher_tableau(pd.DataFrame({
+        "Entité": [e.nom for e in entites],
+        "Pôle": [e.pole for e in entites],
+        "Associés": [e.nb_associes for e in entites],
+        "Années": [len(e.previsions.annees) for e in entites],
+        "CA année 1": [e.previsions.annees[0].ca_total for e in entites]
+    }), entiers=ENTIERS_CONSOLIDATION)
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        a_retirer = st.selectbox("Entité à retirer", [e.nom for e in entites], key="entite_a_retirer",
+                                 label_visibility="collapsed")
+    with col2:
+        if st.button("🗑️ Retirer", use_container_width=True):
+            st.session_state.entites_groupe = [e for e in entites if e.nom != a_retirer]
+            st.rerun()
+
+    # Refacturations internes, éliminées en consolidation
+    st.subheader("🔁 Flux intra-groupe")
+    noms = [e.nom for e in entites]
+    df_flux = st.data_editor(
+        st.session_state.flux_groupe,
+        key="editeur_flux",
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "Émetteur": st.column_config.SelectboxColumn("Émetteur", options=noms, help="Entité qui facture"),
+            "Destinataire": st.column_config.SelectboxColumn("Destinataire", options=noms,
+                                                             help="Entité qui achète"),
+            "Année": st.column_config.NumberColumn("Année", min_value=1, step=1, format="%d"),
+            "Montant HT": st.column_config.NumberColumn("Montant HT", min_value=0, format="%,.0f €")
+        }
+    )
+
+    try:
+        consolidation = _consolidation_session(_lire_flux(df_flux))
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    # Indicateurs du groupe, première année
+    consolide = consolidation.consolide()
+    annee_1 = consolide.iloc[0]
+    st.divider()
+    st.subheader(f"📊 Groupe consolidé – année {int(annee_1['Année'])}")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("CA consolidé", format_currency(annee_1["CA consolidé"]))
+    with col2:
+        st.metric("Éliminations", format_currency(annee_1["Éliminations"]),
+                  help="Refacturations internes retirées du CA et des charges")
+    with col3:
+        st.metric("Résultat net", format_currency(annee_1["Résultat net"]))
+    with col4:
+        st.metric("Dividendes nets", format_currency(annee_1["Dividendes nets"]),
+                  help="Somme des dividendes nets possibles de chaque entité")
+
+    fig = creer_graphique_consolidation(consolidation)
+    st.pyplot(fig)
+    plt.close(fig)
+
+    st.write("**Comptes consolidés par année :**")
+    afficher_tableau(consolide, entiers=ENTIERS_CONSOLIDATION,
+                     aides={"CA cumulé": "Somme des CA des entités, avant éliminations"})
+
+    if len(set(e.pole for e in entites)) > 1:
+        st.write("**Par pôle :**")
+        afficher_tableau(consolidation.par_pole(), entiers=ENTIERS_CONSOLIDATION)
+
+    with st.expander("Détail par entité", expanded=False):
+        afficher_tableau(consolidation.par_entite(), entiers=ENTIERS_CONSOLIDATION)
@@ -2,12 +2,26 @@
 """Module pour l'onglet d'export des documents"""
 
 import streamlit as st
-from datetime import datetime
+from datetime import datetime, date
 
 from utils import generer_pdf_devis, export_to_excel, format_currency
-from config import TAUX_TVA
+from config import TAUX_TVA, ECHEANCIERS_PAIEMENT
+from artefacts import generer_artefact, cle_artefact
+from perf import chronometre
+from views.taches import render_tache
 
 
+def _document_a_jour(cle_session: str, cle: str, message: str) -> bool:
+    """Vrai si la tâche en session a produit le document du contenu et des options affichés"""
+    if cle_session not in st.session_state:
+        return False
+    if st.session_state.get(f"cle_{cle_session}") != cle:
+        st.info(message)
+        return False
+    return True
+
+
+@chronometre("vue.export")
 def render_export_tab():
     """Affiche l'onglet d'export des documents"""
     st.header("📄 Export des documents")
@@ -53,12 +67,15 @@ def render_export_tab():
             )
 
         with col2:
+            options_paiement = list(ECHEANCIERS_PAIEMENT.keys())
+            conditions_actuelles = st.session_state.projet_courant.conditions_paiement
             conditions_paiement = st.selectbox(
                 "Conditions de paiement",
-                ["30 jours net", "50% à la commande, 50% à la livraison",
-                 "30% - 40% - 30%", "Comptant à réception"],
-                help="Modalités de paiement"
+                options_paiement,
+                index=options_paiement.index(conditions_actuelles) if conditions_actuelles in options_paiement else 0,
+                help="Modalités de paiement (utilisées pour la trésorerie mensuelle)"
             )
+            st.session_state.projet_courant.conditions_paiement = conditions_paiement
 
             inclure_details = st.checkbox(
                 "Inclure le détail des livrables",
@@ -66,24 +83,30 @@ def render_export_tab():
                 help="Ajoute la description détaillée de chaque service"
             )
 
-        # Bouton de génération
+        # Génération en arrière-plan, sauf si un devis identique est déjà en cache ;
+        # le devis est daté : la date du jour fait partie de la clé
+        options_devis = {"date": date.today().isoformat()}
+        cle_devis = cle_artefact("devis_pdf", generer_pdf_devis, (st.session_state.projet_courant,), options_devis)
         if st.button("📄 Générer le devis PDF", type="primary"):
-            try:
-                # Générer le PDF (fonction à adapter avec les nouvelles options)
-                pdf_bytes = generer_pdf_devis(st.session_state.projet_courant)
+            tache = generer_artefact("devis_pdf", generer_pdf_devis, st.session_state.projet_courant,
+                                     options=options_devis)
+            st.session_state.tache_devis_pdf = tache.id
+            st.session_state.cle_tache_devis_pdf = cle_devis
 
-                # Bouton de téléchargement
-                st.download_button(
-                    label="💾 Télécharger le devis PDF",
-                    data=pdf_bytes,
-                    file_name=f"Devis_{st.session_state.projet_courant.nom.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.pdf",
-                    mime="application/pdf"
-                )
+        nom_projet = st.session_state.projet_courant.nom
 
-                st.success("✅ Devis généré avec succès !")
+        def afficher_devis(pdf_bytes: bytes):
+            st.download_button(
+                label="💾 Télécharger le devis PDF",
+                data=pdf_bytes,
+                file_name=f"Devis_{nom_projet.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.pdf",
+                mime="application/pdf"
+            )
+            st.success("✅ Devis généré avec succès !")
 
-            except Exception as e:
-                st.error(f"❌ Erreur lors de la génération du PDF : {str(e)}")
+        if _document_a_jour("tache_devis_pdf", cle_devis,
+                            "Le projet a changé depuis le dernier devis : régénérez-le."):
+            render_tache("tache_devis_pdf", "Génération du devis PDF", afficher_devis)
 
     else:
         st.info("Aucun projet en cours. Créez un projet dans l'onglet 'Calculateur de projet'.")
@@ -96,7 +119,7 @@ def render_export_tab():
         st.session_state.previsions_annuelles.annees):
 
         # Aperçu des prévisions
-        df_resultats = st.session_state.previsions_annuelles.get_dataframe_resultats()
+        df_resultats = st.session_state.previsions_annuelles.get_dataframe_resultats_partage()
 
         col1, col2, col3 = st.columns(3)
 
@@ -128,27 +151,26 @@ def render_export_tab():
             help="Ajoute une feuille avec le détail de chaque projet"
         )
 
-        # Bouton d'export Excel
+        # Bouton d'export Excel (généré en arrière-plan, ou relu du cache)
+        arguments_excel = (df_resultats, st.session_state.projet_courant if inclure_details_projets else None)
+        cle_excel = cle_artefact("export_excel", export_to_excel, arguments_excel)
         if st.button("📊 Générer le fichier Excel", type="secondary"):
-            try:
-                # Générer le fichier Excel
-                excel_bytes = export_to_excel(
-                    df_resultats,
-                    st.session_state.projet_courant if inclure_details_projets else None
-                )
-
-                # Bouton de téléchargement
-                st.download_button(
-                    label="💾 Télécharger le fichier Excel",
-                    data=excel_bytes,
-                    file_name=f"Previsions_Datamap_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-
-                st.success("✅ Fichier Excel généré avec succès !")
-
-            except Exception as e:
-                st.error(f"❌ Erreur lors de la génération du fichier Excel : {str(e)}")
+            tache = generer_artefact("export_excel", export_to_excel, *arguments_excel)
+            st.session_state.tache_export_excel = tache.id
+            st.session_state.cle_tache_export_excel = cle_excel
+
+        def afficher_excel(excel_bytes: bytes):
+            st.download_button(
+                label="💾 Télécharger le fichier Excel",
+                data=excel_bytes,
+                file_name=f"Previsions_Datamap_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+            st.success("✅ Fichier Excel généré avec succès !")
+
+        if _document_a_jour("tache_export_excel", cle_excel,
+                            "Les prévisions ou les options ont changé depuis le dernier export : régénérez-le."):
+            render_tache("tache_export_excel", "Génération du fichier Excel", afficher_excel)
 
     else:
         st.info("Aucune prévision disponible. Générez des prévisions dans l'onglet 'Prévisions annuelles'.")
@@ -0,0 +1,98 @@
+# views/performance.py
+"""Module pour les panneaux de diagnostic : temps d'exécution, mémoire et catalogue (barre latérale)"""
+
+import streamlit as st
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from config import PERF_CONFIG, MEMOIRE_CONFIG
+from memoire import registre, memoire_processus, evincer, CLES_DERIVEES
+from data import source_catalogue
+
+
+def _mo(octets: float) -> str:
+    return f"{octets / (1024 * 1024):,.1f} Mo"
+
+
+def render_perf_panel():
+    """Affiche le détail de la dernière exécution et l'historique de la session"""
+    historique = st.session_state.get('perf_historique')
+    with st.expander("⏱ Perf", expanded=False):
+        if not historique:
+            st.caption("Aucune exécution mesurée.")
+            return
+
+        dernier = historique[-1]
+        precedents = [r.duree_ms for r in historique if not r.interrompu][:-1]
+        delta = f"{dernier.duree_ms - precedents[-1]:+.0f} ms" if precedents else None
+        st.metric("Dernière exécution", f"{dernier.duree_ms:.0f} ms", delta=delta, delta_color="inverse")
+
+        if dernier.spans:
+            st.dataframe(pd.DataFrame([{
+                "Bloc": "· " * s.profondeur + s.nom,
+                "Début (ms)": round(s.debut_ms, 1),
+                "Durée (ms)": round(s.duree_ms, 1)
+            } for s in dernier.spans]), hide_index=True, use_container_width=True)
+
+        st.caption("Historique de la session")
+        st.dataframe(pd.DataFrame([{
+            "Heure": r.horodatage.strftime("%H:%M:%S"),
+            "Durée (ms)": round(r.duree_ms, 1),
+            "Blocs": len(r.spans),
+            "Interrompue": r.interrompu
+        } for r in reversed(historique)]), hide_index=True, use_container_width=True)
+
+        st.caption(f"Journal : `{PERF_CONFIG['chemin_jsonl']}` – métriques : `{PERF_CONFIG['chemin_prometheus']}`")
+
+
+def render_memoire_panel():
+    """Affiche la mémoire du processus et des sessions suivies (vue d'administration)"""
+    with st.expander("🧠 Mémoire", expanded=False):
+        totaux = registre().totaux()
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Processus (RSS)", _mo(memoire_processus()))
+            st.metric("Sessions suivies", totaux["nb_sessions"])
+        with col2:
+            st.metric("Total sessions", _mo(totaux["octets_total"]),
+                      help=f"dont {_mo(totaux['octets_derives'])} de données recalculables")
+            st.metric("Figures ouvertes", len(plt.get_fignums()))
+        st.caption(f"Budget par session : {_mo(MEMOIRE_CONFIG['budget_session_octets'])} – "
+                   f"inactivité : {MEMOIRE_CONFIG['delai_inactivite_s'] // 60} min – "
+                   f"{totaux['nb_evictions']} clés évincées")
+
+        if totaux["sessions"]:
+            st.dataframe(pd.DataFrame([{
+                "Session": s["session"],
+                "Mémoire (Mo)": round(s["octets"] / (1024 * 1024), 2),
+                "Recalculable (Mo)": round(s["octets_derives"] / (1024 * 1024), 2),
+                "Inactive depuis (s)": int(s["inactivite_s"]),
+                "Clé principale": s["cle_principale"]
+            } for s in totaux["sessions"]]), hide_index=True, use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Évincer les inactives", use_container_width=True):
+                st.success(f"{registre().evincer_inactives()} session(s) allégée(s)")
+        with col2:
+            if st.button("Alléger ma session", use_container_width=True):
+                evincees = evincer(st.session_state)
+                st.success(", ".join(evincees) if evincees else "Rien à évincer")
+        st.caption("Clés recalculables : " + ", ".join(f"`{c}`" for c in CLES_DERIVEES))
+
+
+
+def render_catalogue_panel():
+    """Affiche le catalogue en vigueur et l'erreur du dernier rechargement (vue d'administration)"""
+    source = source_catalogue()
+    catalogue = source.courant()
+    with st.expander("📚 Catalogue", expanded=source.erreur is not None):
+        if source.erreur:
+            st.error(f"Fichier modifié mais invalide, l'ancien catalogue reste en vigueur : {source.erreur}")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Services", len(catalogue.services))
+        with col2:
+            st.metric("Chargement", f"{catalogue.duree_chargement_ms:.1f} ms")
+        st.caption(f"Fichier : `{source.chemin}` – version {catalogue.libelle or '?'} "
+                   f"(`{catalogue.version[:12]}`)")
@@ -0,0 +1,84 @@
+# views/pipeline.py
+"""Section d'import du pipeline commercial (export CRM) de l'onglet Prévisions"""
+
+import hashlib
+
+import streamlit as st
+
+from config import PIPELINE_CRM
+from pipeline import PipelineCRM, importer_crm
+from utils import format_currency
+from perf import chronometre
+from affichage import afficher_tableau, COLONNES_ENTIERES
+
+ENTIERS_PIPELINE = COLONNES_ENTIERES + ("Opportunités",)
+
+
+def _pipeline_session(contenu: bytes, nom_fichier: str) -> PipelineCRM:
+    """Import refait seulement si le fichier ou le catalogue a changé"""
+    cle = (hashlib.sha256(contenu).hexdigest(), st.session_state.get("version_catalogue"))
+    en_cache = st.session_state.get("pipeline_crm")
+    if en_cache is None or en_cache[0] != cle:
+        with st.spinner("Import des opportunités…"):
+            en_cache = (cle, importer_crm(contenu, nom_fichier, st.session_state.catalogue_services))
+        st.session_state.pipeline_crm = en_cache
+    return en_cache[1]
+
+
+@chronometre("vue.pipeline")
+def render_pipeline_section():
+    """Importe un export CRM et propose son CA pondéré comme projets de l'année 1"""
+    st.subheader("📥 Pipeline commercial (export CRM)")
+    colonnes = ", ".join(acceptes[0] for acceptes in PIPELINE_CRM["colonnes"].values())
+    st.caption(f"CSV ou Excel, une opportunité par ligne. Colonnes reconnues : {colonnes}. "
+               f"Plusieurs services par opportunité, séparés par « | » ou « ; ».")
+
+    fichier = st.file_uploader("Export CRM", type=["csv", "txt", "xlsx"], key="fichier_crm")
+    if fichier is None:
+        return
+
+    try:
+        pipeline = _pipeline_session(fichier.getvalue(), fichier.name)
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    rapport = pipeline.rapport
+    attendu = pipeline.attendu_par_annee()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Opportunités importées", f"{rapport.nb_importees:,}".replace(",", " "),
+                  help=f"Import en {rapport.duree_s:.1f} s")
+    with col2:
+        st.metric("Lignes rejetées", f"{rapport.nb_rejetees:,}".replace(",", " "))
+    with col3:
+        st.metric("Pipeline total", format_currency(attendu["CA non pondéré"].sum()))
+    with col4:
+        st.metric("Pipeline pondéré", format_currency(attendu["CA Projets"].sum()),
+                  help="Montants × probabilité de gain")
+
+    if rapport.rejets:
+        st.warning("Lignes ignorées : " + " ; ".join(f"{motif} ({nombre})" for motif, nombre in rapport.rejets.items()))
+    if rapport.services_inconnus:
+        inconnus = ", ".join(f"{nom} ({nombre})" for nom, nombre in rapport.services_inconnus.most_common(5))
+        st.info(f"Services hors catalogue, ignorés dans les opportunités concernées : {inconnus}")
+    if len(pipeline) == 0:
+        return
+
+    st.write("**CA attendu par année de signature :**")
+    afficher_tableau(attendu, entiers=ENTIERS_PIPELINE,
+                     aides={"CA Projets": "Somme des montants pondérés par la probabilité de gain",
+                            "CA Maintenance": "Maintenance pondérée des opportunités signées, reconduite chaque année"})
+    with st.expander("Par étape du pipeline"):
+        afficher_tableau(pipeline.par_etape(), pourcentages=("Probabilité moyenne",), entiers=ENTIERS_PIPELINE)
+
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        annee = st.selectbox("Année du pipeline", attendu["Année"].tolist(), key="annee_pipeline")
+    with col2:
+        st.write("")
+        if st.button(f"➕ Ajouter le pipeline pondéré {annee} aux projets de l'année 1", use_container_width=True):
+            projets = pipeline.vers_projets(annee)
+            st.session_state.projets_annee_1.extend(projets)
+            st.success(f"{len(projets)} projets ajoutés (un par type de client).")
+            st.rerun()
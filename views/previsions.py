@@ -6,11 +6,18 @@ import pandas as pd
 from datetime import datetime
 from typing import List
 
-from config import SCENARIOS_CROISSANCE, CHARGES_FIXES_DEFAUT, OBJECTIFS_REMUNERATION, SIMULATION_PARAMS
+from config import (
+    SCENARIOS_CROISSANCE, CHARGES_FIXES_DEFAUT, OBJECTIFS_REMUNERATION, SIMULATION_PARAMS,
+    TAUX_IS, TAUX_FLAT_TAX
+)
 from models import Projet, PrevisionAnnuelle, Previsions
+from monnaie import en_euros
 from utils import format_currency, format_percentage
+from perf import chronometre
+from views.pipeline import render_pipeline_section
 
 
+@chronometre("vue.previsions")
 def render_previsions_tab():
     """Affiche l'onglet des prévisions annuelles adapté à votre SAS"""
     st.header("📈 Prévisions annuelles - SAS Caribo")
@@ -34,7 +41,7 @@ def render_previsions_tab():
     with col4:
         st.metric("Bénéfice avant IS requis", format_currency(OBJECTIFS_REMUNERATION["benefice_avant_is_necessaire"]))
 
-    st.info("💡 **Calcul SAS** : Flat tax 30% (17,2% prélèvements sociaux + 12,8% IR) + IS 25%")
+    st.info(f"💡 **Calcul SAS** : Flat tax {TAUX_FLAT_TAX:.0%} (17,2% prélèvements sociaux + 12,8% IR) + IS {TAUX_IS:.0%}")
 
     st.divider()
 
@@ -115,6 +122,7 @@ def render_previsions_tab():
     if st.session_state.projets_annee_1:
         st.write(f"**{len(st.session_state.projets_annee_1)} projets ajoutés**")
 
+        # Sommes en centimes, converties en euros pour l'affichage
         total_ca_projets = 0
         total_maintenance = 0
 
@@ -138,7 +146,6 @@ def render_previsions_tab():
                         "Nb projets similaires/an",
                         min_value=1,
                         max_value=5,
-                        value=1,
                         key=f"mult_projet_{idx}",
                         help="Combien de projets similaires dans l'année"
                     )
@@ -147,19 +154,19 @@ def render_previsions_tab():
                         st.session_state.projets_annee_1.pop(idx)
                         st.rerun()
 
-                total_ca_projets += projet.total_ht * multiplicateur
-                total_maintenance += projet.maintenance_annuelle_ht * multiplicateur
+                total_ca_projets += projet.total_ht_centimes * multiplicateur
+                total_maintenance += projet.maintenance_annuelle_centimes * multiplicateur
 
         # Résumé financier
         st.divider()
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
-            st.metric("CA Projets", format_currency(total_ca_projets))
+            st.metric("CA Projets", format_currency(en_euros(total_ca_projets)))
         with col2:
-            st.metric("Maintenance", format_currency(total_maintenance))
+            st.metric("Maintenance", format_currency(en_euros(total_maintenance)))
         with col3:
-            ca_total = total_ca_projets + total_maintenance
+            ca_total = en_euros(total_ca_projets + total_maintenance)
             st.metric("CA Total", format_currency(ca_total))
         with col4:
             if ca_total >= OBJECTIFS_REMUNERATION["benefice_avant_is_necessaire"]:
@@ -170,6 +177,10 @@ def render_previsions_tab():
     else:
         st.info("Aucun projet ajouté. Utilisez les scénarios ou ajoutez vos projets manuellement.")
 
+    # Section pipeline CRM : opportunités pondérées par leur probabilité de gain
+    st.divider()
+    render_pipeline_section()
+
     # Section charges et paramètres
     st.divider()
     st.subheader("💰 Charges fixes et paramètres")
@@ -183,7 +194,7 @@ def render_previsions_tab():
             nouvelle_valeur = st.number_input(
                 nom.replace("_", " ").title(),
                 min_value=0,
-                value=valeur,
+                value=int(st.session_state.charges_fixes.get(nom, valeur)),
                 step=100,
                 key=f"charge_{nom}"
             )
@@ -229,8 +240,8 @@ def render_previsions_tab():
     with col2:
         # Simulation express
         if st.session_state.projets_annee_1:
-            ca_annee_1 = sum(p.total_ht * st.session_state.get(f"mult_projet_{i}", 1)
-                           for i, p in enumerate(st.session_state.projets_annee_1))
+            ca_annee_1 = en_euros(sum(p.total_ht_centimes * st.session_state.get(f"mult_projet_{i}", 1)
+                                      for i, p in enumerate(st.session_state.projets_annee_1)))
             benefice_estime = ca_annee_1 - total_charges
 
             st.write("**Simulation express :**")
@@ -2,17 +2,24 @@
 """Module pour l'onglet de résultats et analyses - Version SAS adaptée"""
 
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
 
-from config import OBJECTIFS_REMUNERATION, GRAPH_CONFIG
+from config import OBJECTIFS_REMUNERATION, GRAPH_CONFIG, TRESORERIE_PARAMS, SIMULATION_STOCHASTIQUE
+from tresorerie import construire_calendrier, calculer_tresorerie
+from simulation import ResultatSimulation, parametres_depuis_previsions, simuler_en_parallele
+from taches import gestionnaire
 from utils import (
     format_currency, format_percentage,
-    creer_graphique_ca_evolution, creer_graphique_repartition,
+    creer_graphique_ca_evolution, creer_graphique_repartition, creer_graphique_bandes,
     calculer_seuil_rentabilite
 )
+from perf import chronometre, mesurer
+from affichage import afficher_tableau
+from remuneration import calculer_remuneration
+from views.taches import render_tache
 
 
+@chronometre("vue.resultats")
 def render_resultats_tab():
     """Affiche l'onglet des résultats et analyses adapté SAS"""
     st.header("📊 Résultats & Analyses - SAS Caribo")
@@ -24,7 +31,12 @@ def render_resultats_tab():
         return
 
     # Récupérer les données
-    df_resultats = st.session_state.previsions_annuelles.get_dataframe_resultats()
+    df_resultats = st.session_state.previsions_annuelles.get_dataframe_resultats_partage()
+
+    # Rémunération réalisable par année (IS, flat tax, dividendes par associé)
+    annees = df_resultats["Année"].to_numpy()
+    remuneration = calculer_remuneration(df_resultats["Résultat brut"].to_numpy())
+    nb_associes = OBJECTIFS_REMUNERATION["nb_associes"]
 
     # === SECTION SAS : ANALYSE DE LA RÉMUNÉRATION ===
     st.subheader("💰 Analyse de la rémunération SAS")
@@ -34,57 +46,23 @@ def render_resultats_tab():
     with col1:
         st.write("**Objectifs de rémunération :**")
         st.write(f"• Dividendes nets par associé : {format_currency(OBJECTIFS_REMUNERATION['dividendes_nets_par_associe'])}")
-        st.write(f"• Total dividendes nets (2 associés) : {format_currency(OBJECTIFS_REMUNERATION['total_dividendes_nets'])}")
+        st.write(f"• Total dividendes nets ({nb_associes} associés) : {format_currency(OBJECTIFS_REMUNERATION['total_dividendes_nets'])}")
         st.write(f"• Dividendes bruts nécessaires : {format_currency(OBJECTIFS_REMUNERATION['dividendes_bruts_necessaires'])}")
         st.write(f"• Bénéfice avant IS requis : {format_currency(OBJECTIFS_REMUNERATION['benefice_avant_is_necessaire'])}")
 
     with col2:
         # Vérification objectifs par année
         st.write("**Atteinte des objectifs par année :**")
-        for _, row in df_resultats.iterrows():
-            annee = int(row["Année"])
-            benefice_brut = row["Résultat brut"]
-
-            if benefice_brut >= OBJECTIFS_REMUNERATION["benefice_avant_is_necessaire"]:
+        for annee, benefice_brut, ecart in zip(annees.tolist(), remuneration.benefice_brut.tolist(),
+                                               remuneration.ecart_objectif.tolist()):
+            if ecart >= 0:
                 st.success(f"Année {annee} : ✅ Objectif atteint ({format_currency(benefice_brut)})")
             else:
-                manque = OBJECTIFS_REMUNERATION["benefice_avant_is_necessaire"] - benefice_brut
-                st.warning(f"Année {annee} : ⚠️ Manque {format_currency(manque)}")
+                st.warning(f"Année {annee} : ⚠️ Manque {format_currency(-ecart)}")
 
     # Calcul détaillé de la rémunération possible
     st.write("**Rémunération réalisable par année :**")
-
-    remuneration_data = []
-    for _, row in df_resultats.iterrows():
-        annee = int(row["Année"])
-        benefice_brut = row["Résultat brut"]
-
-        # Calcul IS (25%)
-        is_du = max(0, benefice_brut * 0.25)
-        benefice_apres_is = benefice_brut - is_du
-
-        # Calcul dividendes possibles (flat tax 30%)
-        dividendes_nets_possible = benefice_apres_is * 0.70  # 70% après flat tax
-        dividendes_nets_par_associe = dividendes_nets_possible / 2
-
-        remuneration_data.append({
-            "Année": annee,
-            "Bénéfice brut": benefice_brut,
-            "IS (25%)": is_du,
-            "Bénéfice après IS": benefice_apres_is,
-            "Dividendes nets possibles": dividendes_nets_possible,
-            "Net par associé": dividendes_nets_par_associe
-        })
-
-    df_remuneration = pd.DataFrame(remuneration_data)
-
-    # Formater pour affichage
-    df_remuneration_display = df_remuneration.copy()
-    for col in df_remuneration_display.columns:
-        if col != "Année":
-            df_remuneration_display[col] = df_remuneration_display[col].apply(lambda x: format_currency(x))
-
-    st.dataframe(df_remuneration_display, use_container_width=True, hide_index=True)
+    afficher_tableau(remuneration.vers_dataframe(annees))
 
     st.divider()
 
@@ -104,25 +82,20 @@ def render_resultats_tab():
         )
 
     with col2:
-        benefice_annee_1 = remuneration_data[0]["Bénéfice brut"]
-        objectif_atteint = benefice_annee_1 >= OBJECTIFS_REMUNERATION["benefice_avant_is_necessaire"]
-        delta_objectif = benefice_annee_1 - OBJECTIFS_REMUNERATION["benefice_avant_is_necessaire"]
-
         st.metric(
             "Bénéfice Année 1",
-            format_currency(benefice_annee_1),
-            delta=format_currency(delta_objectif),
-            delta_color="normal" if objectif_atteint else "inverse",
+            format_currency(remuneration.benefice_brut[0]),
+            delta=format_currency(remuneration.ecart_objectif[0]),
+            delta_color="normal" if remuneration.objectif_atteint[0] else "inverse",
             help="Bénéfice brut avant IS"
         )
 
     with col3:
-        net_par_associe_annee_1 = remuneration_data[0]["Net par associé"]
-        delta_net = net_par_associe_annee_1 - OBJECTIFS_REMUNERATION["dividendes_nets_par_associe"]
+        delta_net = remuneration.ecart_objectif_net[0]
 
         st.metric(
             "Net par associé An1",
-            format_currency(net_par_associe_annee_1),
+            format_currency(remuneration.net_par_associe[0]),
             delta=format_currency(delta_net),
             delta_color="normal" if delta_net >= 0 else "inverse",
             help="Dividendes nets possibles par associé"
@@ -143,28 +116,11 @@ def render_resultats_tab():
     st.divider()
     st.subheader("📋 Tableau détaillé des prévisions")
 
-    # Formater le DataFrame pour l'affichage
-    df_affichage = df_resultats.copy()
-
-    # Colonnes monétaires
-    colonnes_monetaires = ["CA Projets", "CA Maintenance", "CA Total", "Charges fixes",
-                          "Résultat brut", "Impôt", "Résultat net"]
-    for col in colonnes_monetaires:
-        df_affichage[col] = df_affichage[col].apply(lambda x: format_currency(x))
-
-    # Taux de marge
-    df_affichage["Taux de marge"] = df_affichage["Taux de marge"].apply(lambda x: format_percentage(x))
-
-    # Afficher avec style
-    st.dataframe(
-        df_affichage,
-        use_container_width=True,
-        hide_index=True,
-        column_config={
-            "Année": st.column_config.NumberColumn("Année", format="%d"),
-            "CA Total": st.column_config.TextColumn("CA Total", help="Chiffre d'affaires total"),
-            "Taux de marge": st.column_config.TextColumn("Marge nette", help="Résultat net / CA")
-        }
+    # Colonnes numériques, formats € et % déclarés pour le navigateur
+    afficher_tableau(
+        df_resultats,
+        libelles={"Taux de marge": "Marge nette"},
+        aides={"CA Total": "Chiffre d'affaires total", "Taux de marge": "Résultat net / CA"}
     )
 
     # === GRAPHIQUES ===
@@ -179,7 +135,9 @@ def render_resultats_tab():
 
     if type_graphique == "Évolution CA et Bénéfice":
         fig = creer_graphique_ca_evolution(df_resultats)
-        st.pyplot(fig)
+        with mesurer("graphique.affichage"):
+            st.pyplot(fig)
+        plt.close(fig)
 
         # Commentaire automatique
         if df_resultats["Résultat net"].iloc[-1] > df_resultats["Résultat net"].iloc[0]:
@@ -191,25 +149,17 @@ def render_resultats_tab():
         # Graphique spécifique à la rémunération SAS
         fig, ax = plt.subplots(figsize=GRAPH_CONFIG['figsize'])
 
-        annees = [r["Année"] for r in remuneration_data]
-        benefices_bruts = [r["Bénéfice brut"] for r in remuneration_data]
-        nets_par_associe = [r["Net par associé"] for r in remuneration_data]
-
-        # Ligne objectif
-        objectif_line = [OBJECTIFS_REMUNERATION["benefice_avant_is_necessaire"]] * len(annees)
-        objectif_net_line = [OBJECTIFS_REMUNERATION["dividendes_nets_par_associe"]] * len(annees)
-
-        ax.plot(annees, benefices_bruts, marker='o', linewidth=2,
+        ax.plot(annees, remuneration.benefice_brut, marker='o', linewidth=2,
                 label="Bénéfice brut", color=GRAPH_CONFIG['colors'][0])
-        ax.plot(annees, objectif_line, '--',
+        ax.axhline(OBJECTIFS_REMUNERATION["benefice_avant_is_necessaire"], linestyle='--',
                 label=f"Objectif bénéfice ({format_currency(OBJECTIFS_REMUNERATION['benefice_avant_is_necessaire'])})",
                 color=GRAPH_CONFIG['colors'][3])
 
         # Axe secondaire pour net par associé
         ax2 = ax.twinx()
-        ax2.plot(annees, nets_par_associe, marker='s', linewidth=2,
+        ax2.plot(annees, remuneration.net_par_associe, marker='s', linewidth=2,
                  label="Net par associé", color=GRAPH_CONFIG['colors'][1])
-        ax2.plot(annees, objectif_net_line, '--',
+        ax2.axhline(OBJECTIFS_REMUNERATION["dividendes_nets_par_associe"], linestyle='--',
                  label=f"Objectif net ({format_currency(OBJECTIFS_REMUNERATION['dividendes_nets_par_associe'])})",
                  color=GRAPH_CONFIG['colors'][4])
 
@@ -230,7 +180,9 @@ def render_resultats_tab():
         ax2.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f"{x/1000:.0f}k€"))
 
         plt.tight_layout()
-        st.pyplot(fig)
+        with mesurer("graphique.affichage"):
+            st.pyplot(fig)
+        plt.close(fig)
 
     elif type_graphique == "Capacité vs Objectifs":
         # Analyse de la capacité de l'entreprise
@@ -260,3 +212,141 @@ def render_resultats_tab():
         ca_min_objectif = [OBJECTIFS_REMUNERATION["benefice_avant_is_necessaire"] + 15000] * len(annees)  # +15k charges
         ax.axhline(y=ca_min_objectif[0], color=GRAPH_CONFIG['colors'][3],
                    linestyle='--', label=f'CA minimum pour objectif')
+
+    # === SIMULATION STOCHASTIQUE ===
+    st.divider()
+    render_simulation_section(df_resultats)
+
+    # === TRÉSORERIE MENSUELLE ===
+    st.divider()
+    render_tresorerie_section()
+
+
+def _afficher_simulation(simulation: ResultatSimulation, df_resultats):
+    fig = creer_graphique_bandes(simulation, df_resultats)
+    with mesurer("graphique.affichage"):
+        st.pyplot(fig)
+    plt.close(fig)
+    st.caption(f"{simulation.nb_chemins:,} chemins simulés en {simulation.duree_s:.1f} s".replace(",", " "))
+
+
+@chronometre("vue.simulation")
+def render_simulation_section(df_resultats):
+    """Bandes de percentiles des prévisions, issues des esquisses de quantiles de la simulation"""
+    st.subheader("🎲 Simulation stochastique")
+    st.markdown("Croissance et volume d'affaires tirés au hasard autour des prévisions : "
+                "les bandes montrent la dispersion possible du CA et du résultat net.")
+
+    previsions = st.session_state.previsions_annuelles
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        nb_chemins = st.selectbox("Chemins simulés", SIMULATION_STOCHASTIQUE["nb_chemins"], index=1,
+                                  format_func=lambda n: f"{n:,}".replace(",", " "), key="simulation_nb_chemins")
+    with col2:
+        volatilite = st.slider("Volatilité annuelle du CA (%)", 0, 50,
+                               round(SIMULATION_STOCHASTIQUE["volatilite_ca"] * 100), key="simulation_volatilite")
+    with col3:
+        ecart_type = st.slider("Dispersion de la croissance (%)", 0, 20,
+                               round(SIMULATION_STOCHASTIQUE["ecart_type_croissance"] * 100),
+                               key="simulation_ecart_type")
+
+    # Empreinte du contenu : chaque génération crée de nouvelles Previsions, leur version repart de zéro
+    parametres = parametres_depuis_previsions(previsions, OBJECTIFS_REMUNERATION["nb_associes"],
+                                              volatilite / 100, ecart_type / 100)
+    if st.button("🎲 Lancer la simulation", use_container_width=True):
+        st.session_state.tache_simulation = gestionnaire().soumettre(
+            "simulation", simuler_en_parallele, parametres, nb_chemins).id
+        st.session_state.simulation_parametres = parametres
+
+    if ("tache_simulation" in st.session_state
+            and st.session_state.get("simulation_parametres") != parametres):
+        st.warning("Les prévisions ou les réglages ont changé depuis la simulation : "
+                   "relancez-la pour mettre les bandes à jour.")
+
+    def afficher_resultat(simulation: ResultatSimulation):
+        _afficher_simulation(simulation, df_resultats)
+        with st.expander("Percentiles par métrique et par année"):
+            tableau = simulation.tableau()
+            afficher_tableau(tableau[tableau["Métrique"] != "Taux de marge"])
+            st.write("**Marge nette :**")
+            marge = simulation.bandes("Taux de marge")
+            afficher_tableau(marge, pourcentages=marge.columns[1:])
+
+    render_tache("tache_simulation", "Simulation", afficher_resultat,
+                 lambda partiels: _afficher_simulation(partiels[-1], df_resultats))
+
+
+@chronometre("vue.tresorerie")
+def render_tresorerie_section():
+    """Affiche la trésorerie mensuelle issue des échéanciers de paiement"""
+    st.subheader("💶 Trésorerie mensuelle")
+
+    previsions = st.session_state.previsions_annuelles
+    projets = st.session_state.projets_annee_1
+    if not projets:
+        st.info("Ajoutez des projets dans l'onglet 'Prévisions annuelles' pour simuler la trésorerie.")
+        return
+
+    multiplicateurs = [st.session_state.get(f"mult_projet_{i}", 1) for i in range(len(projets))]
+    taux_croissance = previsions.annees[1].taux_croissance if len(previsions.annees) > 1 else 0.0
+
+    col1, col2 = st.columns(2)
+    with col1:
+        tresorerie_initiale = st.number_input(
+            "Trésorerie initiale (€)",
+            min_value=0,
+            value=TRESORERIE_PARAMS["tresorerie_initiale"],
+            step=1000,
+            key="tresorerie_initiale"
+        )
+    with col2:
+        nb_mois = st.slider(
+            "Horizon (mois)",
+            12, TRESORERIE_PARAMS["horizon_max_mois"],
+            min(12 * len(previsions.annees), TRESORERIE_PARAMS["horizon_max_mois"]),
+            step=12,
+            key="tresorerie_horizon"
+        )
+
+    calendrier = construire_calendrier(projets, multiplicateurs, nb_annees=(nb_mois + 11) // 12)
+    resultat = calculer_tresorerie(
+        calendrier,
+        nb_mois=nb_mois,
+        charges_fixes_annuelles=sum(st.session_state.charges_fixes.values()),
+        taux_croissance=taux_croissance,
+        tresorerie_initiale=tresorerie_initiale
+    )
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Point bas de trésorerie", format_currency(resultat.solde_min[0]),
+                  help=f"Atteint au mois {resultat.mois_solde_min[0]}")
+    with col2:
+        st.metric("BFR maximum", format_currency(resultat.bfr_max[0]),
+                  help="Production réalisée non encaissée, nette de la TVA à reverser")
+    with col3:
+        st.metric("Besoin de financement", format_currency(resultat.besoin_financement[0]))
+
+    df_tresorerie = resultat.get_dataframe()
+
+    fig, ax = plt.subplots(figsize=GRAPH_CONFIG['figsize'])
+    ax.bar(df_tresorerie["Mois"], df_tresorerie["Flux net"], color=GRAPH_CONFIG['colors'][0],
+           alpha=0.5, label="Flux net")
+    ax.plot(df_tresorerie["Mois"], df_tresorerie["Trésorerie"], linewidth=2,
+            color=GRAPH_CONFIG['colors'][1], label="Trésorerie")
+    ax.plot(df_tresorerie["Mois"], df_tresorerie["BFR"], linestyle='--',
+            color=GRAPH_CONFIG['colors'][4], label="BFR")
+    ax.axhline(y=0, color='black', linewidth=1)
+    ax.set_xlabel("Mois")
+    ax.set_ylabel("Montant (€)")
+    ax.set_title("Trésorerie mensuelle")
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.legend(loc='upper left')
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f"{x/1000:.0f}k€"))
+    plt.tight_layout()
+    with mesurer("graphique.affichage"):
+        st.pyplot(fig)
+    plt.close(fig)
+
+    with st.expander("Détail mensuel"):
+        afficher_tableau(df_tresorerie)
@@ -0,0 +1,50 @@
+# views/taches.py
+"""Suivi des tâches d'arrière-plan dans l'interface : progression, annulation, résultat"""
+
+from typing import Any, Callable
+
+import streamlit as st
+
+from config import TACHES_CONFIG
+from taches import gestionnaire, TERMINEE, ANNULEE, EXPIREE
+
+
+@st.fragment(run_every=TACHES_CONFIG["intervalle_sondage_s"])
+def _sonder_tache(cle_session: str, libelle: str, afficher_partiels: Callable[[list], None] = None):
+    """Rafraîchi seul tant que la tâche tourne ; relance la page entière à la fin"""
+    tache = gestionnaire().tache(st.session_state.get(cle_session))
+    if tache is None or tache.terminee:
+        st.rerun()
+
+    texte = f"{libelle} – {tache.etat}"
+    if tache.message:
+        texte += f" : {tache.message}"
+    st.progress(tache.progression, text=f"{texte} ({tache.duree_s:.0f} s)")
+    if st.button("⏹ Annuler", key=f"annuler_{cle_session}"):
+        gestionnaire().annuler(tache.id)
+        st.rerun()
+    if afficher_partiels is not None and tache.resultats_partiels:
+        afficher_partiels(list(tache.resultats_partiels))
+
+
+def render_tache(cle_session: str, libelle: str, afficher_resultat: Callable[[Any], None],
+                 afficher_partiels: Callable[[list], None] = None):
+    """Affiche la tâche dont l'identifiant est dans st.session_state[cle_session].
+
+    Pendant le calcul, seule la barre de progression est rafraîchie ; le reste
+    de la page reste utilisable. Le résultat est affiché par `afficher_resultat`.
+    """
+    tache = gestionnaire().tache(st.session_state.get(cle_session))
+    if tache is None:
+        return
+
+    if not tache.terminee:
+        _sonder_tache(cle_session, libelle, afficher_partiels)
+    elif tache.etat == TERMINEE:
+        afficher_resultat(tache.resultat)
+    elif tache.etat == ANNULEE:
+        st.info(f"{libelle} : annulé.")
+    elif tache.etat == EXPIREE:
+        st.warning(f"{libelle} : interrompu, {tache.erreur}.")
+    else:
+        st.error(f"❌ {libelle} : {tache.erreur}")